@@ -1,5 +1,5 @@
+import numpy as np
 from Misc.settings import Settings
-import datetime
 import warnings
 
 class Controller:
@@ -8,7 +8,7 @@ class Controller:
                  containedIn = None,
                  superSystem = None,
                  controlsElementType = None,
-                 startTime = None,
+                 timeline = None,
                  ruleset = None,
                  controlType = None,
                  **kwargs):
@@ -16,10 +16,10 @@ class Controller:
         self.containedIn = containedIn
         self.superSystem = superSystem
         self.controlsElementType = controlsElementType
-        self.ruleset = [[0,    0], #(Nx2 dimension matrix with CO2 thresholds and corresponding position)
-                        [600,  .45],
-                        [750,  .7],
-                        [900,  1]]
+        self.ruleset = ruleset if ruleset != None else [[0,    0], #(Nx2 dimension matrix with CO2 thresholds and corresponding position)
+                                                        [600,  .45],
+                                                        [750,  .7],
+                                                        [900,  1]]
         self.setSchedule = [[0, 0],
                             [7*3600, 0.33],
                             [18*3600, 0]]
@@ -27,16 +27,33 @@ class Controller:
         
         self.prevCO2 = Settings.ppmCO2Out
         
-        self.startTime = startTime
+        self.timeline = timeline # Simulator/timeline.py
         self.step = 0
+        self.scheduleSignal = None # Opening in every step of the timeline in 'schedule' mode (compileSchedule)
         self.P = 0.0026
         self.D = 0
+        self.stateAttributes = ["prevCO2", "step"] # Saved in checkpoints with the inputs and outputs (Simulator/checkpoint.py)
         
         self.input = {"inputValue": None}
         self.output = {"outputSignal": None}
 
+    def compileSchedule(self): # Opening of 'schedule' mode for every step of the timeline (reduced to a third in weekends)
+        opening = np.zeros(len(self.timeline.timeOfDay))
+        for row in self.setSchedule:
+            opening = np.where(self.timeline.timeOfDay >= row[0], row[1], opening)
+        self.scheduleSignal = np.where(self.timeline.weekday > 4, opening / 3, opening)
+
+    def signalLevels(self): # Every output the controller can give, None if they are not from a fixed set (PD and MPC control). Used for Simulator/decayTable.py
+        if self.controlType == 'ruleSet':
+            return [row[1] for row in self.ruleset]
+        elif self.controlType == 'schedule':
+            return list(np.unique(self.scheduleSignal))
+        elif self.controlType == 'constant':
+            return [0.33]
+        return None
+        
     def doStep(self):   
-        if self.controlType == "MPC":
+        if self.controlType in ["MPC", "MPCLinear"]:
             self.input["inputValue"] = self.inputSender["inputValue"].output[self.inputSenderProperty["inputValue"][0]][self.inputSenderProperty["inputValue"][1]]
             self.output['outputSignal'] = self.input["inputValue"]
         
@@ -56,15 +73,7 @@ class Controller:
             self.prevCO2 = co2
             
         elif self.controlType == 'schedule': 
-            time = self.startTime + datetime.timedelta(seconds=600)*self.step
-            midnight = time.replace(hour=0, minute=0)
-            timeOfDay = time-midnight
-            for idx in range(len(self.setSchedule)):
-                if timeOfDay.seconds >= self.setSchedule[idx][0]:
-                    opening = self.setSchedule[idx][1]
-            if time.weekday() > 4:
-                opening = opening / 3
-            self.output["outputSignal"] = opening
+            self.output["outputSignal"] = self.scheduleSignal[self.step]
             
         elif self.controlType == 'constant': 
             self.output["outputSignal"] = 0.33
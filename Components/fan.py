@@ -27,6 +27,7 @@ class Fan:
         self.input = {"flow": None} 
         self.output = {"W": None,
                        "Energy": 0}
+        self.listInputs = {"partialFlow": "flow"} # All partial flow connections are collected in the "flow" input
         
     def doStep(self): #Calculate fan power consuption from fan specific constants and mass flow
         flow = 0
@@ -1,10 +1,12 @@
-import datetime
+import numpy as np
+import pandas as pd
 
 class Occupancy:
     def __init__(self,
                  id = None,
                  containedIn = None,
                  dateTimeDf = None,
+                 timeline = None,
                  dataFile = None,
                  data = None,
                  scheduleFromData = None,
@@ -13,12 +15,15 @@ class Occupancy:
         self.id = id
         self.containedIn = containedIn
         self.dateTimeDf = dateTimeDf
+        self.timeline = timeline # Simulator/timeline.py
         self.dataFile = dataFile
         self.data = data
         self.scheduleFromData = scheduleFromData
         self.ventilationSystem = ventilationSystem
         
         self.stepCount = 0
+        self.schedule = None # Occupants in every step of the timeline (compileSchedule)
+        self.stateAttributes = ["stepCount"] # Saved in checkpoints with the inputs and outputs (Simulator/checkpoint.py)
         
         self.output = {"occupants": 0}
         
@@ -36,21 +41,20 @@ class Occupancy:
                                      [16*3600,   0]]       
         self.fixedScheduleHoliday = []
         
-    def doStep(self):
+    def compileSchedule(self): # Occupants for every step from the data, the predictions or the fixed schedule. Called at setup when the timeline is known
         if self.dataFile != None:
-            self.output["occupants"] = self.scheduleFromData["OCC"][self.stepCount]
-        elif type(self.scheduleFromData) != 'NoneType':
-            self.output["occupants"] = self.scheduleFromData[self.stepCount]
+            self.schedule = np.asarray(self.scheduleFromData["OCC"], dtype=np.float64)
+        elif self.scheduleFromData is not None:
+            self.schedule = np.asarray(self.scheduleFromData, dtype=np.float64)
         else:
-            time = self.dateTimeDf['DateTime'][self.stepCount]
-            midnight = self.dateTimeDf['DateTime'][self.stepCount].replace(hour=0, minute=0, second=0, microsecond=0)
-            timeOfDay = (time-midnight).seconds
-            if time.weekday() <= 4:
-                for row in self.fixedScheduleWeekDay:
-                    if timeOfDay >= row[0]:
-                        self.output["occupants"] = row[1]
-            else:
-                for row in self.fixedScheduleWeekend:
-                    if timeOfDay >= row[0]:
-                        self.output["occupants"] = row[1]
+            schedule = np.full(len(self.timeline.timeOfDay), np.nan)
+            weekDay = self.timeline.weekday <= 4
+            for row in self.fixedScheduleWeekDay:
+                schedule = np.where(weekDay & (self.timeline.timeOfDay >= row[0]), row[1], schedule)
+            for row in self.fixedScheduleWeekend:
+                schedule = np.where(~weekDay & (self.timeline.timeOfDay >= row[0]), row[1], schedule)
+            self.schedule = pd.Series(schedule).ffill().fillna(self.output["occupants"]).to_numpy() # Steps without a matching row keep the previous value
+        
+    def doStep(self):
+        self.output["occupants"] = self.schedule[self.stepCount]
         self.stepCount = self.stepCount + 1
\ No newline at end of file
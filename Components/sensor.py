@@ -11,9 +11,11 @@ class Sensor:
         self.measuresProperty=measuresProperty
         
         self.firstStep = True
+        self.stateAttributes = ["firstStep"] # Saved in checkpoints with the inputs and outputs (Simulator/checkpoint.py)
         
         self.input = {"value": None}
         self.output = {"value": None}
+        self.delayedInputs = ["value"] # The measurement is taken before the space is updated, i.e. from the previous step
 
     def doStep(self):
         if self.firstStep:
@@ -1,7 +1,7 @@
 import numpy as np
-from gekko import GEKKO
 #import matplotlib.pyplot as plt
 from Misc.settings import Settings
+from Simulator import gekkoAdapter
 
 class SystemMPC:
     def __init__(self,
@@ -15,7 +15,7 @@ class SystemMPC:
         self.superSystem = superSystem
         self.w1 = w1
         self.w2 = w2
-        self.w3 = w3
+        self.w3 = w3 if w3 != None else 0 # No CO2 emission term when not given
         
         self.CO2GenPerson = Settings.CO2GenPerson # [m^3/s]
         self.airInf = Settings.airInfSpace # [m^3/s]
@@ -30,57 +30,69 @@ class SystemMPC:
         self.nomWSupFan = None
         self.nomWExhFan = None
         self.model = None
+        self.remote = Settings.mpcRemoteSolve
+        self.modelCO2 = None # Measured CO2 when the model file was written (first solve), see writeModelFile
+        self.planStep = None # Step of the last successful solve. Its damper position trajectory is followed until the next solve
+        self.nSolves = 0
+        self.nFailedSolves = 0 # Solves without a solution, where the fail-safe damper positions were used
+        self.nSkippedSolves = 0 # MPC time steps where the plan was kept (event-triggered re-optimization)
+        self.solveTriggers = {'noPlan': 0, 'periodic': 0, 'horizon': 0, 'CO2': 0, 'occupancy': 0}
+        self.solveSteps = [] # Steps with a stored solution in results
         self.data = None
         self.mpcSteps = Settings.mpcSteps
         self.timeStep = Settings.timeStep
         self.mpcTimeStep = Settings.mpcTimeStep
+        self.time = np.linspace(0,self.mpcTimeStep*self.mpcSteps,self.mpcSteps+1) # Horizon time points [s]
+        self.CO2Tolerance = Settings.mpcCO2Tolerance
+        self.occTolerance = Settings.mpcOccTolerance
+        self.maxIter = 5000
+        self.warmStartMaxIter = 200 # A warm start that does not converge within this is abandoned for a cold start (converged solves need < 50 iterations)
         
         self.input = {"CO2": None,
                       "occ": None}
         self.output = {'outputSignal': None}
+        self.spaceInputs = ["CO2", "occ"] # Inputs and outputs given as lists ordered as spaceList
+        self.spaceOutputs = ["outputSignal"]
         self.step = 0
         
         self.results = {}
+        self.stateAttributes = ["step", "planStep", "nSolves", "nFailedSolves", "nSkippedSolves", "solveTriggers", "solveSteps", "results"] # Saved in checkpoints with the inputs and outputs (Simulator/checkpoint.py)
            
-    def doStep(self):
+    def buildModel(self): # Declare the GEKKO model once. Each step only updates the data (Param values, CO2 measurements and warm start)
+        # (with gekko versions not supported by Simulator/gekkoAdapter.py the model is built again for every solve, see rebuildModel)
         nSpaces = len(self.spaceList)
-        
-        for idx in range(nSpaces):
-            self.input["CO2"][idx] = self.inputSender["CO2"][idx].output[self.inputSenderProperty["CO2"][idx]]
-            self.input["occ"][idx] = self.inputSender["occ"][idx].output[self.inputSenderProperty["occ"][idx]]
-        
-        m = GEKKO()
-        m.time = np.linspace(0,self.mpcTimeStep*self.mpcSteps,self.mpcSteps+1)
-        
-        idxList = np.arange(self.step, self.step+int(self.mpcTimeStep/self.timeStep)*(self.mpcSteps+1), int(self.mpcTimeStep/self.timeStep))
-        self.idxList = idxList 
+        self.remote = Settings.mpcRemoteSolve
+        # One working directory per MPC, reused by all solves of the run and removed by cleanup()
+        m = gekkoAdapter.newModel(remote=self.remote, prefix=self.id.replace(" ", "") + "_", workDir=Settings.mpcWorkDir)
+        m.time = self.time
+        self.model = m
         
         # Param
-        elPrice = m.Param(self.data['DKKPerMWh'].iloc[idxList].to_list())
-        self.elPrice = elPrice
+        self.elPrice = m.Param(0)
         if self.w3 != 0:
-            emmImpact = m.Param(self.data['gCO2PerKWh'].iloc[idxList].to_list())
-        occ = [None] * nSpaces
+            self.emmImpact = m.Param(0)
+        self.occ = [None] * nSpaces
         for row in range(nSpaces):
-            space = self.spaceList[row]
-            occ[row] = m.Param(self.data[space].iloc[idxList].to_list())
+            self.occ[row] = m.Param(0)
             
         # Input
-        pos = [None] * nSpaces
+        self.pos = [None] * nSpaces
         for space in range(nSpaces):
-            pos[space] = m.MV(lb=0, ub=1)
-            pos[space].STATUS = 1
+            self.pos[space] = m.MV(lb=0, ub=1)
+            self.pos[space].STATUS = 1
          
         # CV
-        CO2 = [None] * nSpaces
+        self.CO2 = [None] * nSpaces
         for space in range(nSpaces):
-            CO2[space] = m.CV(self.input["CO2"][space])
-        CO2Imp = m.CV(0)
-        price = m.CV(0)
-        cost = m.CV(0)
+            self.CO2[space] = m.CV(0)
+        self.CO2Imp = m.CV(0)
+        self.price = m.CV(0)
+        self.cost = m.CV(0)
+        self.horizonTotals = [self.CO2Imp, self.price, self.cost] # Start from 0 at every step
         if self.w3 != 0:
-            emm = m.CV(0)
-            totalEmm = m.CV(0)
+            self.emm = m.CV(0)
+            self.totalEmm = m.CV(0)
+            self.horizonTotals = self.horizonTotals + [self.emm, self.totalEmm]
         
         #State variables
         flowDamper = [None] * nSpaces
@@ -100,56 +112,190 @@ class SystemMPC:
         CO2ImpSpace = [None] * nSpaces
         for space in range(nSpaces):
             #CO2ImpSpace[space] = m.Intermediate(CO2[space] * occ[space])
-            CO2ImpPerOcc[space] = m.max2(CO2[space]-Settings.CO2Threshold,0)
-            CO2ImpSpace[space] = m.Intermediate(CO2ImpPerOcc[space] * occ[space])
+            CO2ImpPerOcc[space] = m.max2(self.CO2[space]-Settings.CO2Threshold,0)
+            CO2ImpSpace[space] = m.Intermediate(CO2ImpPerOcc[space] * self.occ[space])
         
         #Equations
         for space in range(nSpaces):
-            m.Equation(flowDamper[space] == pos[space]*self.nomFlowDamper[space])
-            m.Equation(CO2[space].dt() == (occ[space]*self.CO2GenPerson*1000000-(self.nomFlowDamper[space]*pos[space]+self.airInf)*(CO2[space]-Settings.ppmCO2Out))/self.spaceVol[space])
-        m.Equation(CO2Imp.dt() == sum(CO2ImpSpace))
-        m.Equation(price == (wSupFan+wExhFan) * elPrice / (1000000*3600)) 
-        m.Equation(cost.dt() == price)
+            m.Equation(flowDamper[space] == self.pos[space]*self.nomFlowDamper[space])
+            m.Equation(self.CO2[space].dt() == (self.occ[space]*self.CO2GenPerson*1000000-(self.nomFlowDamper[space]*self.pos[space]+self.airInf)*(self.CO2[space]-Settings.ppmCO2Out))/self.spaceVol[space])
+        m.Equation(self.CO2Imp.dt() == sum(CO2ImpSpace))
+        m.Equation(self.price == (wSupFan+wExhFan) * self.elPrice / (1000000*3600)) 
+        m.Equation(self.cost.dt() == self.price)
         if self.w3 != 0:
-            m.Equation(emm == (wSupFan+wExhFan) * emmImpact / (1000000*3600))
-            m.Equation(totalEmm.dt() == emm)
+            m.Equation(self.emm == (wSupFan+wExhFan) * self.emmImpact / (1000000*3600))
+            m.Equation(self.totalEmm.dt() == self.emm)
         
         m.Equation(flowSupFan == sum(flowDamper)/self.nomFlowSupFan)
         m.Equation(flowExhFan == sum(flowDamper)/self.nomFlowExhFan)
         
         
         #Objective
-        m.Obj(self.w1 * cost) #DKK 
-        m.Obj(self.w2 * CO2Imp) #ppm*s*occ (above threshold)
+        m.Obj(self.w1 * self.cost) #DKK 
+        m.Obj(self.w2 * self.CO2Imp) #ppm*s*occ (above threshold)
         if self.w3 != 0:
-            m.Obj(self.w3 * totalEmm) #kg CO2
+            m.Obj(self.w3 * self.totalEmm) #kg CO2
         
         m.options.IMODE = 6 
-        m.options.MAX_ITER = 5000
+        m.options.MAX_ITER = self.maxIter
         m.options.SOLVER = 3
+        m.options.TIME_SHIFT = 0 # The warm start is set in setInitialGuess, since a step (timeStep) may be shorter than an MPC interval
+        
+    def getSolverState(self): # What the GEKKO model carries from one solve to the next: the last solution (warm start), the options updated by the solver
+        # (e.g. the cycle count) and the initial values of the model file written by the first solve
+        if self.model == None:
+            return None
+        m = self.model
+        state = {'pos': [np.array(pos.value).tolist() for pos in self.pos],
+                 'CO2': [np.array(CO2.value).tolist() for CO2 in self.CO2],
+                 'modelCO2': self.modelCO2 if gekkoAdapter.modelFileKept(m) else None}
+        state.update(gekkoAdapter.getSolverOptions(m))
+        return state
+    
+    def setSolverState(self, state):
+        if state == None or self.model == None:
+            return
+        m = self.model
+        # The solver state on the server is not restored, the next solve starts a new model there
+        if state['modelCO2'] != None and not self.remote and gekkoAdapter.reuseSupported():
+            self.writeModelFile(state['modelCO2'])
+        for space in range(len(self.spaceList)):
+            self.pos[space].value = state['pos'][space]
+            self.CO2[space].value = state['CO2'][space]
+        if not self.remote:
+            gekkoAdapter.setSolverOptions(m, state)
+        
+    def writeModelFile(self, CO2): # Write the model file as the first solve of a run does (cold start values and data given as arrays), for a run continued
+        # from a checkpoint. The file is kept for the remaining solves
+        m = self.model
+        horizon = [0] * len(self.time)
+        for param in [self.elPrice] + self.occ + ([self.emmImpact] if self.w3 != 0 else []):
+            param.value = horizon
+        for space in range(len(self.spaceList)):
+            self.pos[space].value = 0
+            self.CO2[space].value = CO2[space]
+        for variable in self.horizonTotals:
+            variable.value = 0
+        gekkoAdapter.writeModelFile(m)
+        self.modelCO2 = CO2
+        
+    def rebuildModel(self): # New model for the next solve, keeping the previous solution as warm start (gekko versions where the model is not reused)
+        pos = [list(pos.value) for pos in self.pos]
+        CO2 = [list(CO2.value) for CO2 in self.CO2]
+        self.cleanup()
+        self.buildModel()
+        for space in range(len(self.spaceList)):
+            self.pos[space].value = pos[space]
+            self.CO2[space].value = CO2[space]
+        
+    def cleanup(self): # Remove the solver working directory at the end of the run
+        if self.model != None:
+            gekkoAdapter.removeModel(self.model)
+            self.model = None
+        
+    def shiftedGuess(self, values, shift): # Previous solution moved forward by shift seconds (last value held)
+        return np.interp(self.time + shift, self.time, values).tolist()
+    
+    def setInitialGuess(self, warmStart):
+        # The solver state of the previous solve is removed, since warm starting the internal variables of max2 (complementarity
+        # constraints) keeps IPOPT from converging. Only the damper positions and CO2 levels are warm started (through the csv file)
+        gekkoAdapter.clearSolverData(self.model, self.remote)
+        self.model.options.MAX_ITER = self.warmStartMaxIter if warmStart else self.maxIter
+        for space in range(len(self.spaceList)):
+            if warmStart:
+                shift = (self.step-self.planStep) * self.timeStep
+                self.pos[space].value = self.shiftedGuess(self.pos[space].value, shift)
+                self.CO2[space].value = [self.input["CO2"][space]] + self.shiftedGuess(self.CO2[space].value, shift)[1:] # First value is the initial condition
+            else:
+                self.pos[space].value = 0
+                self.CO2[space].value = self.input["CO2"][space]
+        for variable in self.horizonTotals:
+            variable.value = 0
+            
+    def solveRequired(self): # Receding horizon: the plan is re-optimized at every MPC time step, or only on events if a CO2 tolerance is set
+        if self.planStep == None:
+            trigger = 'noPlan'
+        else:
+            ratio = int(self.mpcTimeStep/self.timeStep)
+            offset = self.step - self.planStep
+            trigger = None
+            if self.CO2Tolerance == None:
+                if offset >= ratio:
+                    trigger = 'periodic'
+            elif offset >= ratio*self.mpcSteps:
+                trigger = 'horizon'
+            else:
+                for idx in range(len(self.spaceList)):
+                    predictedCO2 = np.interp(offset*self.timeStep, self.time, self.results['spaceCO2'][idx,:,self.planStep])
+                    if abs(self.input["CO2"][idx] - predictedCO2) > self.CO2Tolerance:
+                        trigger = 'CO2'
+                        break
+                    if abs(self.input["occ"][idx] - self.data[self.spaceList[idx]].iloc[self.step]) > self.occTolerance:
+                        trigger = 'occupancy'
+                        break
+                if trigger == None and offset % ratio == 0:
+                    self.nSkippedSolves = self.nSkippedSolves + 1
+        if trigger == None:
+            return False
+        self.solveTriggers[trigger] = self.solveTriggers[trigger] + 1
+        return True
+    
+    def horizonData(self): # Price, emission factor and occupancy forecasts at the horizon time points
+        idxList = np.arange(self.step, self.step+int(self.mpcTimeStep/self.timeStep)*(self.mpcSteps+1), int(self.mpcTimeStep/self.timeStep))
+        self.idxList = idxList 
+        price = self.data['DKKPerMWh'].iloc[idxList].to_list()
+        emmFactor = self.data['gCO2PerKWh'].iloc[idxList].to_list()
+        occ = [self.data[space].iloc[idxList].to_list() for space in self.spaceList]
+        return price, emmFactor, occ
+    
+    def solve(self):
+        nSpaces = len(self.spaceList)
+        if self.nSolves > 0 and not gekkoAdapter.reuseSupported():
+            self.rebuildModel()
+        m = self.model
         
+        # Update data
+        price, emmFactor, occ = self.horizonData()
+        self.elPrice.value = price
+        if self.w3 != 0:
+            self.emmImpact.value = emmFactor
+        for row in range(nSpaces):
+            self.occ[row].value = occ[row]
+        
+        if not gekkoAdapter.modelFileKept(m):
+            self.modelCO2 = list(self.input["CO2"])
+        self.nSolves = self.nSolves + 1
         try:
-            m.solve(disp=True)
+            try:
+                self.setInitialGuess(warmStart = self.planStep != None)
+                m.solve(disp=True)
+            except:
+                if self.planStep == None:
+                    raise
+                print(self.id + ' found no solution from the previous solution at step ' + str(self.step) + '. Solving again from a cold start.')
+                self.setInitialGuess(warmStart = False)
+                m.solve(disp=True)
+            self.planStep = self.step
+            self.solveSteps.append(self.step)
         
             # Store mpc data
-            self.results['Cost'][:,self.step] = cost
-            self.results['CO2Imp'][:,self.step] = CO2Imp
-            self.results['stepPrice'][:,self.step] = price
+            self.results['Cost'][:,self.step] = self.cost
+            self.results['CO2Imp'][:,self.step] = self.CO2Imp
+            self.results['stepPrice'][:,self.step] = self.price
             if self.w3 != 0:
-                self.results['emm'][:,self.step] = emm
-                self.results['totalEmm'][:,self.step] = totalEmm
+                self.results['emm'][:,self.step] = self.emm
+                self.results['totalEmm'][:,self.step] = self.totalEmm
             
             for idx in range(nSpaces):
-                self.results['damperPos'][idx,:,self.step] = pos[idx]
-                self.results['spaceCO2'][idx,:,self.step] = CO2[idx]
-            
-            for idx in range(nSpaces):
-                self.output["outputSignal"][idx] = pos[idx][1] #self.input["CO2"][idx] * self.input["occ"][idx] / 10000
+                self.results['damperPos'][idx,:,self.step] = self.pos[idx]
+                self.results['spaceCO2'][idx,:,self.step] = self.CO2[idx]
         except:
             if self.step == 0:
                 for idx in range(nSpaces):
                     self.output["outputSignal"][idx] = 0
                     
+            self.planStep = None
+            self.nFailedSolves = self.nFailedSolves + 1
             print(self.id + ' found no solution for optimizing damper control at step ' + str(self.step) + '. Damper positions for ' + self.superSystem + ' where set using fail-safe method.')
             
             """for idx in range(nSpaces):
@@ -157,6 +303,24 @@ class SystemMPC:
                     self.output["outputSignal"][idx] = 1
                 else:
                     self.output["outputSignal"][idx] = 0"""
-            
+        
+        gekkoAdapter.keepModelFile(m) # The model file written by the first solve is unchanged (all step data is passed in the csv file), so it is not rebuilt
+        
+    def applyPlan(self): # Damper positions of the current interval of the last solution (index 0 is the initial value)
+        if self.planStep == None:
+            return
+        interval = 1 + (self.step-self.planStep) // int(self.mpcTimeStep/self.timeStep)
+        for idx in range(len(self.spaceList)):
+            self.output["outputSignal"][idx] = self.results['damperPos'][idx,interval,self.planStep]
+           
+    def doStep(self):
+        nSpaces = len(self.spaceList)
+        
+        for idx in range(nSpaces):
+            self.input["CO2"][idx] = self.inputSender["CO2"][idx].output[self.inputSenderProperty["CO2"][idx]]
+            self.input["occ"][idx] = self.inputSender["occ"][idx].output[self.inputSenderProperty["occ"][idx]]
+        
+        if self.solveRequired():
+            self.solve()
+        self.applyPlan()
         self.step = self.step+1
-            
\ No newline at end of file
@@ -0,0 +1,148 @@
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+from Misc.settings import Settings
+from Components.systemMPC import SystemMPC
+
+class SystemMPCLinear(SystemMPC): # Same inputs, outputs, results and solve schedule as SystemMPC, but the optimization is a sequence of LPs solved with HiGHS (scipy) instead of a GEKKO NLP
+    # The CO2 balance of each space is discretized exactly over every MPC interval (zero-order hold of damper position and occupancy, same
+    # solution as BuildingSpace). The product of damper position and CO2 is linearized around the previous iterate, and the LP is re-solved
+    # with a shrinking trust region on the damper positions until the positions no longer change (sequential linear programming).
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.elementCategory = "SystemMPC" # Stored and connected as a SystemMPC
+        self.airInf = Settings.airInfSpace # [1/s] as in BuildingSpace
+        self.slpIterations = 8
+        self.slpTolerance = 1e-4 # Largest change in damper position between iterations for convergence
+        self.trustRegion = 0.5 # Largest change in damper position in the first iteration (halved every iteration)
+
+    def buildModel(self): # Constant parts of the LP
+        nSpaces = len(self.spaceList)
+        N = self.mpcSteps
+        self.flowMax = np.array(self.nomFlowDamper, dtype=float)
+        self.vol = np.array(self.spaceVol, dtype=float)
+        self.powerPerPos = self.flowMax * (self.nomWSupFan/self.nomFlowSupFan + self.nomWExhFan/self.nomFlowExhFan) # [W] (fan part load equal to the flow fraction as in SystemMPC)
+        self.fanFlowMax = min(self.nomFlowSupFan, self.nomFlowExhFan)
+        self.horizonWeight = N - np.arange(N) # GEKKO sums the accumulated objective terms over all horizon points, so interval k counts N-k times
+
+        # Variables (each nSpaces x N, row-major): damper position in interval k, CO2 at the end of interval k, CO2 above threshold at the end of interval k
+        self.nVariables = 3*nSpaces*N
+        row = np.arange(nSpaces*N)
+        self.posIdx = row
+        self.CO2Idx = nSpaces*N + row
+        self.excessIdx = 2*nSpaces*N + row
+        self.first = (row % N) == 0 # Interval 0 starts from the measurement
+
+        # CO2 - excess <= threshold, and the fan flow limit
+        rows = np.concatenate([row, row, nSpaces*N + row % N])
+        cols = np.concatenate([self.CO2Idx, self.excessIdx, self.posIdx])
+        values = np.concatenate([np.ones(nSpaces*N), -np.ones(nSpaces*N), np.repeat(self.flowMax, N)])
+        self.A_ub = coo_matrix((values, (rows, cols)), shape=(nSpaces*N + N, self.nVariables)).tocsr()
+        self.b_ub = np.concatenate([np.full(nSpaces*N, float(Settings.CO2Threshold)), np.full(N, self.fanFlowMax)])
+
+    def simulate(self, CO2Initial, pos, occ): # Exact CO2 trajectory (nSpaces x N+1) and its sensitivities for damper positions (nSpaces x N)
+        dt = self.mpcTimeStep
+        a = pos * (self.flowMax/self.vol)[:, np.newaxis] + self.airInf
+        occGen = occ * self.CO2GenPerson * 1000000 / self.vol[:, np.newaxis]
+        steadyState = occGen/a + Settings.ppmCO2Out
+        decay = np.exp(-a*dt)
+        CO2 = np.zeros((len(self.spaceList), self.mpcSteps+1))
+        CO2[:, 0] = CO2Initial
+        for k in range(self.mpcSteps):
+            CO2[:, k+1] = steadyState[:, k] + (CO2[:, k]-steadyState[:, k])*decay[:, k]
+        dCO2da = -occGen/a**2 * (1-decay) - dt * (CO2[:, :-1]-steadyState) * decay
+        dCO2dPos = dCO2da * (self.flowMax/self.vol)[:, np.newaxis]
+        return CO2, decay, dCO2dPos
+
+    def objective(self, pos, CO2, energyCost, occ): # Objective of the nonlinear problem, used to accept or reject an LP iterate
+        excess = np.maximum(CO2[:, 1:]-Settings.CO2Threshold, 0)
+        return np.sum(energyCost*pos) + np.sum(self.w2*self.mpcTimeStep*occ*excess*self.horizonWeight)
+
+    def solveLP(self, CO2Initial, nominalPos, energyCost, occ, trustRegion):
+        nSpaces = len(self.spaceList)
+        N = self.mpcSteps
+        nominalCO2, decay, dCO2dPos = self.simulate(CO2Initial, nominalPos, occ)
+
+        # CO2[k+1] = nominalCO2[k+1] + decay*(CO2[k]-nominalCO2[k]) + dCO2dPos*(pos[k]-nominalPos[k])
+        decay = decay.ravel()
+        dCO2dPos = dCO2dPos.ravel()
+        later = ~self.first
+        rows = np.concatenate([self.posIdx, self.posIdx, self.posIdx[later]])
+        cols = np.concatenate([self.CO2Idx, self.posIdx, self.CO2Idx[later]-1])
+        values = np.concatenate([np.ones(nSpaces*N), -dCO2dPos, -decay[later]])
+        A_eq = coo_matrix((values, (rows, cols)), shape=(nSpaces*N, self.nVariables)).tocsr()
+        b_eq = nominalCO2[:, 1:].ravel() - dCO2dPos*nominalPos.ravel()
+        b_eq[later] = b_eq[later] - decay[later]*nominalCO2[:, 1:-1].ravel()
+
+        c = np.zeros(self.nVariables)
+        c[self.posIdx] = energyCost.ravel()
+        c[self.excessIdx] = (self.w2*self.mpcTimeStep*occ*self.horizonWeight).ravel()
+
+        bounds = np.zeros((self.nVariables, 2))
+        bounds[self.posIdx, 0] = np.maximum(0, nominalPos.ravel()-trustRegion)
+        bounds[self.posIdx, 1] = np.minimum(1, nominalPos.ravel()+trustRegion)
+        bounds[self.CO2Idx] = [-np.inf, np.inf]
+        bounds[self.excessIdx, 1] = np.inf
+
+        result = linprog(c, A_ub=self.A_ub, b_ub=self.b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+        if result.status != 0:
+            raise RuntimeError(result.message)
+        return result.x[self.posIdx].reshape(nSpaces, N)
+
+    def solve(self):
+        nSpaces = len(self.spaceList)
+        N = self.mpcSteps
+        dt = self.mpcTimeStep
+        price, emmFactor, occ = self.horizonData()
+        price = np.array(price[:N]) # Forecasts at the start of each interval
+        emmFactor = np.array(emmFactor[:N])
+        occ = np.array(occ, dtype=float)[:, :N]
+        energyCost = self.powerPerPos[:, np.newaxis] * dt * (self.w1*price + self.w3*emmFactor) / (1000000*3600) * self.horizonWeight
+        CO2Initial = np.array(self.input["CO2"], dtype=float)
+
+        # Start from the previous plan (shifted by the time since it was made)
+        if self.planStep != None:
+            shift = (self.step-self.planStep) * self.timeStep / dt
+            nominalPos = np.array([np.interp(np.arange(N) + shift, np.arange(N), self.results['damperPos'][idx,1:,self.planStep]) for idx in range(nSpaces)])
+        else:
+            nominalPos = np.zeros((nSpaces, N))
+
+        self.nSolves = self.nSolves + 1
+        try:
+            nominalObjective = self.objective(nominalPos, self.simulate(CO2Initial, nominalPos, occ)[0], energyCost, occ)
+            trustRegion = self.trustRegion
+            for iteration in range(self.slpIterations):
+                pos = self.solveLP(CO2Initial, nominalPos, energyCost, occ, trustRegion)
+                change = np.max(np.abs(pos-nominalPos), initial=0)
+                objective = self.objective(pos, self.simulate(CO2Initial, pos, occ)[0], energyCost, occ)
+                if objective <= nominalObjective:
+                    nominalPos = pos
+                    nominalObjective = objective
+                trustRegion = trustRegion / 2
+                if change < self.slpTolerance:
+                    break
+            pos = nominalPos
+            self.planStep = self.step
+            self.solveSteps.append(self.step)
+
+            # Store mpc data (same layout as SystemMPC, index 0 is the start of the horizon)
+            CO2 = self.simulate(CO2Initial, pos, occ)[0]
+            power = np.sum(self.powerPerPos[:, np.newaxis]*pos, axis=0)
+            stepPrice = power * price / (1000000*3600)
+            emm = power * emmFactor / (1000000*3600)
+            impact = np.sum(np.maximum(CO2[:, 1:]-Settings.CO2Threshold, 0)*occ, axis=0) * dt
+            self.results['Cost'][:,self.step] = np.concatenate([[0], np.cumsum(stepPrice*dt)])
+            self.results['CO2Imp'][:,self.step] = np.concatenate([[0], np.cumsum(impact)])
+            self.results['stepPrice'][:,self.step] = np.concatenate([stepPrice[:1], stepPrice])
+            self.results['emm'][:,self.step] = np.concatenate([emm[:1], emm])
+            self.results['totalEmm'][:,self.step] = np.concatenate([[0], np.cumsum(emm*dt)])
+            self.results['damperPos'][:,:,self.step] = np.concatenate([pos[:, :1], pos], axis=1)
+            self.results['spaceCO2'][:,:,self.step] = CO2
+        except Exception as error:
+            if self.step == 0:
+                for idx in range(nSpaces):
+                    self.output["outputSignal"][idx] = 0
+
+            self.planStep = None
+            self.nFailedSolves = self.nFailedSolves + 1
+            print(self.id + ' found no solution for optimizing damper control at step ' + str(self.step) + ' (' + str(error) + '). Damper positions for ' + self.superSystem + ' where set using fail-safe method.')
@@ -0,0 +1,15 @@
+import os
+import pandas as pd
+from dateutil.tz import tzutc
+
+loadedData = {} # Parsed files of this process {(file, size, mtime, dateFormat): DataFrame}
+
+def loadOccData(file, dateFormat): # Measured occupancy file (Timestamp, OCC) with a parsed DateTime column. Each file is only parsed once per process
+    stat = os.stat(file)
+    key = (os.path.abspath(file), stat.st_size, stat.st_mtime_ns, dateFormat)
+    if key not in loadedData:
+        data = pd.read_csv(file)
+        dateTimes = pd.to_datetime(data['Timestamp'], format=dateFormat).dt.tz_localize(tzutc())
+        data.insert(2, 'DateTime', dateTimes)
+        loadedData[key] = data
+    return loadedData[key].copy()
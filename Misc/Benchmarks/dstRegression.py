@@ -0,0 +1,38 @@
+#-----------------------------------------------------------------------------
+#--------------------------------- USER INPUT --------------------------------
+#-----------------------------------------------------------------------------
+# Regression run for the time convention of the 2018 data (measured occupancy and prediction files on a regular grid without daylight savings, see
+# Simulator/timeline.py). Runs the example Simulations/2roomsWOccData.py across the 2018-03-25 switch and a week without a switch and compares
+# the number of steps and the KPI with the reference values. Run from the project folder (VentilationSim).
+
+configFileName = "config_1sys_2rooms.xlsx"
+
+cases = [# Start time, end time, steps, KPI [ppm*occ*s]
+         [{"year": 2018, "month": 3, "day": 23, "hour": 0, "minute": 0, "second": 0}, {"year": 2018, "month": 3, "day": 29, "hour": 0, "minute": 0, "second": 0}, 865, 642862.5636280014],
+         [{"year": 2018, "month": 3, "day": 26, "hour": 0, "minute": 0, "second": 0}, {"year": 2018, "month": 4, "day": 1, "hour": 0, "minute": 0, "second": 0}, 865, 0.0]]
+
+
+#-----------------------------------------------------------------------------
+#-------------------------------- RUN REGRESSION -----------------------------
+#-----------------------------------------------------------------------------
+
+import math
+from tabulate import tabulate
+from model import Model
+
+table = []
+failed = False
+for startTime, endTime, steps, KPI in cases:
+    model = Model(configFile = configFileName, startTimeInput = startTime, endTimeInput = endTime,
+                  damperControlType = "ruleSet", occData = "dataConnect1")
+    model.simulationSetup()
+    model.runSimulation()
+    model.calculateTotals()
+    model.clacAirKPI()
+    ok = model.steps == steps and math.isclose(model.KPI, KPI, rel_tol=1e-9)
+    failed = failed or not ok
+    table.append([str(model.startTime), str(model.endTime), model.steps, steps, model.KPI, KPI, 'OK' if ok else 'FAILED'])
+
+print(tabulate(table, headers=['Start', 'End', 'Steps', 'Reference steps', 'KPI [ppm*occ*s]', 'Reference KPI', 'Result']))
+if failed:
+    raise ValueError('The results differ from the reference values')
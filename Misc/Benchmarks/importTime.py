@@ -0,0 +1,51 @@
+#-----------------------------------------------------------------------------
+#--------------------------------- USER INPUT --------------------------------
+#-----------------------------------------------------------------------------
+# Measures the cost of "import model" in a fresh interpreter (what every sweep worker and batch run pays before simulating).
+# Run from the project folder (VentilationSim).
+
+# Number of fresh interpreters to time (the median is reported)
+repeats = 5
+
+# Modules that should only be imported when used (MPC, plots, tabular output, parsing of configuration workbooks)
+lazyModules = ["gekko", "scipy", "matplotlib", "tabulate", "openpyxl"]
+
+# Number of slowest top level imports to list
+nSlowest = 10
+
+
+#-----------------------------------------------------------------------------
+#-------------------------------- RUN BENCHMARK ------------------------------
+#-----------------------------------------------------------------------------
+
+import os
+import sys
+import statistics
+import subprocess
+from tabulate import tabulate
+
+script = "import sys, time; start = time.perf_counter(); import model; print(time.perf_counter() - start); print(','.join(sorted(set(name.split('.')[0] for name in sys.modules))))"
+
+durations = []
+for run in range(repeats):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=os.getcwd(), capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    durations.append(float(lines[0]))
+    loaded = lines[1].split(',')
+
+# Cumulative import time of the modules imported directly by model.py (from the last run)
+topLevel = []
+for line in result.stderr.splitlines():
+    if line.startswith('import time:') and '|' in line:
+        fields = line[len('import time:'):].split('|')
+        name = fields[2].rstrip()
+        if fields[1].strip().isdigit() and name.startswith('  ') and not name.startswith('    '):
+            topLevel.append([name.strip(), int(fields[1])/1000000])
+topLevel.sort(key=lambda row: row[1], reverse=True)
+
+print(tabulate([['import model [s] (median of ' + str(repeats) + ')', statistics.median(durations)],
+                ['import model [s] (min)', min(durations)]]))
+print()
+print(tabulate(topLevel[:nSlowest], headers=['Imported by model.py', 'Cumulative [s]']))
+print()
+print(tabulate([[module, module in loaded] for module in lazyModules], headers=['Module', 'Loaded by "import model"']))
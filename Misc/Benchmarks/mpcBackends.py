@@ -0,0 +1,45 @@
+#-----------------------------------------------------------------------------
+#--------------------------------- USER INPUT --------------------------------
+#-----------------------------------------------------------------------------
+# Compares the MPC backends ('MPC' = GEKKO, 'MPCLinear' = sequential LP with scipy/HiGHS) on the same simulation.
+# Run from the project folder (VentilationSim).
+
+# Chose simulation start and end time. Make sure the chosen date covers the chosen duration
+startTime = {"year": 2020, "month": 1, "day": 6, "hour": 6, "minute": 0, "second": 0}
+endTime = {"year": 2020, "month": 1, "day": 6, "hour": 18, "minute": 0, "second": 0}
+
+# Chose configuration file for simulation.
+configFileName = "config_1sys_2rooms.xlsx"
+
+# MPC weights (see Components/systemMPC.py: w1 * energy cost + w2 * CO2 impact + w3 * CO2 emission)
+w1 = 1 #[1/DKK]
+w2 = 0.02/(1000*3600) #[1/(ppm*s*occ)] (only ppm above threshold)
+w3 = 0
+
+backends = ["MPC", "MPCLinear"]
+
+
+#-----------------------------------------------------------------------------
+#-------------------------------- RUN BENCHMARK ------------------------------
+#-----------------------------------------------------------------------------
+
+import time
+from tabulate import tabulate
+from model import Model
+
+table = []
+for backend in backends:
+    model = Model(configFile = configFileName, startTimeInput = startTime, endTimeInput = endTime,
+                  damperControlType = backend, mpcW1 = w1, mpcW2 = w2, mpcW3 = w3)
+    model.simulationSetup()
+    start = time.time()
+    model.runSimulation()
+    duration = time.time() - start
+    model.calculateTotals()
+    model.clacAirKPI()
+    objectives = model.getObjectives()
+    nSolves = sum([systemMPC.nSolves for systemMPC in model.elementDict['SystemMPC'].values()])
+    objective = w1*objectives['cost'] + w2*objectives['KPI'] + w3*objectives['CO2Emm']
+    table.append([backend, duration, nSolves, duration/nSolves, objectives['cost'], objectives['KPI'], objective])
+
+print(tabulate(table, headers=['Backend', 'Run time [s]', 'Solves', 'Time per solve [s]', 'Energy cost [DKK]', 'KPI [ppm*occ*s]', 'Realized objective']))
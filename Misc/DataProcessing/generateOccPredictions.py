@@ -27,23 +27,11 @@ from dateutil.tz import tzutc
 import math
 import pandas as pd
 import os
-import openpyxl
 import random
 import numpy as np
 from Misc.settings import Settings
-
-dstSwitchDate = [[2019, 3, 31, 2, True], #year, month, day, hour, DST on? 
-                 [2019, 10, 27, 2, False],
-                 [2020, 3, 29, 2, True], 
-                 [2020, 10, 25, 2, False],
-                 [2021, 3, 28, 2, True], 
-                 [2021, 10, 31, 2, False],
-                 [2022, 3, 27, 2, True], 
-                 [2022, 10, 30, 2, False],
-                 [2023, 3, 26, 2, True], 
-                 [2023, 10, 29, 2, False],
-                 [2024, 3, 31, 2, True], 
-                 [2024, 10, 27, 2, False]]
+from Simulator.configCache import readWorkbook
+from Simulator.timeline import Timeline
 
 fixedDateHolidays = [[1, 1], #Month, day
                      [12, 23],
@@ -136,7 +124,7 @@ areaPerOcc = [['Toilet area', 15], #Areatype, Area (m^2) per occupant at base pe
               ['Tea kitchen', 20],
               ['Storage room', 50],
               ['Auditorium', 4],
-              ['Office area', 12]
+              ['Office area', 12]]
 
 def holiday(timestamp):
     holiday = False
@@ -189,15 +177,6 @@ def findDatetimePeriodType(timestamp):
     
     return periodType, weight
 
-def dstCheck(timeStamp): # account for daylight savings  
-    dst = False
-    index = -1
-    for idx in range(len(dstSwitchDate)):
-        if timeStamp > dt.datetime(dstSwitchDate[idx][0], dstSwitchDate[idx][1], dstSwitchDate[idx][2], dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc()):
-            dst = dstSwitchDate[idx][4]
-            index = idx
-    return dst, index
-
 def getProjectPath(): #The project should be contained in a folder named VentilationSim
     projectPath = None
     level = os.getcwd()
@@ -239,32 +218,7 @@ timeStep = dt.timedelta(seconds=Settings.timeStep)
 startTime = dt.datetime(2019, 1, 1, 0, 0, 0, tzinfo=tzutc())
 endTime = dt.datetime(2024, 9, 17, 23, 23, 30, tzinfo=tzutc())
 
-startNoDst = startTime
-endNoDst = endTime
-startDst, startIdx = dstCheck(startTime)
-endDst, endIdx = dstCheck(endTime)
-if startDst:
-    startNoDst = startTime-dt.timedelta(hours=1)
-if endDst:
-    endNoDst = endTime-dt.timedelta(hours=1)
-
-duration = endNoDst - startNoDst
-steps = math.floor(duration/timeStep) + 1
-timeSteps = []
-
-idx = startIdx + 1 
-dst = startDst # True or false
-nextDstChange = dt.datetime(dstSwitchDate[idx][0], dstSwitchDate[idx][1], dstSwitchDate[idx][2], dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc())
-for step in range(steps):
-    timestamp = startNoDst+step*timeStep
-    if timestamp >= nextDstChange:
-        dst = dstSwitchDate[idx][4]
-        idx = idx + 1
-        nextDstChange = dt.datetime(dstSwitchDate[idx][0], dstSwitchDate[idx][1], dstSwitchDate[idx][2], dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc())
-    if dst:
-        timeSteps.append(timestamp+dt.timedelta(hours=1))
-    else:
-        timeSteps.append(timestamp)
+timeSteps = Timeline(startTime=startTime, endTime=endTime, timeStep=timeStep, dstStartYear=Settings.dstStartYear).dateTimes # Local wall clock (daylight savings from Settings.dstStartYear, as the old switch table from 2019)
     
 periodType = []
 periodWeight = []
@@ -279,8 +233,7 @@ fileName = 'config_OU44.xlsx'
 path = getProjectPath()
 file = os.path.abspath(os.path.join(path, 'Data', 'Config', fileName))
 
-openpyxl.reader.excel.warnings.simplefilter(action='ignore')
-dfBuildingSpace = pd.read_excel(file, sheet_name="BuildingSpace")
+dfBuildingSpace = readWorkbook(file)["BuildingSpace"]
 dfBuildingSpace = dfBuildingSpace.dropna()
 
 spaceName = []
@@ -336,7 +289,7 @@ for row in DataType:
 path = []    
 here = os.getcwd()
 for idx in range(len(DataType)):
-    path.append(here + '\\OccPredictions\\' + csvName[idx])
+    path.append(os.path.join(here, 'OccPredictions', csvName[idx]))
     
 occDf.to_csv(path[0])
 roundedDF.to_csv(path[1])
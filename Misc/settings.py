@@ -8,6 +8,7 @@ class Settings:
 
 #--------------------------- Data dependent values ----------------------------
     timeStep = 600 #Timestep in seconds
+    dstStartYear = 2019 # First year with daylight savings in the data and prediction files. Earlier files are on a regular grid in standard time (None = daylight savings in all years)
 
 #------------------------------ User Assumptions ------------------------------
     ppmCO2Out = 400 #Outdoor concentration of CO2 in ppm
@@ -19,6 +20,11 @@ class Settings:
     CO2Threshold = 700 #[ppm]
     mpcSteps = 12
     mpcTimeStep = 1200 # s (should be timeStep multiplied by a whole number)
+    mpcCO2Tolerance = None # ppm. Event-triggered re-optimization: the last plan is followed while the measured CO2 stays within this tolerance of its prediction. None = re-optimize every mpcTimeStep
+    mpcOccTolerance = 1 # Occupants. Event-triggered re-optimization also happens when the occupancy deviates more than this from the forecast
+    mpcRemoteSolve = False # True = solve the MPC problems on the APMonitor server (requires network), False = local solver
+    mpcWorkDir = None # Folder for the MPC solver working directories (created if missing), e.g. a tmpfs like "/dev/shm". None = system temp folder
+    resultChunkSteps = 1008 # Steps per chunk when results are streamed to disk (Model streamResults = True). 1008 = one week of 600 s steps
     
     
 """
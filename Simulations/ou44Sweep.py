@@ -0,0 +1,48 @@
+#-----------------------------------------------------------------------------
+#--------------------------------- USER INPUT --------------------------------
+#-----------------------------------------------------------------------------
+
+# Chose simulation start and end time (CET with daylight savings). Make sure the chosen date covers the chosen duration
+startTime = {"year": 2020, "month": 1, "day": 3, "hour": 0, "minute": 0, "second": 0}
+endTime = {"year": 2020, "month": 1, "day": 4, "hour": 0, "minute": 0, "second": 0}
+
+# Chose configuration file for simulation. The configuration file defines the elements (components, spaces and systems) included in the simulation.
+configFileName = "config_OU44.xlsx"
+
+# Chose wether the first part of the simulation duration should be discarded from the results and if so how much (in seconds). This may be done to reduce error from inaccurate initial conditions guesses.
+discardStartupPeriod = False
+StartupPeriodLength = 3600*3 #Seconds
+
+# Chose the runs of the sweep. All combinations of the listed keyword arguments are simulated, each in its own process.
+grid = {"damperControlType": ["MPC"],
+        "mpcW1": [0.01/(1000*3600), 0.02/(1000*3600), 0.05/(1000*3600)], # Weight of the energy cost [DKK]
+        "mpcW2": [0, 1], # Weight of the indoor CO2 impact [ppm*s*occ] (only ppm above threshold)
+        "mpcW3": [0]} # Weight of the CO2 emission from electricity usage [kg_CO2]
+# Runs that are not a full grid can be given as a list of keyword argument dicts instead
+cases = [{"damperControlType": "ruleSet"}, {"damperControlType": "PD"}, {"damperControlType": "schedule"}]
+
+# Number of parallel runs (None = number of processors)
+workers = None
+
+# To save the result table set save = True. Choose output file name.
+save = False
+name = 'OU44Sweep'
+
+# Ensure that the settings in Misc/settings.py are correct
+
+
+#-----------------------------------------------------------------------------
+#------------------------------- RUN SIMULATION ------------------------------
+#-----------------------------------------------------------------------------
+
+import os
+from Simulator.sweep import Sweep, expandGrid
+
+if __name__ == '__main__': # Required since the runs are started in separate processes
+    baseKwargs = {"configFile": configFileName, "startTimeInput": startTime, "endTimeInput": endTime,
+                  "discardStartup": discardStartupPeriod, "startupDuration": StartupPeriodLength}
+    sweep = Sweep(baseKwargs = baseKwargs, cases = expandGrid(grid) + cases, maxWorkers = workers)
+    results = sweep.run()
+    print(results)
+    if save:
+        results.to_csv(os.path.join(os.getcwd(), "Results", name + '.csv'), index=False)
@@ -0,0 +1,51 @@
+import os
+import copy
+import pickle
+import tempfile
+import numpy as np
+
+version = 1
+
+def getElementState(element): # Inputs, outputs and element.stateAttributes
+    state = {}
+    for attribute in ['input', 'output'] + getattr(element, 'stateAttributes', []):
+        if hasattr(element, attribute):
+            state[attribute] = copy.deepcopy(getattr(element, attribute))
+    if hasattr(element, 'getSolverState'): # Warm start of the MPC solver
+        state['solver'] = element.getSolverState()
+    return state
+
+# Connected elements and the result recorders hold references to the input/output dicts and lists, so saved values are copied into them in place
+def restore(current, saved): # Returns the value to assign
+    if isinstance(current, dict) and isinstance(saved, dict):
+        for key in saved:
+            current[key] = restore(current.get(key), saved[key])
+        return current
+    if isinstance(current, list) and isinstance(saved, list) and len(current) == len(saved):
+        current[:] = saved
+        return current
+    if isinstance(current, np.ndarray) and isinstance(saved, np.ndarray) and current.shape == saved.shape:
+        current[...] = saved
+        return current
+    return saved
+
+def setElementState(element, state): # Inverse of getElementState
+    state = copy.deepcopy(state) # The same state can be restored again (e.g. in several models)
+    for attribute in state:
+        if attribute == 'solver':
+            element.setSolverState(state[attribute])
+        else:
+            setattr(element, attribute, restore(getattr(element, attribute), state[attribute]))
+
+def saveCheckpoint(file, state): # Temporary file and rename (a crash keeps the previous checkpoint)
+    fd, tmpFile = tempfile.mkstemp(prefix='.tmp', dir=os.path.dirname(file))
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpFile, file)
+
+def loadCheckpoint(file):
+    with open(file, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != version:
+        raise ValueError(file + ' was saved by another version of the checkpoint format')
+    return state
@@ -0,0 +1,38 @@
+import os
+import hashlib
+import pickle
+import tempfile
+import pandas as pd
+
+version = 1
+
+def fileHash(file): # sha256 of the file content
+    sha = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+# The workbook is parsed once and stored as a hidden pickle next to it (".<name>.cache.pkl"), used while the content hash matches
+def readWorkbook(file): # {sheet name: DataFrame}
+    cacheFile = os.path.join(os.path.dirname(file), '.' + os.path.basename(file) + '.cache.pkl')
+    sha = fileHash(file)
+    try:
+        with open(cacheFile, 'rb') as f:
+            cache = pickle.load(f)
+        if cache['sha256'] == sha and cache['version'] == version:
+            return cache['sheets']
+    except Exception: # Missing, outdated or unreadable cache
+        pass
+
+    import openpyxl # Only needed when the workbook is parsed
+    openpyxl.reader.excel.warnings.simplefilter(action='ignore')
+    sheets = pd.read_excel(file, sheet_name=None) # One pass over the workbook for all sheets
+    try:
+        fd, tmpFile = tempfile.mkstemp(prefix='.tmp', dir=os.path.dirname(file))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'sha256': sha, 'version': version, 'sheets': sheets}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpFile, cacheFile) # Parallel runs (Sweep) never see a half written cache
+    except OSError: # Read-only data folder. Works without the cache
+        pass
+    return sheets
@@ -0,0 +1,29 @@
+import math
+
+# Dampers under ruleSet, schedule and constant control only take a few positions, so exp(-a*timeStep) of the CO2 step in
+# Spaces/buildingSpace.py is computed once per position instead of in every step
+class DecayTable: # Terms of the exact CO2 step of a space for each flow its damper can give
+    def __init__(self,
+                 vol = None,
+                 airInf = None,
+                 timeStep = None,
+                 ppmCO2Out = None,
+                 flows = None): # Ventilation flows [m^3/s] (damper position * maximum flow)
+        self.flows = sorted(set(flows))
+        self.entries = {}
+        for flow in self.flows:
+            a = flow / vol + airInf
+            self.entries[flow] = (a, a*ppmCO2Out, math.exp(-a*timeStep)) # a, flow part of b and decay factor of dC/dt = b - aC
+
+    def get(self, flow): # None for flows that are not in the table
+        return self.entries.get(flow)
+
+def damperFlows(space): # None if the controller has no fixed positions (PD and MPC control)
+    damper = space.inputSender.get("flowVenIn")
+    controller = getattr(damper, "inputSender", {}).get("posSignal")
+    if not hasattr(controller, "signalLevels") or not hasattr(damper, "flowMax"):
+        return None
+    levels = controller.signalLevels()
+    if levels == None:
+        return None
+    return [level * damper.flowMax for level in levels]
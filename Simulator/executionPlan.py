@@ -0,0 +1,47 @@
+class ExecutionPlan: # Step order from the connection graph (sender before reciever)
+    def __init__(self,
+                 elementDict = None):
+        self.elementDict = elementDict
+        self.stages = [] # Lists of elements without dependencies between them. Each stage only depends on earlier stages
+        self.stepCalls = [] # Bound doStep methods in execution order
+
+    def build(self):
+        elements = []
+        for subElementDict in self.elementDict:
+            for element in self.elementDict[subElementDict].values():
+                if hasattr(element, "doStep"):
+                    elements.append(element)
+        position = {id(element): idx for idx, element in enumerate(elements)}
+
+        # Dataflow graph. A delayed input reads the value of the previous step, so its reciever has to run before the sender
+        successors = [[] for element in elements]
+        nPredecessors = [0] * len(elements)
+        for reciever in elements:
+            for connect in getattr(reciever, "connection", []):
+                if id(connect["sender"]) not in position:
+                    continue
+                if connect["recieverProperty"] in getattr(reciever, "delayedInputs", []):
+                    first, second = position[id(reciever)], position[id(connect["sender"])]
+                else:
+                    first, second = position[id(connect["sender"])], position[id(reciever)]
+                successors[first].append(second)
+                nPredecessors[second] = nPredecessors[second] + 1
+
+        # Topological sort by levels (Kahn's algorithm). Elements keep the elementDict order within a stage
+        self.stages = []
+        stage = [idx for idx in range(len(elements)) if nPredecessors[idx] == 0]
+        nSorted = 0
+        while stage:
+            self.stages.append([elements[idx] for idx in stage])
+            nSorted = nSorted + len(stage)
+            nextStage = []
+            for idx in stage:
+                for successor in successors[idx]:
+                    nPredecessors[successor] = nPredecessors[successor] - 1
+                    if nPredecessors[successor] == 0:
+                        nextStage.append(successor)
+            stage = sorted(nextStage)
+        if nSorted != len(elements):
+            raise ValueError("The connection graph contains a cycle without a delayed input. No execution order exists")
+
+        self.stepCalls = [element.doStep for stage in self.stages for element in stage]
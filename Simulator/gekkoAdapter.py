@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import warnings
+
+# Reusing a GEKKO model between solves (Components/systemMPC.py) relies on gekko internals (working directory, model file and option handling). They are
+# only used with the gekko versions below. Other versions use the public API only and the MPC model is rebuilt for every solve
+supportedVersions = [(1, 3)] # (major, minor). Tested with gekko 1.3.2
+supported = None
+
+def reuseSupported(): # True if the MPC model can be kept between solves
+    global supported
+    if supported == None:
+        import gekko
+        version = gekko.__version__
+        try:
+            supported = tuple(int(part) for part in version.split('.')[:2]) in supportedVersions
+        except ValueError:
+            supported = False
+        if not supported:
+            warnings.warn('gekko ' + version + ' is not a tested version (' + ', '.join(str(major) + '.' + str(minor) + '.x' for major, minor in supportedVersions) + '). The MPC model is rebuilt for every solve.')
+    return supported
+
+def newModel(remote, prefix, workDir): # workDir: folder of the working directory of a reused model (None = temp folder)
+    from gekko import GEKKO
+    m = GEKKO(remote=remote)
+    if reuseSupported():
+        os.rmdir(m._path)
+        if workDir != None:
+            os.makedirs(workDir, exist_ok=True)
+        m._path = tempfile.mkdtemp(prefix=prefix, dir=workDir)
+        m.path = m._path
+    return m
+
+def removeModel(m): # Remove the working directory of the model
+    shutil.rmtree(m.path, ignore_errors=True)
+
+def modelFileKept(m): # True after the first solve of a reused model
+    return reuseSupported() and m._model == 'provided'
+
+def keepModelFile(m): # The next solves use the written model file (step data is in the csv file)
+    if reuseSupported():
+        m._model = 'provided'
+
+def clearSolverData(m, remote): # Remove the solver state of the previous solve of a reused model
+    if not reuseSupported():
+        return
+    if remote:
+        from gekko.apm import cmd
+        cmd(m._server, m._model_name, 'clear all')
+    else:
+        m.clear_data()
+
+def writeModelFile(m): # As the first solve does, kept for the next solves
+    m._build_model()
+    m._write_info() # Variable types (FV/MV/SV/CV), only written by the first solve
+    for vp in m._variables + m._parameters: # As after a solve: only values set later are passed in the csv file
+        vp.value.change = False
+    m._model = 'provided'
+
+def getSolverOptions(m): # Solver-updated options and CV bias of a reused model
+    if not reuseSupported():
+        return {'options': {}, 'bias': []}
+    from gekko.gk_global_options import global_options_inout
+    return {'options': {option: m.options.__dict__[option] for option in global_options_inout},
+            'bias': [variable.BIAS for variable in m._variables if variable.type == 'CV']}
+
+def setSolverOptions(m, state):
+    if not reuseSupported():
+        return
+    m.options.__dict__.update(state['options'])
+    for variable, bias in zip([variable for variable in m._variables if variable.type == 'CV'], state['bias']):
+        variable.BIAS = bias
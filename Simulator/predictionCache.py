@@ -0,0 +1,85 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from Simulator.timeIndex import TimeIndex
+
+# The CSV is parsed once, later runs memory-map the columns and only read the rows they slice. Each size and modification time
+# of the CSV gets its own cache folder, so a cache is never replaced while it is read
+class PredictionCache: # Binary copy of a prediction CSV (one .npy file per column) next to the CSV
+    version = 2
+
+    def __init__(self,
+                 file = None): # Path of the CSV file
+        self.file = file
+        self.cacheRoot = os.path.join(os.path.dirname(file), '.' + os.path.basename(file) + '.cache')
+        self.source = self.sourceStamp()
+        self.cacheDir = os.path.join(self.cacheRoot, str(self.source['size']) + '_' + str(self.source['mtime']) + '_v' + str(self.version))
+        self.meta = self.readMeta()
+        if self.meta == None:
+            self.build()
+            self.meta = self.readMeta()
+        self.columns = self.meta['columns']
+        self.nRows = self.meta['nRows']
+        self.timeIndex = TimeIndex(self.array('DateTime', epoch=True))
+
+    def sourceStamp(self):
+        stat = os.stat(self.file)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'version': self.version}
+
+    def readMeta(self): # Cache metadata or None if the cache is missing or outdated
+        try:
+            with open(os.path.join(self.cacheDir, 'meta.json')) as metaFile:
+                meta = json.load(metaFile)
+        except (OSError, ValueError):
+            return None
+        if meta.get('source') != self.source:
+            return None
+        return meta
+
+    def build(self): # Written to a temporary folder first (parallel runs never see a half written cache)
+        print("Building prediction cache for " + os.path.basename(self.file) + "...")
+        df = pd.read_csv(self.file)
+        os.makedirs(self.cacheRoot, exist_ok=True)
+        tmpDir = tempfile.mkdtemp(prefix='.tmp', dir=self.cacheRoot)
+        for idx, column in enumerate(df.columns):
+            values = df[column].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(tmpDir, str(idx) + '.npy'), values)
+        if 'DateTime' in df.columns:
+            np.save(os.path.join(tmpDir, 'epoch.npy'), TimeIndex.fromDateTime(df['DateTime']).keys)
+        with open(os.path.join(tmpDir, 'meta.json'), 'w') as metaFile:
+            json.dump({'source': self.source, 'columns': list(df.columns), 'nRows': len(df)}, metaFile)
+        try:
+            os.replace(tmpDir, self.cacheDir)
+        except OSError: # Another process got there first (same CSV, same cache)
+            shutil.rmtree(tmpDir, ignore_errors=True)
+        for name in os.listdir(self.cacheRoot): # Caches of earlier versions of the CSV (removal fails on Windows while another run still reads them)
+            path = os.path.join(self.cacheRoot, name)
+            if path == self.cacheDir or name.startswith('.tmp'):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def array(self, column, epoch=False): # Memory-mapped column (epoch = DateTime as integer epoch seconds)
+        fileName = 'epoch.npy' if epoch else str(self.columns.index(column)) + '.npy'
+        return np.load(os.path.join(self.cacheDir, fileName), mmap_mode='r')
+
+    def window(self, startIdx, endIdx, columns=None): # Rows startIdx to endIdx (both included, as DataFrame.loc)
+        if columns == None:
+            columns = self.columns
+        endIdx = min(endIdx, self.nRows-1)
+        data = {}
+        for column in columns:
+            values = self.array(column)[startIdx:endIdx+1]
+            data[column] = values.tolist() if values.dtype.kind == 'U' else np.array(values)
+        return pd.DataFrame(data, index=range(endIdx+1-startIdx), columns=columns)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+class ResultBuffer: # Preallocated (steps, nOutputs) results of one element category
+    def __init__(self,
+                 columns = None,
+                 steps = None,
+                 dtype = np.float64,
+                 prefix = None): # Read only results of the first steps, shared with another buffer (Model.fork)
+        self.columns = columns
+        self.steps = steps
+        self.prefix = prefix
+        self.firstStep = 0 if prefix is None else len(prefix) # Step of the first row of data
+        self.data = np.full((steps-self.firstStep, len(columns)), np.nan, dtype=dtype)
+        self.startIdx = 0 # First step included in the results (moved forward when the startup period is discarded)
+
+    def rows(self, nRows): # Copy of the first nRows rows of data, after the shared steps (if any)
+        if self.prefix is None:
+            return self.data[:nRows].copy()
+        return np.concatenate([self.prefix, self.data[:nRows]])
+
+    def sharedRows(self, step): # Read only steps before step, for a forked run (copied only if this buffer is a branch)
+        rows = self.rows(step-self.firstStep) if self.prefix is not None else self.data[:step].view()
+        rows.flags.writeable = False
+        return rows
+
+    def toDataFrame(self): # DataFrame view of the buffer (no copy)
+        data = self.data if self.prefix is None else np.concatenate([self.prefix, self.data]) # The shared steps are copied when the results of a branch are requested
+        return pd.DataFrame(data[self.startIdx:], index=range(self.startIdx, self.steps), columns=self.columns, copy=False)
@@ -0,0 +1,68 @@
+import os
+import json
+import glob
+import tempfile
+import numpy as np
+
+# The result buffers only have to hold one chunk and the finished chunks survive a crash. readResults() puts the chunks back together
+class ResultWriter: # Writes the results of a run to a folder in chunks of steps (one compressed .npz per chunk)
+    def __init__(self,
+                 directory = None,
+                 resultBuffers = None, # {element category: ResultBuffer}
+                 timeline = None, # Simulator/timeline.py
+                 chunkSteps = None,
+                 nChunks = 0, # Continue a run (Model.resume): chunks already written before the checkpoint are kept
+                 stepsWritten = 0):
+        self.directory = directory
+        self.resultBuffers = resultBuffers
+        self.timeline = timeline
+        self.chunkSteps = chunkSteps
+        self.nChunks = nChunks
+        self.stepsWritten = stepsWritten
+
+        os.makedirs(directory, exist_ok=True)
+        for file in glob.glob(os.path.join(directory, 'chunk_*.npz')): # Chunks of an earlier run with the same name (or written after the checkpoint)
+            if int(os.path.basename(file)[6:12]) >= nChunks:
+                os.remove(file)
+        self.writeMeta(complete=False)
+
+    def atomicWrite(self, file, write): # Temporary file and rename (a chunk is complete or missing)
+        fd, tmpFile = tempfile.mkstemp(prefix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmpFile, file)
+
+    def writeMeta(self, complete):
+        meta = {'columns': {key: list(self.resultBuffers[key].columns) for key in self.resultBuffers},
+                'steps': int(self.timeline.steps),
+                'chunkSteps': self.chunkSteps,
+                'stepsWritten': self.stepsWritten,
+                'complete': complete}
+        self.atomicWrite(os.path.join(self.directory, 'meta.json'), lambda f: f.write(json.dumps(meta).encode()))
+
+    def write(self, startStep, nSteps): # The first nSteps rows of the result buffers
+        if nSteps <= 0:
+            return
+        arrays = {'step': np.arange(startStep, startStep+nSteps),
+                  'DateTime': self.timeline.local[startStep:startStep+nSteps]} # Local wall clock [s since 1970]
+        for key in self.resultBuffers:
+            arrays[key] = self.resultBuffers[key].data[:nSteps]
+        file = os.path.join(self.directory, 'chunk_' + str(self.nChunks).zfill(6) + '.npz')
+        self.atomicWrite(file, lambda f: np.savez_compressed(f, **arrays))
+        self.nChunks = self.nChunks + 1
+        self.stepsWritten = startStep + nSteps
+        self.writeMeta(complete=False)
+
+    def getState(self): # Position of the writer, saved in checkpoints
+        return {'nChunks': self.nChunks, 'stepsWritten': self.stepsWritten}
+
+    def close(self):
+        self.writeMeta(complete=True)
+
+def readResults(directory): # {element category (or "step", "DateTime"): array over all written steps}
+    arrays = {}
+    for file in sorted(glob.glob(os.path.join(directory, 'chunk_*.npz'))):
+        with np.load(file) as chunk:
+            for key in chunk.files:
+                arrays.setdefault(key, []).append(chunk[key])
+    return {key: np.concatenate(arrays[key]) for key in arrays}
@@ -0,0 +1,34 @@
+import numpy as np
+
+def complexKeys(controllerIdx, values): # (controller, value) pairs, sorted by numpy with the real part first
+    keys = np.empty(np.shape(values), dtype=np.complex128)
+    keys.real = controllerIdx
+    keys.imag = values
+    return keys
+
+# The positions of all controllers are found with a single np.searchsorted call. Same result as scanning each table in order
+# (the last row with threshold <= CO2 wins)
+class RulesetTable: # Rulesets of several controllers stored as one sorted array
+    def __init__(self,
+                 rulesets = None): # One table per controller
+        keys = []
+        positions = []
+        self.first = np.zeros(len(rulesets), dtype=np.intp) # Index of the first row of each controller
+        for idx, ruleset in enumerate(rulesets):
+            table = np.array(ruleset, dtype=np.float64).reshape(-1, 2)
+            order = np.argsort(table[:, 0], kind='stable')
+            latest = np.maximum.accumulate(order) # Row that applies from each threshold: the latest row in table order among those with a lower or equal threshold
+            self.first[idx] = len(positions)
+            keys.extend(complexKeys(idx, table[order, 0]))
+            positions.extend(table[latest, 1])
+        self.keys = np.array(keys, dtype=np.complex128)
+        self.positions = np.array(positions, dtype=np.float64)
+        self.controllerIdx = np.arange(len(rulesets))
+
+    def evaluate(self, values, previous): # Positions for CO2 values (..., controllers)
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.keys) == 0:
+            return np.broadcast_to(previous, values.shape).copy()
+        row = np.searchsorted(self.keys, complexKeys(np.broadcast_to(self.controllerIdx, values.shape), values), side='right') - 1
+        applies = (row >= self.first) & ~np.isnan(values) # Controllers below all thresholds (or without a value) keep the previous position
+        return np.where(applies, self.positions[np.maximum(row, 0)], previous)
@@ -0,0 +1,64 @@
+import itertools
+import warnings
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from model import Model
+
+def expandGrid(grid): # All combinations of a dict of keyword argument lists
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+def runCase(modelKwargs): # Worker function. Only the objectives are sent back
+    kwargs = dict(modelKwargs)
+    for plot in ['createBuildingSpacePlots', 'createMPCPlots', 'createSystemPlots', 'createBuildingPlots', 'saveResults']:
+        kwargs[plot] = False
+    model = Model(**kwargs)
+    model.simulationSetup()
+    model.runSimulation()
+    model.calculateTotals()
+    model.clacAirKPI()
+    return model.getObjectives()
+
+class Sweep: # Parallel runs of a grid of Model keyword arguments, objectives in one table
+    def __init__(self,
+                 baseKwargs = None, # Keyword arguments shared by all runs (config file, start and end time etc.)
+                 grid = None, # Dict of keyword argument lists, e.g. {"damperControlType": ["MPC"], "mpcW1": [...], "mpcW2": [...]}
+                 cases = None, # Alternatively a list of keyword argument dicts
+                 maxWorkers = None): # Default is the number of processors
+        self.baseKwargs = baseKwargs if baseKwargs != None else {}
+        if cases == None:
+            cases = expandGrid(grid if grid != None else {})
+        self.cases = cases
+        self.maxWorkers = maxWorkers
+        self.results = None
+
+    def run(self):
+        print("Starting sweep of " + str(len(self.cases)) + " runs...")
+        objectives = [None] * len(self.cases)
+        with ProcessPoolExecutor(max_workers=self.maxWorkers) as executor:
+            futures = {}
+            for idx in range(len(self.cases)):
+                kwargs = dict(self.baseKwargs)
+                kwargs.update(self.cases[idx])
+                futures[executor.submit(runCase, kwargs)] = idx
+            nComplete = 0
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    objectives[idx] = future.result()
+                except Exception as error:
+                    warnings.warn("Sweep run " + str(self.cases[idx]) + " failed: " + repr(error))
+                    objectives[idx] = {'cost': np.nan, 'KPI': np.nan, 'CO2Emm': np.nan, 'failedSolves': np.nan}
+                nComplete = nComplete + 1
+                print("Sweep run " + str(nComplete) + "/" + str(len(self.cases)) + " complete")
+
+        rows = []
+        for idx in range(len(self.cases)):
+            row = dict(self.cases[idx])
+            row.update(objectives[idx])
+            rows.append(row)
+        self.results = pd.DataFrame(rows)
+        print("Sweep complete")
+        return self.results
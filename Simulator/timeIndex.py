@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+def epochSeconds(timeStamp): # Timezone aware datetime -> integer seconds since 1970-01-01 UTC
+    return int(timeStamp.timestamp())
+
+class TimeIndex: # Row lookup for a time series from its timestamps (integer epoch seconds)
+    def __init__(self,
+                 keys = None): # Epoch seconds of each row
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.stepSize = None
+        if len(self.keys) > 1:
+            diff = np.diff(self.keys)
+            if diff[0] > 0 and np.all(diff == diff[0]):
+                self.stepSize = int(diff[0]) # Regular grid: rows are found by offset arithmetic, O(1)
+        if self.stepSize == None: # Otherwise binary search, O(log n). Stable sort so duplicate timestamps resolve to the last row, as the string comparison loop did
+            self.order = np.argsort(self.keys, kind='stable')
+            self.sortedKeys = self.keys[self.order]
+
+    @classmethod
+    def fromDateTime(cls, dateTime): # DateTime column, e.g. "2020-01-06 00:00:00+00:00"
+        keys = pd.to_datetime(pd.Series(dateTime), utc=True).dt.tz_localize(None).to_numpy().astype('datetime64[s]').astype(np.int64)
+        return cls(keys)
+
+    def find(self, timeStamp): # Row of the timestamp or None if it is not in the series
+        key = epochSeconds(timeStamp)
+        if len(self.keys) == 0:
+            return None
+        if self.stepSize != None:
+            offset, remainder = divmod(key - int(self.keys[0]), self.stepSize)
+            if remainder == 0 and 0 <= offset < len(self.keys):
+                return int(offset)
+            return None
+        pos = int(np.searchsorted(self.sortedKeys, key, side='right')) - 1
+        if pos >= 0 and self.sortedKeys[pos] == key:
+            return int(self.order[pos])
+        return None
+
+    def window(self, startTime, endTime): # Start and end rows (both None if a timestamp is missing)
+        startIdx = self.find(startTime)
+        endIdx = self.find(endTime)
+        if startIdx == None or endIdx == None:
+            return None, None
+        return startIdx, endIdx
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzutc
+
+def epochSeconds(dateTimes): # Timezone naive DatetimeIndex -> int64 seconds since 1970-01-01
+    return dateTimes.to_numpy().astype('datetime64[s]').astype(np.int64)
+
+# The steps are equidistant in real (UTC) time and the timestamps are the local wall clock (daylight savings included) labelled as UTC,
+# as in the data and prediction files. Files of the years before dstStartYear are on a regular grid in standard time all year
+class Timeline: # Timestamps of the simulation steps
+    def __init__(self,
+                 startTime = None, # Local wall clock, tz-aware (labelled UTC as Model.startTime)
+                 endTime = None,
+                 timeStep = None, # timedelta
+                 timeZone = 'Europe/Copenhagen',
+                 dstStartYear = None): # First year with daylight savings. None = all years
+        self.timeZone = timeZone
+        self.dstStartWallClock = None
+        if dstStartYear != None:
+            self.dstStartWallClock = pd.Timestamp(dstStartYear, 1, 1)
+            dstStart = self.dstStartWallClock.tz_localize(timeZone)
+            self.standardOffset = dstStart.utcoffset() # UTC offset without daylight savings
+            self.dstStart = dstStart.tz_convert('UTC')
+        start = self.toUTC(startTime)
+        end = self.toUTC(endTime)
+        self.steps = int((end-start) // timeStep) + 1
+
+        utc = pd.date_range(start, periods=self.steps, freq=timeStep)
+        local = utc.tz_convert(timeZone).tz_localize(None)
+        if self.dstStartWallClock != None:
+            local = local.where(utc >= self.dstStart, (utc + self.standardOffset).tz_localize(None))
+        self.utc = epochSeconds(utc.tz_localize(None)) # [s] Real time of each step
+        self.local = epochSeconds(local) # [s] Local wall clock of each step
+        self.dateTimes = local.tz_localize(tzutc()) # Local wall clock as timestamps (DateTime column of results and data files)
+        self.timeOfDay = self.local % 86400 # [s] since local midnight
+        self.weekday = (self.local // 86400 + 3) % 7 # Monday = 0 (1970-01-01 was a Thursday)
+
+    def stepIndex(self, wallTime): # First step at or after a local wall clock time
+        return int(np.searchsorted(self.utc, int(self.toUTC(wallTime).timestamp())))
+
+    def toUTC(self, wallTime): # Local wall clock -> UTC
+        # The repeated hour when daylight savings ends is read as winter time and the skipped hour when it starts is moved forward
+        wallTime = pd.Timestamp(wallTime.replace(tzinfo=None))
+        if self.dstStartWallClock != None and wallTime < self.dstStartWallClock:
+            return (wallTime - self.standardOffset).tz_localize('UTC')
+        return wallTime.tz_localize(self.timeZone, ambiguous=False, nonexistent='shift_forward').tz_convert('UTC')
@@ -0,0 +1,329 @@
+import math
+import numpy as np
+
+from Misc.settings import Settings
+from Simulator.rulesetTable import RulesetTable, complexKeys
+
+# np.exp may differ from math.exp in the last bit. exactMath gives results identical to the object engine
+def exactExp(x): # Element-wise math.exp
+    return np.fromiter(map(math.exp, x.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
+
+def sameValues(x, y): # Element-wise equality where NaN equals NaN (controllers that have not acted yet)
+    return (x == y) | (np.isnan(x) & np.isnan(y))
+
+def exactPow(x, exponent): # Element-wise python power (see exactExp)
+    return np.fromiter((value**exponent for value in x.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
+
+# The wired elementDict is compiled into NumPy arrays (one entry per element) and a connection index (which
+# array position feeds which input). Each step then advances all elements of a type at once. MPC is not supported.
+# All states have a leading scenario axis, so N scenarios sharing the configuration can advance together (N = 1 for a normal run).
+# Event-driven mode: after a step, runs of steps with the same occupancy and damper positions are advanced at once, since the CO2 of a space then follows
+# the exact solution of dC/dt = b - aC (C = (b + c*exp(-a*k*timeStep))/a after k steps). The damper positions along the run are checked with the controllers,
+# and the run is cut at the first step where a position would change. Every step still gets its output row
+class VectorEngine: # Struct-of-arrays alternative to the per-object loop in Model.runSimulation
+    supportedControlTypes = ['ruleSet', 'PD', 'schedule', 'constant']
+    outputCategories = ["Occupancy", "Sensor", "Controller", "Damper", "BuildingSpace", "Fan"]
+    scenarioSettings = ['airInfSpace', 'CO2GenPerson', 'CO2Threshold']
+
+    minJump = 8 # Steps looked ahead when a run of constant inputs starts. Doubled every time the whole look-ahead is constant
+
+    def __init__(self, model, eventDriven = False, exactMath = False):
+        self.model = model
+        self.steps = model.steps
+        self.timeStep = Settings.timeStep
+        self.nScenarios = 1
+        self.eventDriven = eventDriven
+        self.exactMath = exactMath
+        self.exp = exactExp if exactMath else np.exp
+        self.power = exactPow if exactMath else np.power
+
+    def senderIndex(self, element, inputName, index): # Sender array position of the element connected to an input
+        return index[element.inputSender[inputName].id]
+
+    def compile(self):
+        elementDict = self.model.elementDict
+        self.occupancyList = list(elementDict["Occupancy"].values())
+        self.sensorList = list(elementDict["Sensor"].values())
+        self.controllerList = list(elementDict["Controller"].values())
+        self.damperList = list(elementDict["Damper"].values())
+        self.spaceList = list(elementDict["BuildingSpace"].values())
+        self.fanList = list(elementDict["Fan"].values())
+
+        occupancyIdx = {occupancy.id: idx for idx, occupancy in enumerate(self.occupancyList)}
+        sensorIdx = {sensor.id: idx for idx, sensor in enumerate(self.sensorList)}
+        controllerIdx = {controller.id: idx for idx, controller in enumerate(self.controllerList)}
+        damperIdx = {damper.id: idx for idx, damper in enumerate(self.damperList)}
+        spaceIdx = {space.id: idx for idx, space in enumerate(self.spaceList)}
+
+        # Occupancy (all schedules are known in advance)
+        self.occupancySchedule = np.zeros((self.steps, len(self.occupancyList)))
+        for idx, occupancy in enumerate(self.occupancyList):
+            self.occupancySchedule[:, idx] = occupancy.schedule[occupancy.stepCount:occupancy.stepCount+self.steps]
+
+        # Sensors
+        self.sensorSpace = np.array([self.senderIndex(sensor, "value", spaceIdx) for sensor in self.sensorList], dtype=np.intp)
+        self.sensorFirstStep = all(sensor.firstStep for sensor in self.sensorList)
+
+        # Controllers
+        controlTypes = set(controller.controlType for controller in self.controllerList)
+        if len(controlTypes) > 1:
+            raise ValueError('The vectorized engine requires a single control type for all controllers')
+        self.controlType = controlTypes.pop() if controlTypes else None
+        self.controllerSensor = np.array([self.senderIndex(controller, "inputValue", sensorIdx) for controller in self.controllerList], dtype=np.intp)
+        self.initialControllerSignal = np.array([np.nan if controller.output["outputSignal"] is None else controller.output["outputSignal"] for controller in self.controllerList], dtype=np.float64)
+        self.initialControllerPrevCO2 = np.array([controller.prevCO2 for controller in self.controllerList], dtype=np.float64)
+        self.controllerP = np.array([controller.P for controller in self.controllerList], dtype=np.float64)
+        self.controllerD = np.array([controller.D for controller in self.controllerList], dtype=np.float64)
+        self.rulesetTable = RulesetTable(rulesets=[controller.ruleset for controller in self.controllerList])
+        if self.controlType == 'schedule':
+            self.scheduleSignal = np.array([controller.scheduleSignal[controller.step:controller.step+self.steps] for controller in self.controllerList]).T
+
+        # Dampers
+        self.damperController = np.array([self.senderIndex(damper, "posSignal", controllerIdx) for damper in self.damperList], dtype=np.intp)
+        self.damperFlowMax = np.array([damper.flowMax for damper in self.damperList], dtype=np.float64)
+
+        # Building spaces
+        self.spaceVol = np.array([space.vol for space in self.spaceList], dtype=np.float64)
+        self.spaceOccupancy = np.array([self.senderIndex(space, "occupants", occupancyIdx) for space in self.spaceList], dtype=np.intp)
+        self.spaceDamper = np.array([self.senderIndex(space, "flowVenIn", damperIdx) for space in self.spaceList], dtype=np.intp)
+        self.spaceFirstStep = all(space.firstStep for space in self.spaceList)
+        self.initialPpmCO2 = np.array([Settings.ppmCO2BuildingInitial if space.output["ppmCO2"] is None else space.output["ppmCO2"] for space in self.spaceList], dtype=np.float64)
+        self.spaceIdx = np.arange(len(self.spaceList))
+        levelSpace = [] # Damper flows in the decay tables of the spaces (Simulator/decayTable.py) as one sorted array of (space, flow) keys. Decay factors per scenario in setScenarios
+        levelFlow = []
+        for idx, space in enumerate(self.spaceList):
+            if space.decayTable != None:
+                levelSpace.extend([idx] * len(space.decayTable.flows))
+                levelFlow.extend(space.decayTable.flows)
+        self.levelSpace = np.array(levelSpace, dtype=np.intp)
+        self.levelFlow = np.array(levelFlow, dtype=np.float64)
+        self.levelKeys = complexKeys(self.levelSpace, self.levelFlow) # Sorted, since the spaces are in order and the table flows are sorted
+
+        # Fans (padded damper index, padding points to a zero flow so sums are added in the same order as Fan.doStep)
+        nPartial = max([len(fan.inputSender["flow"]) for fan in self.fanList], default=0)
+        self.fanDamper = np.full((len(self.fanList), nPartial), len(self.damperList), dtype=np.intp)
+        for idx, fan in enumerate(self.fanList):
+            for row in range(len(fan.inputSender["flow"])):
+                self.fanDamper[idx, row] = damperIdx[fan.inputSender["flow"][row].id]
+        self.fanCoefficients = np.array([[fan.c1, fan.c2, fan.c3, fan.c4, fan.c5] for fan in self.fanList], dtype=np.float64).reshape(-1, 5)
+        self.fanFlowMax = np.array([fan.flowMax for fan in self.fanList], dtype=np.float64)
+        self.fanWMax = np.array([fan.WMax for fan in self.fanList], dtype=np.float64)
+        self.initialFanEnergy = np.array([fan.output["Energy"] for fan in self.fanList], dtype=np.float64)
+
+        self.setScenarios([{}])
+
+    # Scenario dicts may contain 'occupancy' (DataFrame with a column per space id, or a (steps, nOccupancy) array) and Settings overrides (scenarioSettings)
+    def setScenarios(self, scenarios):
+        self.nScenarios = len(scenarios)
+        self.occ = np.zeros((self.nScenarios, self.steps, len(self.occupancyList)))
+        self.spaceAirInf = np.zeros((self.nScenarios, len(self.spaceList)))
+        self.spaceCO2GenPerson = np.zeros((self.nScenarios, len(self.spaceList)))
+        self.CO2Threshold = np.zeros(self.nScenarios)
+        for scenario in range(self.nScenarios):
+            for key in scenarios[scenario]:
+                if key != 'occupancy' and key not in self.scenarioSettings:
+                    raise ValueError("Unknown scenario setting '" + key + "'")
+            occupancy = scenarios[scenario].get('occupancy')
+            if occupancy is None:
+                self.occ[scenario] = self.occupancySchedule
+            elif hasattr(occupancy, 'columns'):
+                for idx, element in enumerate(self.occupancyList):
+                    self.occ[scenario, :, idx] = np.asarray(occupancy[element.containedIn], dtype=np.float64)[:self.steps]
+            else:
+                self.occ[scenario] = occupancy
+            self.spaceAirInf[scenario] = scenarios[scenario].get('airInfSpace', [space.airInf for space in self.spaceList])
+            self.spaceCO2GenPerson[scenario] = scenarios[scenario].get('CO2GenPerson', [space.CO2GenPerson for space in self.spaceList])
+            self.CO2Threshold[scenario] = scenarios[scenario].get('CO2Threshold', Settings.CO2Threshold)
+        self.levelDecay = self.exp(-(self.levelFlow / self.spaceVol[self.levelSpace] + self.spaceAirInf[:, self.levelSpace])*self.timeStep) # (nScenarios, levels)
+        self.occupancyChanges = np.flatnonzero(np.any(self.occ[:, 1:] != self.occ[:, :-1], axis=(0, 2))) + 1 # Steps where any occupancy differs from the step before
+
+    def controllerSignals(self, step, co2): # Outputs from step on for the CO2 (nScenarios, nSteps, nControllers) measured
+        # and assuming the outputs did not change in between (exact for one step)
+        previous = self.controllerSignal[:, np.newaxis]
+        if self.controlType == 'ruleSet':
+            return self.rulesetTable.evaluate(co2, previous)
+        elif self.controlType == 'PD':
+            threshold = 573
+            prevCO2 = np.concatenate([self.controllerPrevCO2[:, np.newaxis], co2[:, :-1]], axis=1)
+            p = self.controllerP * (co2-threshold)
+            d = self.controllerD * (co2 - prevCO2) / Settings.timeStep
+            return np.minimum(1, np.maximum(0, p+d))
+        elif self.controlType == 'schedule':
+            return np.broadcast_to(self.scheduleSignal[step:step+co2.shape[1]], co2.shape)
+        elif self.controlType == 'constant':
+            return np.full(co2.shape, 0.33)
+        return np.broadcast_to(previous, co2.shape)
+
+    def controllerStep(self, step, sensorValue):
+        co2 = sensorValue[:, self.controllerSensor]
+        self.controllerSignal = self.controllerSignals(step, co2[:, np.newaxis])[:, 0]
+        if self.controlType == 'PD':
+            self.controllerPrevCO2 = co2
+
+    def decayFactors(self, flowVenIn, a): # exp(-a*timeStep), from the decay tables where possible
+        if len(self.levelKeys) == 0:
+            return self.exp(-a*self.timeStep)
+        keys = complexKeys(np.broadcast_to(self.spaceIdx, flowVenIn.shape), flowVenIn)
+        idx = np.minimum(np.searchsorted(self.levelKeys, keys), len(self.levelKeys)-1)
+        found = self.levelKeys[idx] == keys
+        decay = np.take_along_axis(self.levelDecay, idx, axis=1)
+        if not found.all():
+            decay[~found] = self.exp(-a[~found]*self.timeStep)
+        return decay
+
+    def spaceStep(self, occupants, flowVenIn):
+        occGen = occupants * self.spaceCO2GenPerson * 1000000 / self.spaceVol
+        flow = flowVenIn / self.spaceVol + self.spaceAirInf
+        a = flow
+        b = occGen + flow*Settings.ppmCO2Out
+        c = self.ppmCO2*a-b
+        if self.lastFlowVenIn is None or not np.array_equal(flowVenIn, self.lastFlowVenIn): # The damper positions mostly stay the same from step to step
+            self.lastDecay = self.decayFactors(flowVenIn, a)
+            self.lastFlowVenIn = flowVenIn
+        self.ppmCO2 = (b + c*self.lastDecay)/a
+
+    def fanStep(self, damperFlow):
+        partialFlow = np.concatenate([damperFlow, np.zeros((self.nScenarios, 1))], axis=1)[:, self.fanDamper]
+        if self.exactMath: # Added in the same order as Fan.doStep
+            flow = np.zeros((self.nScenarios, len(self.fanList)))
+            for row in range(partialFlow.shape[2]):
+                flow = flow + partialFlow[:, :, row]
+        else:
+            flow = np.sum(partialFlow, axis=2)
+        fFlow = flow / self.fanFlowMax
+        c = self.fanCoefficients
+        fpl = c[:, 0] + c[:, 1]*fFlow + c[:, 2]*self.power(fFlow, 2) + c[:, 3]*self.power(fFlow, 3) + c[:, 4]*self.power(fFlow, 4)
+        W = fpl * self.fanWMax
+        self.fanEnergy = self.fanEnergy + W * Settings.timeStep
+        return W
+
+    # outputs: (nScenarios, steps, nOutputs) arrays per category. Without outputs the model result buffers are filled and the element objects updated
+    def run(self, outputs = None):
+        writeBack = outputs is None
+        if writeBack:
+            outputs = {key: self.model.resultBuffers[key].data[np.newaxis] for key in self.outputCategories}
+        occupancyOutputs = outputs["Occupancy"]
+        sensorOutputs = outputs["Sensor"]
+        controllerOutputs = outputs["Controller"]
+        damperOutputs = outputs["Damper"]
+        buildingSpaceOutputs = outputs["BuildingSpace"]
+        fanOutputs = outputs["Fan"]
+
+        nScenarios = self.nScenarios
+        self.ppmCO2 = np.tile(self.initialPpmCO2, (nScenarios, 1))
+        self.controllerSignal = np.tile(self.initialControllerSignal, (nScenarios, 1))
+        self.controllerPrevCO2 = np.tile(self.initialControllerPrevCO2, (nScenarios, 1))
+        self.fanEnergy = np.tile(self.initialFanEnergy, (nScenarios, 1))
+        self.lastFlowVenIn = None
+
+        firstStep = self.spaceFirstStep
+        window = self.minJump
+        step = 0
+        while step < self.steps:
+            self.model.simTimerUpdate(step)
+            occupants = self.occ[:, step]
+            if step == 0 and self.sensorFirstStep:
+                sensorValue = np.full((nScenarios, len(self.sensorList)), float(Settings.ppmCO2BuildingInitial))
+            else:
+                sensorValue = self.ppmCO2[:, self.sensorSpace]
+            previousSignal = self.controllerSignal
+            self.controllerStep(step, sensorValue)
+            damperFlow = self.controllerSignal[:, self.damperController] * self.damperFlowMax
+            if firstStep:
+                self.ppmCO2 = np.full((nScenarios, len(self.spaceList)), float(Settings.ppmCO2BuildingInitial))
+                firstStep = False
+            else:
+                self.spaceStep(occupants[:, self.spaceOccupancy], damperFlow[:, self.spaceDamper])
+            W = self.fanStep(damperFlow)
+
+            # Store data after running step
+            occupancyOutputs[:, step] = occupants
+            sensorOutputs[:, step] = sensorValue
+            controllerOutputs[:, step] = self.controllerSignal
+            damperOutputs[:, step] = damperFlow
+            buildingSpaceOutputs[:, step] = self.ppmCO2
+            fanOutputs[:, step, 0::2] = W
+            fanOutputs[:, step, 1::2] = self.fanEnergy
+
+            nSteps = 0
+            if self.eventDriven and step > 0 and np.all(sameValues(self.controllerSignal, previousSignal)): # Damper positions that just changed (e.g. PD control) are not tried
+                idx = np.searchsorted(self.occupancyChanges, step, side='right')
+                runEnd = self.occupancyChanges[idx] if idx < len(self.occupancyChanges) else self.steps
+                lookAhead = min(window, runEnd-step-1)
+                if lookAhead > 0:
+                    nSteps, jumpSensorValue = self.jump(step, lookAhead, occupants, damperFlow, W, outputs)
+                    if nSteps > 0:
+                        sensorValue = jumpSensorValue
+                    window = window*2 if nSteps == lookAhead else self.minJump
+            step = step + 1 + nSteps
+
+        if writeBack:
+            self.writeBack(occupants[0], sensorValue[0], damperFlow[0], W[0])
+
+    def jump(self, step, nSteps, occupants, damperFlow, W, outputs): # Advance up to nSteps steps with the occupancy and damper flows of step
+        # Returns the number of steps advanced (cut where a controller would change its output) and the sensor values of the last of them
+        jumpSteps = np.arange(1, nSteps+1)
+        occGen = occupants[:, self.spaceOccupancy] * self.spaceCO2GenPerson * 1000000 / self.spaceVol
+        flow = damperFlow[:, self.spaceDamper] / self.spaceVol + self.spaceAirInf
+        a = flow[:, np.newaxis]
+        b = (occGen + flow*Settings.ppmCO2Out)[:, np.newaxis]
+        c = self.ppmCO2[:, np.newaxis]*a-b
+        ppmCO2 = (b + c*self.exp(-a*(jumpSteps*self.timeStep)[:, np.newaxis]))/a # (nScenarios, nSteps, nSpaces)
+        sensorValue = np.concatenate([self.ppmCO2[:, np.newaxis], ppmCO2[:, :-1]], axis=1)[:, :, self.sensorSpace]
+        signals = self.controllerSignals(step+1, sensorValue[:, :, self.controllerSensor])
+        constant = np.all(sameValues(signals, self.controllerSignal[:, np.newaxis]), axis=(0, 2))
+        nSteps = nSteps if constant.all() else int(np.argmin(constant))
+        if nSteps == 0:
+            return 0, None
+
+        rows = slice(step+1, step+1+nSteps)
+        for simCount in range(step+1, step+1+nSteps):
+            self.model.simTimerUpdate(simCount)
+        energySteps = np.broadcast_to((W * Settings.timeStep)[:, np.newaxis], (self.nScenarios, nSteps, len(self.fanList)))
+        fanEnergy = np.cumsum(np.concatenate([self.fanEnergy[:, np.newaxis], energySteps], axis=1), axis=1)[:, 1:] # Sequential sum (same order as fanStep)
+        outputs["Occupancy"][:, rows] = self.occ[:, rows]
+        outputs["Sensor"][:, rows] = sensorValue[:, :nSteps]
+        outputs["Controller"][:, rows] = self.controllerSignal[:, np.newaxis]
+        outputs["Damper"][:, rows] = damperFlow[:, np.newaxis]
+        outputs["BuildingSpace"][:, rows] = ppmCO2[:, :nSteps]
+        outputs["Fan"][:, rows, 0::2] = W[:, np.newaxis]
+        outputs["Fan"][:, rows, 1::2] = fanEnergy
+
+        self.ppmCO2 = ppmCO2[:, nSteps-1]
+        self.fanEnergy = fanEnergy[:, -1]
+        if self.controlType == 'PD':
+            self.controllerPrevCO2 = sensorValue[:, nSteps-1, self.controllerSensor]
+        return nSteps, sensorValue[:, nSteps-1]
+
+    def writeBack(self, occupants, sensorValue, damperFlow, W): # Element objects left as the per-object path leaves them
+        nSteps = self.steps
+        for idx, occupancy in enumerate(self.occupancyList):
+            occupancy.output["occupants"] = occupants[idx]
+            occupancy.stepCount = occupancy.stepCount + nSteps
+        for idx, sensor in enumerate(self.sensorList):
+            sensor.input["value"] = sensor.output["value"] = sensorValue[idx]
+            sensor.firstStep = False
+        for idx, controller in enumerate(self.controllerList):
+            controller.input["inputValue"] = sensorValue[self.controllerSensor[idx]]
+            controller.output["outputSignal"] = self.controllerSignal[0, idx]
+            controller.prevCO2 = self.controllerPrevCO2[0, idx]
+            controller.step = controller.step + nSteps
+        for idx, damper in enumerate(self.damperList):
+            damper.output["flow"] = damperFlow[idx]
+        for idx, space in enumerate(self.spaceList):
+            space.output["ppmCO2"] = self.ppmCO2[0, idx]
+            space.firstStep = False
+        for idx, fan in enumerate(self.fanList):
+            fan.output["W"] = W[idx]
+            fan.output["Energy"] = self.fanEnergy[0, idx]
+
+    def airKPI(self, outputs, startIdx = 0): # KPI of Model.clacAirKPI for every scenario, using the scenario CO2 threshold
+        ppmCO2 = outputs["BuildingSpace"][:, startIdx:]
+        occupants = outputs["Occupancy"][:, startIdx:][:, :, self.spaceOccupancy]
+        threshold = self.CO2Threshold[:, np.newaxis, np.newaxis]
+        impact = np.where(ppmCO2 > threshold, (ppmCO2-threshold) * Settings.timeStep * occupants, 0)
+        KPIspace = np.cumsum(impact, axis=1)[:, -1] # Sequential sum (same order as the loop in clacAirKPI)
+        KPI = np.zeros(self.nScenarios)
+        for idx in range(len(self.spaceList)):
+            KPI = KPI + KPIspace[:, idx]
+        return KPI
@@ -23,7 +23,9 @@ class BuildingSpace:
         self.rhoCO2 = Settings.rhoCO2
         self.CO2GenPerson = Settings.CO2GenPerson
         
+        self.decayTable = None # Simulator/decayTable.py, set up by the model when the damper positions are known in advance
         self.firstStep = True
+        self.stateAttributes = ["firstStep"] # Saved in checkpoints with the inputs and outputs (Simulator/checkpoint.py)
         
         self.input = {"occupants": None,
                       "flowVenIn": None,
@@ -40,17 +42,23 @@ class BuildingSpace:
             self.firstStep = False
         else:
             occGen = self.input["occupants"] * self.CO2GenPerson * 1000000 / self.vol
-            flow = self.input["flowVenIn"] / self.vol + self.airInf
+            entry = self.decayTable.get(self.input["flowVenIn"]) if self.decayTable != None else None
             
             #A differential equation of type dy/dt=b-ay has the general solution y=(b+ce^(-at))/a. This solution is used to find the co2 concentration (y) at time (t) when y(0) is known:
-            a = flow
-            b = occGen + flow*Settings.ppmCO2Out
+            if entry != None: # Damper position from the precomputed table
+                a, bFlow, decay = entry
+                b = occGen + bFlow
+            else:
+                flow = self.input["flowVenIn"] / self.vol + self.airInf
+                a = flow
+                b = occGen + flow*Settings.ppmCO2Out
+                t1 = self.timeStep
+                decay = math.exp(-a*t1)
             
             #c at t=0 is c=y(0)-b/a
             c = self.output["ppmCO2"]*a-b
             
-            t1 = self.timeStep
-            y1 = (b + c*math.exp(-a*t1))/a
+            y1 = (b + c*decay)/a
             self.output["ppmCO2"] = y1
             
             
@@ -0,0 +1,46 @@
+# Shared setup of the regression tests in this folder. Run them from the project folder (VentilationSim):
+#     python -m unittest discover -s Tests -p "test*.py"
+import os
+import sys
+import unittest
+
+projectPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if projectPath not in sys.path:
+    sys.path.insert(0, projectPath)
+
+from model import Model
+
+powerFile = os.path.join(projectPath, 'Misc', 'DataProcessing', 'PowerPredictions', 'power_600s.csv')
+occPredictionFile = os.path.join(projectPath, 'Misc', 'DataProcessing', 'OccPredictions', 'config_OU44_600s_NormalDivOcc.csv')
+
+def requireProject(predictions = False): # Skip the test if the model can not find its data. predictions: the occupancy predictions are needed (MPC)
+    if os.path.basename(projectPath) != 'VentilationSim':
+        raise unittest.SkipTest('The project folder must be named VentilationSim')
+    for file in [powerFile] + ([occPredictionFile] if predictions else []):
+        if not os.path.exists(file):
+            raise unittest.SkipTest('Missing prediction file ' + file + ' (see README.txt)')
+    os.makedirs(os.path.join(projectPath, 'Results'), exist_ok = True) # Checkpoints and streamed results
+    os.chdir(projectPath)
+
+def timeInput(year, month, day, hour = 0, minute = 0):
+    return {"year": year, "month": month, "day": day, "hour": hour, "minute": minute, "second": 0}
+
+def ou44Arguments(days = 1, hours = 0, **arguments): # Model arguments of an OU44 run starting 2020-01-06 (Monday)
+    defaults = {'configFile': 'config_OU44.xlsx', 'startTimeInput': timeInput(2020, 1, 6), 'endTimeInput': timeInput(2020, 1, 6+days, hours),
+                'damperControlType': 'ruleSet', 'mpcW1': 0.02/(1000*3600), 'mpcW2': 1, 'mpcW3': 0}
+    defaults.update(arguments)
+    return defaults
+
+def ou44Model(days = 1, hours = 0, **arguments):
+    return Model(**ou44Arguments(days, hours, **arguments))
+
+def runModel(model): # Set up, simulate and calculate the objectives of a model
+    model.simulationSetup()
+    model.runSimulation()
+    model.calculateTotals()
+    model.clacAirKPI()
+    return model
+
+def results(model): # {element category: array} of the simulation results (without the time stamps)
+    model.getSimResults()
+    return {key: model.simResults[key].to_numpy() for key in model.simResults if key != 'DateTime'}
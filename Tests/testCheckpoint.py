@@ -0,0 +1,55 @@
+import os
+import unittest
+import numpy as np
+from projectSetup import projectPath, requireProject, ou44Model, runModel, results
+
+class TestCheckpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def tearDown(self): # Checkpoint of a failed test
+        file = os.path.join(projectPath, 'Results', 'testCheckpoint_checkpoint.pkl')
+        if os.path.exists(file):
+            os.remove(file)
+        
+    def crash(self, model, nSteps): # Make the run of a model fail after nSteps steps
+        stepCalls = model.executionPlan.stepCalls
+        lastCall = stepCalls[-1]
+        count = [0]
+        def crashingCall():
+            count[0] = count[0] + 1
+            if count[0] > nSteps:
+                raise RuntimeError('Crash')
+            lastCall()
+        stepCalls[-1] = crashingCall
+        
+    def testResume(self): # A run resumed from its last checkpoint gives the results of an uninterrupted run
+        for damperControlType in ['ruleSet', 'PD']:
+            model = ou44Model(days = 2, damperControlType = damperControlType, outputName = 'testCheckpoint', checkpointSteps = 50)
+            model.simulationSetup()
+            self.crash(model, 130)
+            with self.assertRaises(RuntimeError):
+                model.runSimulation()
+            self.assertTrue(os.path.exists(model.checkpointFile()))
+            
+            resumed = ou44Model(days = 2, damperControlType = damperControlType, outputName = 'testCheckpoint', checkpointSteps = 50)
+            resumed.simulationSetup()
+            resumed.resume()
+            resumed.calculateTotals()
+            resumed.clacAirKPI()
+            self.assertFalse(os.path.exists(resumed.checkpointFile()))
+            
+            reference = runModel(ou44Model(days = 2, damperControlType = damperControlType))
+            resumedResults = results(resumed)
+            referenceResults = results(reference)
+            for key in referenceResults:
+                np.testing.assert_array_equal(resumedResults[key], referenceResults[key], err_msg = key)
+            self.assertEqual(resumed.KPI, reference.KPI)
+            
+    def testEngine(self):
+        with self.assertRaises(ValueError):
+            ou44Model(simEngine = 'vectorized', checkpointSteps = 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import projectSetup # Project folder on the module path
+from Simulator.configCache import readWorkbook
+
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, 'config.xlsx')
+        self.cacheFile = os.path.join(self.directory, '.config.xlsx.cache.pkl')
+        
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+        
+    def writeWorkbook(self, value):
+        with pd.ExcelWriter(self.file) as writer:
+            pd.DataFrame({'id': ['Space1', 'Space2'], 'vol': [value, 2.5]}).to_excel(writer, sheet_name = 'BuildingSpace', index = False)
+            pd.DataFrame({'id': ['Fan1']}).to_excel(writer, sheet_name = 'Fan', index = False)
+            
+    def testCache(self): # The workbook is parsed once and parsed again when its content changes
+        self.writeWorkbook(1.0)
+        sheets = readWorkbook(self.file)
+        self.assertEqual(list(sheets), ['BuildingSpace', 'Fan'])
+        self.assertTrue(os.path.exists(self.cacheFile))
+        modified = os.path.getmtime(self.cacheFile)
+        cached = readWorkbook(self.file)
+        self.assertEqual(os.path.getmtime(self.cacheFile), modified)
+        for sheet in sheets:
+            pd.testing.assert_frame_equal(cached[sheet], sheets[sheet])
+        
+        self.writeWorkbook(4.0)
+        self.assertEqual(list(readWorkbook(self.file)['BuildingSpace']['vol']), [4.0, 2.5])
+        
+    def testBrokenCache(self): # An unreadable cache is replaced
+        self.writeWorkbook(1.0)
+        with open(self.cacheFile, 'wb') as f:
+            f.write(b'broken')
+        self.assertEqual(list(readWorkbook(self.file)['BuildingSpace']['vol']), [1.0, 2.5])
+        self.assertEqual(list(readWorkbook(self.file)['BuildingSpace']['vol']), [1.0, 2.5])
+
+if __name__ == '__main__':
+    unittest.main()
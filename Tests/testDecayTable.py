@@ -0,0 +1,41 @@
+import math
+import unittest
+import numpy as np
+from projectSetup import requireProject, ou44Model, results
+from Simulator.decayTable import DecayTable, damperFlows
+
+class TestDecayTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def testEntries(self):
+        table = DecayTable(vol = 100, airInf = 1e-5, timeStep = 600, ppmCO2Out = 400, flows = [0.1, 0, 0.1])
+        self.assertEqual(table.flows, [0, 0.1])
+        a = 0.1/100 + 1e-5
+        self.assertEqual(table.get(0.1), (a, a*400, math.exp(-a*600)))
+        self.assertEqual(table.get(0.05), None)
+        
+    def testDamperFlows(self): # Tables for the control types with a fixed set of damper positions only
+        for damperControlType, fixed in [('ruleSet', True), ('schedule', True), ('constant', True), ('PD', False)]:
+            model = ou44Model(damperControlType = damperControlType)
+            model.simulationSetup()
+            for space in model.elementDict['BuildingSpace'].values():
+                self.assertEqual(damperFlows(space) != None, fixed, damperControlType)
+                self.assertEqual(space.decayTable != None, fixed, damperControlType)
+                
+    def testSameResults(self): # The object engine gives the same results with and without the tables
+        runs = []
+        for useTables in [True, False]:
+            model = ou44Model(days = 2)
+            model.simulationSetup()
+            if not useTables:
+                for space in model.elementDict['BuildingSpace'].values():
+                    space.decayTable = None
+            model.runSimulation()
+            runs.append(results(model))
+        for key in runs[0]:
+            np.testing.assert_array_equal(runs[0][key], runs[1][key], err_msg = key)
+
+if __name__ == '__main__':
+    unittest.main()
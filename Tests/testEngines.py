@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+from projectSetup import requireProject, ou44Model, runModel, results
+from Simulator.vectorEngine import VectorEngine
+
+class TestEngines(unittest.TestCase): # The vectorized engines give the results of the object engine
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        cls.references = {damperControlType: runModel(ou44Model(days = 3, damperControlType = damperControlType)) for damperControlType in ['ruleSet', 'PD', 'schedule', 'constant']}
+        
+    def assertCloseResults(self, model, reference, rtol):
+        modelResults = results(model)
+        referenceResults = results(reference)
+        for key in referenceResults:
+            if rtol == 0:
+                np.testing.assert_array_equal(modelResults[key], referenceResults[key], err_msg=key)
+            else:
+                np.testing.assert_allclose(modelResults[key], referenceResults[key], rtol=rtol, atol=1e-9, err_msg=key)
+        self.assertAlmostEqual(model.KPI, reference.KPI, delta=rtol * abs(reference.KPI))
+        
+    def testVectorized(self):
+        for damperControlType in self.references:
+            for simEngine in ['vectorized', 'eventDriven']:
+                with self.subTest(damperControlType = damperControlType, simEngine = simEngine):
+                    model = runModel(ou44Model(days = 3, damperControlType = damperControlType, simEngine = simEngine))
+                    self.assertCloseResults(model, self.references[damperControlType], 1e-12)
+                    
+    def testExactMath(self): # Identical results when exp and powers are evaluated as in the object engine
+        for damperControlType in self.references:
+            with self.subTest(damperControlType = damperControlType):
+                model = runModel(ou44Model(days = 3, damperControlType = damperControlType, simEngine = 'vectorized', exactMath = True))
+                self.assertCloseResults(model, self.references[damperControlType], 0)
+                
+    def testJumps(self): # The event-driven engine advances over the nights and the weekend in multi-step jumps
+        jumped = []
+        jump = VectorEngine.jump
+        def countingJump(engine, *arguments):
+            nSteps, sensorValue = jump(engine, *arguments)
+            jumped.append(nSteps)
+            return nSteps, sensorValue
+        VectorEngine.jump = countingJump
+        try:
+            model = runModel(ou44Model(days = 6, damperControlType = 'ruleSet', simEngine = 'eventDriven'))
+        finally:
+            VectorEngine.jump = jump
+        self.assertGreater(max(jumped), 100)
+        self.assertLess(len(jumped), model.steps/10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from projectSetup import requireProject, ou44Model, runModel
+from Misc.settings import Settings
+
+class TestEnsemble(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def testScenarios(self): # Every scenario gives the results of a single run with the same settings
+        for damperControlType in ['ruleSet', 'PD', 'schedule', 'constant']:
+            model = ou44Model(days = 2, damperControlType = damperControlType)
+            model.simulationSetup()
+            nSpaces = len(model.elementDict['BuildingSpace'])
+            airInf = 2 * Settings.airInfSpace
+            outputs = model.runEnsemble([{}, {'CO2Threshold': 800}, {'airInfSpace': [airInf] * nSpaces}])
+            references = [runModel(ou44Model(days = 2, damperControlType = damperControlType)),
+                          runModel(ou44Model(days = 2, damperControlType = damperControlType, settings = {'CO2Threshold': 800})),
+                          runModel(ou44Model(days = 2, damperControlType = damperControlType, settings = {'airInfSpace': airInf}))]
+            for scenario in range(len(references)):
+                for key in outputs:
+                    np.testing.assert_allclose(outputs[key][scenario], references[scenario].resultBuffers[key].data, rtol = 1e-12, atol = 1e-9, err_msg = damperControlType + ' ' + str(scenario) + ' ' + key)
+                self.assertAlmostEqual(model.ensembleKPI[scenario], references[scenario].KPI, delta = 1e-9 * max(abs(references[scenario].KPI), 1))
+                
+    def testCallOrder(self): # The scenarios start from the state after simulationSetup
+        model = ou44Model()
+        model.simulationSetup()
+        model.runSimulation()
+        with self.assertRaises(ValueError):
+            model.runEnsemble([{}])
+        model.simulationSetup()
+        outputs = model.runEnsemble([{}])
+        np.testing.assert_allclose(outputs['BuildingSpace'][0], runModel(ou44Model()).resultBuffers['BuildingSpace'].data, rtol = 1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
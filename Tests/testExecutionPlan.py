@@ -0,0 +1,48 @@
+import unittest
+from projectSetup import requireProject, ou44Model
+from Simulator.executionPlan import ExecutionPlan
+
+class Element: # Minimal element for the plan: doStep and connections
+    def __init__(self, delayedInputs = None):
+        self.connection = []
+        self.delayedInputs = delayedInputs if delayedInputs != None else []
+        
+    def doStep(self):
+        pass
+        
+    def connect(self, sender, recieverProperty):
+        self.connection.append({"sender": sender, "recieverProperty": recieverProperty})
+
+class TestExecutionPlan(unittest.TestCase):
+    def testOrder(self): # Senders run before their recievers, recievers of delayed inputs before their senders
+        a, b, c = Element(), Element(delayedInputs = ["previous"]), Element()
+        b.connect(a, "value")
+        c.connect(b, "value")
+        a.connect(c, "x")
+        b.connect(c, "previous")
+        plan = ExecutionPlan(elementDict = {"first": {"c": c}, "second": {"a": a, "b": b}})
+        with self.assertRaises(ValueError): # a -> b -> c -> a
+            plan.build()
+        a.connection = []
+        plan.build()
+        self.assertEqual([doStep.__self__ for doStep in plan.stepCalls], [a, b, c])
+        self.assertEqual(plan.stages, [[a], [b], [c]])
+        
+    def testModel(self):
+        requireProject()
+        for damperControlType in ['ruleSet', 'PD']:
+            model = ou44Model(damperControlType = damperControlType)
+            model.simulationSetup()
+            order = {id(doStep.__self__): idx for idx, doStep in enumerate(model.executionPlan.stepCalls)}
+            for elements in model.elementDict.values():
+                for reciever in elements.values():
+                    for connect in getattr(reciever, "connection", []):
+                        if id(connect["sender"]) not in order or id(reciever) not in order:
+                            continue
+                        if connect["recieverProperty"] in getattr(reciever, "delayedInputs", []):
+                            self.assertLess(order[id(reciever)], order[id(connect["sender"])])
+                        else:
+                            self.assertLess(order[id(connect["sender"])], order[id(reciever)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from projectSetup import requireProject, timeInput, ou44Model, runModel, results
+
+class TestFork(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def assertSameResults(self, model, reference):
+        modelResults = results(model)
+        referenceResults = results(reference)
+        for key in referenceResults:
+            np.testing.assert_array_equal(modelResults[key], referenceResults[key], err_msg=key)
+        self.assertEqual(model.KPI, reference.KPI)
+        self.assertEqual(model.getObjectives(), reference.getObjectives())
+        
+    def testBranches(self):
+        model = ou44Model(days = 2)
+        model.simulationSetup()
+        model.runUntil(timeInput(2020, 1, 7, 6))
+        branches = model.fork({'PD': {'damperControlType': 'PD'},
+                               'threshold': {'settings': {'CO2Threshold': 600}}})
+        for name in branches:
+            branches[name].runSimulation()
+            branches[name].calculateTotals()
+            branches[name].clacAirKPI()
+        model.runSimulation()
+        model.calculateTotals()
+        model.clacAirKPI()
+        
+        self.assertSameResults(model, runModel(ou44Model(days = 2)))
+        self.assertSameResults(branches['threshold'], runModel(ou44Model(days = 2, settings = {'CO2Threshold': 600})))
+        self.assertNotEqual(branches['threshold'].KPI, model.KPI)
+        
+        # The PD branch shares the ruleSet steps before the fork and continues with PD control
+        modelResults = results(model)
+        PDResults = results(branches['PD'])
+        for key in modelResults:
+            np.testing.assert_array_equal(PDResults[key][:model.forkStep], modelResults[key][:model.forkStep], err_msg=key)
+        self.assertFalse(np.array_equal(PDResults['BuildingSpace'], modelResults['BuildingSpace']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+import unittest
+from projectSetup import projectPath, requireProject, ou44Model
+
+lazyModules = ["gekko", "scipy", "matplotlib", "tabulate", "openpyxl"]
+
+script = """import sys
+sys.path.insert(0, 'Tests')
+from projectSetup import ou44Model, runModel
+runModel(ou44Model(days = 0, hours = 2))
+print(','.join(sorted(set(name.split('.')[0] for name in sys.modules))))"""
+
+class TestImports(unittest.TestCase):
+    def testHeadlessRun(self): # A ruleSet simulation without plots or tables does not import the MPC, plotting or table modules
+        requireProject()
+        ou44Model(days = 0, hours = 2) # Configuration cache written, so openpyxl is not needed in the fresh interpreter
+        result = subprocess.run([sys.executable, "-c", script], cwd = projectPath, capture_output = True, text = True, check = True)
+        loaded = result.stdout.splitlines()[-1].split(',')
+        self.assertEqual([module for module in lazyModules if module in loaded], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from projectSetup import requireProject, timeInput, ou44Model, runModel
+from Simulator import gekkoAdapter
+
+def mpcElements(model):
+    return list(model.elementDict['SystemMPC'].values())
+
+class TestMPC(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject(predictions = True)
+        
+    def testGekkoReuse(self): # The kept GEKKO model solves as the model rebuilt for every solve (public gekko API only)
+        runs = []
+        for supported in [None, False]:
+            gekkoAdapter.supported = supported
+            try:
+                runs.append(runModel(ou44Model(days = 0, endTimeInput = timeInput(2020, 1, 6, 0, 30), damperControlType = 'MPC')))
+            finally:
+                gekkoAdapter.supported = None
+        for model in runs:
+            for mpc in mpcElements(model):
+                self.assertEqual(mpc.nFailedSolves, 0)
+                self.assertEqual(mpc.solveSteps, [0, 2])
+                self.assertEqual(mpc.model, None) # Working directory removed at the end of the run
+        self.assertEqual(runs[0].KPI, runs[1].KPI)
+        
+    def testWorkDir(self): # The solver working directories are made in Settings.mpcWorkDir (created if missing) and removed by cleanup
+        directory = tempfile.mkdtemp()
+        workDir = os.path.join(directory, 'mpc')
+        try:
+            model = ou44Model(damperControlType = 'MPC', settings = {'mpcWorkDir': workDir})
+            model.simulationSetup()
+            if gekkoAdapter.reuseSupported():
+                self.assertEqual(sorted(os.path.join(workDir, name) for name in os.listdir(workDir)), sorted(mpc.model.path for mpc in mpcElements(model)))
+            for mpc in mpcElements(model):
+                mpc.cleanup()
+            self.assertEqual(os.listdir(workDir) if os.path.exists(workDir) else [], [])
+        finally:
+            shutil.rmtree(directory, ignore_errors = True)
+            
+    def testSolveSchedule(self): # Without a CO2 tolerance the plan is re-optimized on every MPC time step only and followed in between
+        model = runModel(ou44Model(days = 0, hours = 3, damperControlType = 'MPCLinear'))
+        for mpc in mpcElements(model):
+            ratio = int(mpc.mpcTimeStep/mpc.timeStep)
+            self.assertEqual(mpc.nFailedSolves, 0)
+            self.assertEqual(mpc.solveSteps, list(range(0, mpc.step, ratio)))
+            self.assertEqual(mpc.solveTriggers['noPlan'], 1)
+            self.assertEqual(mpc.solveTriggers['periodic'], mpc.nSolves-1)
+            self.assertEqual(mpc.nSkippedSolves, 0)
+            interval = 1 + (mpc.step-1-mpc.planStep) // ratio # Plan interval of the last step
+            self.assertEqual(list(mpc.output["outputSignal"]), list(mpc.results['damperPos'][:,interval,mpc.planStep]))
+            
+    def testEventTrigger(self): # With a CO2 tolerance the plan is kept while the predictions hold, and every solve has one trigger
+        model = runModel(ou44Model(days = 0, hours = 12, damperControlType = 'MPCLinear', settings = {'mpcCO2Tolerance': 50}))
+        for mpc in mpcElements(model):
+            self.assertEqual(mpc.nFailedSolves, 0)
+            self.assertGreater(mpc.nSkippedSolves, 0)
+            self.assertEqual(mpc.solveTriggers['periodic'], 0)
+            self.assertEqual(sum(mpc.solveTriggers.values()), mpc.nSolves)
+            self.assertEqual(len(mpc.solveSteps), mpc.nSolves)
+            
+    def testLinearBackend(self): # Objectives of the LP backend (HiGHS) are unchanged
+        model = runModel(ou44Model(days = 0, hours = 12, damperControlType = 'MPCLinear', discardStartup = True, startupDuration = 3600))
+        for mpc in mpcElements(model):
+            self.assertEqual(mpc.nFailedSolves, 0)
+        self.assertTrue(np.isclose(model.KPI, 815280276.4206884, rtol = 1e-6))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+from dateutil.tz import tzutc
+from projectSetup import projectPath
+from Data.Occupancy.occDataConnect import OccDataConnect
+from Data.Occupancy.occDataLoader import loadOccData
+
+dateFormat = OccDataConnect.dataConnect1['dateFormat']
+
+def referenceDateTimes(data): # Row by row parsing of the Timestamp column (before the vectorized loader)
+    return [datetime.strptime(data['Timestamp'][row], dateFormat).replace(tzinfo=tzutc()) for row in range(len(data))]
+
+class TestOccDataLoader(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, 'occ.csv')
+        self.writeCsv(['3/21/2018 12:00:00 AM', '3/21/2018 12:10:00 PM', '10/28/2018 1:50:00 AM'], [0.0, 2.0, 1.0])
+        
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+        
+    def writeCsv(self, timestamps, occ):
+        pd.DataFrame({'Timestamp': timestamps, 'OCC': occ}).to_csv(self.file, index = False)
+        
+    def testParsing(self):
+        data = loadOccData(self.file, dateFormat)
+        self.assertEqual(list(data.columns), ['Timestamp', 'OCC', 'DateTime'])
+        self.assertEqual(list(data['DateTime']), referenceDateTimes(data))
+        
+    def testMeasuredFiles(self):
+        for space in ['Ø22-508-1', 'Ø22-511-2']:
+            file = os.path.join(projectPath, 'Data', 'Occupancy', OccDataConnect.dataConnect1[space])
+            if not os.path.exists(file):
+                self.skipTest('Missing occupancy file ' + file)
+            data = loadOccData(file, dateFormat)
+            self.assertEqual(list(data['DateTime']), referenceDateTimes(data))
+            
+    def testCache(self): # Callers get their own copy, and a changed file is parsed again
+        data = loadOccData(self.file, dateFormat)
+        data.loc[0, 'OCC'] = 5.0
+        self.assertEqual(loadOccData(self.file, dateFormat)['OCC'][0], 0.0)
+        self.writeCsv(['3/22/2018 12:00:00 AM', '3/22/2018 12:10:00 AM'], [3.0, 4.0])
+        os.utime(self.file, ns = (0, os.stat(self.file).st_mtime_ns + 1000000000))
+        data = loadOccData(self.file, dateFormat)
+        self.assertEqual(list(data['OCC']), [3.0, 4.0])
+        self.assertEqual(list(data['DateTime']), referenceDateTimes(data))
+
+if __name__ == '__main__':
+    unittest.main()
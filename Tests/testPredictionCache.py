@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import projectSetup # Project folder on the module path
+from Simulator.predictionCache import PredictionCache
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, 'predictions.csv')
+        self.writeCsv(10)
+        
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+        
+    def writeCsv(self, nRows):
+        dateTime = pd.date_range('2020-01-06 00:00:00', periods = nRows, freq = '600s')
+        pd.DataFrame({'DateTime': dateTime.strftime('%Y-%m-%d %H:%M:%S'), 'value': np.arange(nRows) * 0.5}).to_csv(self.file, index = False)
+        
+    def testWindow(self):
+        cache = PredictionCache(self.file)
+        self.assertEqual(cache.nRows, 10)
+        window = cache.window(2, 4, columns = ['value'])
+        self.assertEqual(list(window['value']), [1.0, 1.5, 2.0])
+        self.assertEqual(PredictionCache(self.file).cacheDir, cache.cacheDir) # Read from the cache
+        
+    def testRebuild(self): # A changed CSV gets a new cache, a finished cache is not replaced while it is read
+        cache = PredictionCache(self.file)
+        values = cache.array('value')
+        cache.build() # As a parallel run that built the same cache
+        np.testing.assert_array_equal(values, np.arange(10) * 0.5)
+        self.assertEqual(PredictionCache(self.file).nRows, 10)
+        
+        self.writeCsv(12)
+        os.utime(self.file, ns = (0, os.stat(self.file).st_mtime_ns + 1000000000))
+        newCache = PredictionCache(self.file)
+        self.assertEqual(newCache.nRows, 12)
+        self.assertNotEqual(newCache.cacheDir, cache.cacheDir)
+        self.assertEqual(os.listdir(newCache.cacheRoot), [os.path.basename(newCache.cacheDir)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from projectSetup import requireProject, ou44Model, runModel, results
+from Simulator.resultBuffer import ResultBuffer
+
+class TestResultBuffer(unittest.TestCase):
+    def testPrefix(self): # A branch holds the steps after the shared prefix only
+        buffer = ResultBuffer(columns = ['a', 'b'], steps = 5)
+        buffer.data[:] = np.arange(10).reshape(5, 2)
+        shared = buffer.sharedRows(2)
+        self.assertFalse(shared.flags.writeable)
+        branch = ResultBuffer(columns = ['a', 'b'], steps = 5, prefix = shared)
+        self.assertEqual(branch.firstStep, 2)
+        self.assertEqual(branch.data.shape, (3, 2))
+        branch.data[:] = -1
+        np.testing.assert_array_equal(branch.rows(1), [[0, 1], [2, 3], [-1, -1]])
+        np.testing.assert_array_equal(branch.sharedRows(3), [[0, 1], [2, 3], [-1, -1]])
+        branch.startIdx = 1
+        df = branch.toDataFrame()
+        self.assertEqual(list(df.index), [1, 2, 3, 4])
+        self.assertEqual(list(df['a']), [2, -1, -1, -1])
+        
+    def testDataFrame(self): # The DataFrame wraps the buffer without a copy
+        buffer = ResultBuffer(columns = ['a'], steps = 3)
+        df = buffer.toDataFrame()
+        buffer.data[1, 0] = 7
+        self.assertEqual(df['a'][1], 7)
+        
+    def testFloat32(self): # Runs with float32 buffers agree with float64 to float32 precision
+        requireProject()
+        reference = runModel(ou44Model())
+        model = runModel(ou44Model(resultDtype = np.float32))
+        self.assertEqual(model.resultBuffers['BuildingSpace'].data.dtype, np.float32)
+        referenceResults = results(reference)
+        modelResults = results(model)
+        for key in referenceResults:
+            np.testing.assert_allclose(modelResults[key], referenceResults[key], rtol = 1e-6, atol = 1e-6, err_msg = key)
+
+if __name__ == '__main__':
+    unittest.main()
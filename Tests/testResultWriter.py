@@ -0,0 +1,70 @@
+import os
+import json
+import shutil
+import unittest
+import numpy as np
+from projectSetup import projectPath, requireProject, ou44Model, runModel, results
+from Simulator.resultWriter import readResults
+
+class TestResultWriter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        cls.directory = os.path.join(projectPath, 'Results', 'testStream_chunks')
+        
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+        file = os.path.join(projectPath, 'Results', 'testStream_checkpoint.pkl')
+        if os.path.exists(file):
+            os.remove(file)
+        
+    def assertSameResults(self, model, reference):
+        modelResults = results(model)
+        referenceResults = results(reference)
+        for key in referenceResults:
+            np.testing.assert_array_equal(modelResults[key], referenceResults[key], err_msg = key)
+        self.assertEqual(model.KPI, reference.KPI)
+        
+    def testChunks(self): # Only one chunk is held in memory, the chunks give the results of a run without streaming
+        model = ou44Model(days = 2, outputName = 'testStream', streamResults = True, settings = {'resultChunkSteps': 100})
+        model.simulationSetup()
+        self.assertEqual(model.resultBuffers['BuildingSpace'].steps, 100)
+        model.runSimulation()
+        with open(os.path.join(self.directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.assertTrue(meta['complete'])
+        self.assertEqual(meta['stepsWritten'], model.steps)
+        self.assertEqual(len(readResults(self.directory)['step']), model.steps)
+        model.calculateTotals()
+        model.clacAirKPI()
+        self.assertSameResults(model, runModel(ou44Model(days = 2)))
+        
+    def testResume(self): # Chunks written before a checkpoint are kept when the run is resumed
+        arguments = {'days': 2, 'outputName': 'testStream', 'streamResults': True, 'checkpointSteps': 60, 'settings': {'resultChunkSteps': 50}}
+        model = ou44Model(**arguments)
+        model.simulationSetup()
+        stepCalls = model.executionPlan.stepCalls
+        lastCall = stepCalls[-1]
+        count = [0]
+        def crashingCall():
+            count[0] = count[0] + 1
+            if count[0] > 150:
+                raise RuntimeError('Crash')
+            lastCall()
+        stepCalls[-1] = crashingCall
+        with self.assertRaises(RuntimeError):
+            model.runSimulation()
+        resumed = ou44Model(**arguments)
+        resumed.simulationSetup()
+        resumed.resume()
+        resumed.calculateTotals()
+        resumed.clacAirKPI()
+        self.assertSameResults(resumed, runModel(ou44Model(days = 2)))
+        
+    def testUnsupported(self): # The vectorized engines and the MPC results hold the whole run in memory
+        for arguments in [{'simEngine': 'vectorized'}, {'simEngine': 'eventDriven'}, {'damperControlType': 'MPCLinear'}]:
+            with self.assertRaises(ValueError):
+                ou44Model(streamResults = True, **arguments)
+
+if __name__ == '__main__':
+    unittest.main()
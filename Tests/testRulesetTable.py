@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from projectSetup import requireProject, ou44Model, runModel, results
+from Simulator.rulesetTable import RulesetTable
+
+def scan(ruleset, value, previous): # Controller.doStep: the last row with threshold <= CO2 wins
+    position = previous
+    for row in ruleset:
+        if row[0] <= value:
+            position = row[1]
+    return position
+
+class TestRulesetTable(unittest.TestCase):
+    def testEdgeCases(self):
+        rulesets = [[[0, 0], [600, .45], [750, .7], [900, 1]], # Default ruleset
+                    [[900, 1], [600, .5], [750, .7]], # Unsorted
+                    [[600, .2], [600, .4], [500, .9]], # Repeated threshold, the later row wins
+                    [[800, .3]], # Values below all thresholds keep the previous position
+                    []] # No rows
+        table = RulesetTable(rulesets = rulesets)
+        previous = np.array([.1, .2, .3, .4, .5])
+        for value in [-1, 0, 499.9, 500, 599.99, 600, 600.01, 750, 899, 900, 5000]:
+            positions = table.evaluate(np.full(len(rulesets), float(value)), previous)
+            for idx in range(len(rulesets)):
+                self.assertEqual(positions[idx], scan(rulesets[idx], value, previous[idx]), (idx, value))
+        np.testing.assert_array_equal(table.evaluate(np.full(len(rulesets), np.nan), previous), previous) # Controllers without a value
+        np.testing.assert_array_equal(RulesetTable(rulesets = [[]]).evaluate([700.0], [.5]), [.5])
+        
+    def testRandom(self): # Any shape of values with a leading scenario axis
+        generator = np.random.default_rng(1)
+        rulesets = [generator.choice(np.arange(400, 1200, 50), size = (generator.integers(1, 6), 1)).tolist() for idx in range(20)]
+        rulesets = [[[row[0], float(generator.random())] for row in ruleset] for ruleset in rulesets]
+        table = RulesetTable(rulesets = rulesets)
+        values = generator.uniform(350, 1250, size = (3, len(rulesets)))
+        values[0, :5] = [ruleset[0][0] for ruleset in rulesets[:5]]
+        previous = generator.random((3, len(rulesets)))
+        positions = table.evaluate(values, previous)
+        for scenario in range(3):
+            for idx in range(len(rulesets)):
+                self.assertEqual(positions[scenario, idx], scan(rulesets[idx], values[scenario, idx], previous[scenario, idx]))
+                
+    def testModelRulesets(self): # Rulesets given per space or controller id give the same results in the object and vectorized engines
+        requireProject()
+        model = ou44Model()
+        model.simulationSetup()
+        space = list(model.elementDict['BuildingSpace'])[0]
+        rulesets = {space: [[0, .1], [500, .3], [650, 1]]}
+        reference = runModel(ou44Model(days = 2, rulesets = rulesets))
+        vectorized = runModel(ou44Model(days = 2, rulesets = rulesets, simEngine = 'vectorized', exactMath = True))
+        referenceResults = results(reference)
+        vectorizedResults = results(vectorized)
+        for key in referenceResults:
+            np.testing.assert_array_equal(vectorizedResults[key], referenceResults[key], err_msg = key)
+        self.assertNotEqual(reference.KPI, runModel(ou44Model(days = 2)).KPI)
+
+if __name__ == '__main__':
+    unittest.main()
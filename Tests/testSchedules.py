@@ -0,0 +1,72 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+import projectSetup # Project folder on the module path
+from Components.controller import Controller
+from Components.occupancy import Occupancy
+
+def weekTimeline(timeStep = 600, days = 14): # timeOfDay [s] and weekday of every step, starting on a Monday
+    seconds = np.arange(0, days*86400, timeStep)
+    return SimpleNamespace(timeOfDay = seconds % 86400, weekday = (seconds // 86400) % 7)
+
+def referenceOccupancy(occupancy): # Step by step evaluation of the fixed schedule (before the schedules were precomputed)
+    occupants = occupancy.output["occupants"]
+    values = []
+    for step in range(len(occupancy.timeline.timeOfDay)):
+        timeOfDay = occupancy.timeline.timeOfDay[step]
+        rows = occupancy.fixedScheduleWeekDay if occupancy.timeline.weekday[step] <= 4 else occupancy.fixedScheduleWeekend
+        for row in rows:
+            if timeOfDay >= row[0]:
+                occupants = row[1]
+        values.append(occupants)
+    return values
+
+def referenceController(controller):
+    values = []
+    for step in range(len(controller.timeline.timeOfDay)):
+        timeOfDay = controller.timeline.timeOfDay[step]
+        for row in controller.setSchedule:
+            if timeOfDay >= row[0]:
+                opening = row[1]
+        if controller.timeline.weekday[step] > 4:
+            opening = opening / 3
+        values.append(opening)
+    return values
+
+def run(element, output): # Output of doStep in every step of the timeline
+    values = []
+    for step in range(len(element.timeline.timeOfDay)):
+        element.doStep()
+        values.append(element.output[output])
+    return values
+
+class TestSchedules(unittest.TestCase):
+    def testFixedOccupancy(self):
+        occupancy = Occupancy(timeline = weekTimeline())
+        occupancy.compileSchedule()
+        self.assertEqual(run(occupancy, "occupants"), referenceOccupancy(occupancy))
+        
+    def testOccupancyGap(self): # Steps before the first row of a schedule keep the previous value
+        occupancy = Occupancy(timeline = weekTimeline())
+        occupancy.fixedScheduleWeekDay = [[9*3600, 7], [17*3600, 2]]
+        occupancy.fixedScheduleWeekend = [[10*3600, 1]]
+        occupancy.compileSchedule()
+        self.assertEqual(list(occupancy.schedule), referenceOccupancy(occupancy))
+        
+    def testOccupancyData(self):
+        data = [0.0, 3.0, 12.0, 4.0]
+        occupancy = Occupancy(timeline = weekTimeline(), scheduleFromData = data)
+        occupancy.compileSchedule()
+        values = []
+        for step in range(len(data)):
+            occupancy.doStep()
+            values.append(occupancy.output["occupants"])
+        self.assertEqual(values, data)
+        
+    def testControllerSchedule(self):
+        controller = Controller(timeline = weekTimeline(), controlType = 'schedule')
+        controller.compileSchedule()
+        self.assertEqual(run(controller, "outputSignal"), referenceController(controller))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import warnings
+from projectSetup import requireProject, ou44Arguments, ou44Model, runModel
+from Simulator.sweep import Sweep
+from Components.systemMPC import SystemMPC
+
+class TestSweep(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject(predictions = True)
+        
+    def testObjectives(self): # The sweep table holds the objectives of each run
+        cases = [{'damperControlType': 'ruleSet'}, {'damperControlType': 'MPCLinear', 'mpcW3': None}]
+        results = Sweep(baseKwargs = ou44Arguments(days = 0, hours = 6), cases = cases, maxWorkers = 2).run()
+        for idx in range(len(cases)):
+            objectives = runModel(ou44Model(days = 0, hours = 6, **cases[idx])).getObjectives()
+            for key in objectives:
+                self.assertEqual(results[key][idx], objectives[key], key)
+        self.assertEqual(list(results['failedSolves']), [0, 0])
+        
+    def testFailedSolves(self): # MPC steps that use the fail-safe positions are reported
+        def noSolution(*args):
+            raise ValueError('No solution')
+        model = ou44Model(days = 0, hours = 2, damperControlType = 'MPCLinear')
+        model.simulationSetup()
+        for mpc in model.elementDict['SystemMPC'].values():
+            mpc.solveLP = noSolution
+        model.runSimulation()
+        model.calculateTotals()
+        model.clacAirKPI()
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            objectives = model.getObjectives()
+        self.assertGreater(objectives['failedSolves'], 0)
+        self.assertTrue(any('MPC solves found no solution' in str(warning.message) for warning in caught))
+        
+    def testNoEmissionWeight(self):
+        self.assertEqual(SystemMPC(w1 = 1, w2 = 1).w3, 0)
+
+if __name__ == '__main__':
+    unittest.main()
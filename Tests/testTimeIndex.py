@@ -0,0 +1,29 @@
+import datetime as dt
+import unittest
+from dateutil.tz import tzutc
+import projectSetup # Project folder on the module path
+from Simulator.timeIndex import TimeIndex
+
+def time(hour, minute = 0):
+    return dt.datetime(2020, 1, 6, hour, minute, tzinfo=tzutc())
+
+class TestTimeIndex(unittest.TestCase):
+    def testRegularGrid(self):
+        index = TimeIndex.fromDateTime(['2020-01-06 00:00:00+00:00', '2020-01-06 00:10:00+00:00', '2020-01-06 00:20:00+00:00'])
+        self.assertEqual(index.stepSize, 600)
+        self.assertEqual(index.find(time(0, 20)), 2)
+        self.assertEqual(index.find(time(0, 5)), None)
+        self.assertEqual(index.find(time(0, 30)), None)
+        self.assertEqual(index.window(time(0), time(0, 10)), (0, 1))
+        self.assertEqual(index.window(time(0), time(1)), (None, None))
+        
+    def testIrregular(self): # Duplicate timestamps resolve to the last row (as the old string comparison loop)
+        index = TimeIndex.fromDateTime(['2020-01-06 02:00:00', '2020-01-06 02:10:00', '2020-01-06 02:00:00', '2020-01-06 01:00:00'])
+        self.assertEqual(index.stepSize, None)
+        self.assertEqual(index.find(time(2)), 2)
+        self.assertEqual(index.find(time(1)), 3)
+        self.assertEqual(index.find(time(2, 5)), None)
+        self.assertEqual(TimeIndex([]).find(time(0)), None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import datetime as dt
+import unittest
+import numpy as np
+from dateutil.tz import tzutc
+from projectSetup import requireProject, timeInput, ou44Model, runModel, Model
+from Simulator.timeline import Timeline
+
+def wallClock(year, month, day, hour = 0, minute = 0):
+    return dt.datetime(year, month, day, hour, minute, tzinfo=tzutc())
+
+def timeline(start, end, dstStartYear = 2019):
+    return Timeline(startTime = start, endTime = end, timeStep = dt.timedelta(seconds = 600), dstStartYear = dstStartYear)
+
+class TestTimeline(unittest.TestCase):
+    def testSpringSwitch(self): # 02:00-03:00 does not exist on 2020-03-29
+        steps = timeline(wallClock(2020, 3, 28), wallClock(2020, 3, 30))
+        self.assertEqual(steps.steps, 47*6 + 1)
+        idx = steps.stepIndex(wallClock(2020, 3, 29, 3))
+        self.assertEqual(steps.dateTimes[idx-1], wallClock(2020, 3, 29, 1, 50))
+        self.assertEqual(steps.dateTimes[idx], wallClock(2020, 3, 29, 3))
+        self.assertEqual(steps.stepIndex(wallClock(2020, 3, 29, 2, 30)), idx) # Skipped times are moved forward
+        self.assertTrue(np.all(np.diff(steps.utc) == 600))
+        
+    def testAutumnSwitch(self): # 02:00-03:00 is repeated on 2020-10-25
+        steps = timeline(wallClock(2020, 10, 24), wallClock(2020, 10, 26))
+        self.assertEqual(steps.steps, 49*6 + 1)
+        local = steps.dateTimes
+        self.assertEqual(sum(1 for time in local if time == wallClock(2020, 10, 25, 2, 30)), 2)
+        self.assertEqual(local[steps.stepIndex(wallClock(2020, 10, 25, 2, 30))-1], wallClock(2020, 10, 25, 2, 20)) # The repeated hour is read as winter time
+        self.assertEqual(list(steps.weekday[:2]), [5, 5])
+        
+    def testRegularGrid(self): # Before dstStartYear the timestamps are standard time all year
+        steps = timeline(wallClock(2018, 3, 24), wallClock(2018, 3, 26))
+        self.assertEqual(steps.steps, 48*6 + 1)
+        self.assertEqual(steps.dateTimes[-1], wallClock(2018, 3, 26))
+        self.assertEqual(timeline(wallClock(2018, 3, 24), wallClock(2018, 3, 26), dstStartYear = None).steps, 47*6 + 1)
+        steps = timeline(wallClock(2018, 12, 31, 12), wallClock(2019, 1, 1, 12))
+        self.assertEqual(steps.steps, 24*6 + 1)
+        
+    def testSetting(self): # The model uses Settings.dstStartYear
+        requireProject()
+        for dstStartYear, steps in [(2019, 48*6 + 1), (None, 47*6 + 1)]:
+            model = Model(configFile = 'config_1sys_2rooms.xlsx', startTimeInput = timeInput(2018, 3, 24), endTimeInput = timeInput(2018, 3, 26),
+                          occData = 'dataConnect1', settings = {'dstStartYear': dstStartYear})
+            model.simulationSetup()
+            self.assertEqual(model.steps, steps)
+            
+    def testMeasuredOccupancy(self): # Measured 2018 occupancy across the 2018-03-25 switch (Misc/Benchmarks/dstRegression.py)
+        requireProject()
+        model = runModel(Model(configFile = 'config_1sys_2rooms.xlsx', startTimeInput = timeInput(2018, 3, 23), endTimeInput = timeInput(2018, 3, 29),
+                               damperControlType = 'ruleSet', occData = 'dataConnect1'))
+        self.assertEqual(model.steps, 865)
+        self.assertAlmostEqual(model.KPI, 642862.5636280014, delta = 1e-9 * 642862.5636280014)
+
+if __name__ == '__main__':
+    unittest.main()
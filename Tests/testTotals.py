@@ -0,0 +1,56 @@
+import unittest
+import pandas as pd
+from projectSetup import powerFile, requireProject, ou44Model, runModel
+from Misc.settings import Settings
+
+def referenceTotals(model): # Step loop of calculateTotals before it was vectorized
+    df = pd.read_csv(powerFile, sep=',')
+    startup = int(model.startupDuration/model.timeStep.seconds) if model.discardStartup else 0
+    for idx in range(len(df)):
+        if df['DateTime'][idx] == str(model.startTime):
+            startIdx = idx + startup
+        if df['DateTime'][idx] == str(model.endTime):
+            endIdx = idx
+    powerDf = df.loc[startIdx:endIdx]
+    powerDf.index = range(len(powerDf.index))
+    power, el, cost, totCost, emm, totEmm = [], [], [], [], [], []
+    for idx in range(len(powerDf)):
+        powerSum = 0
+        for key in model.simResults['Fan']:
+            if key[-1] == 'W':
+                powerSum = powerSum + model.simResults['Fan'][key][idx+startup]
+        power.append(powerSum)
+        cost.append(powerSum*powerDf['DKKPerMWh'][idx]*model.timeStep.seconds/(3600*1000000))
+        emm.append(powerSum*powerDf['gCO2PerKWh'][idx]*model.timeStep.seconds/(3600*1000000))
+        el.append((el[-1] if idx > 0 else 0) + powerSum*model.timeStep.seconds/(3600*1000))
+        totCost.append((totCost[-1] if idx > 0 else 0) + cost[idx])
+        totEmm.append((totEmm[-1] if idx > 0 else 0) + emm[idx])
+    return {'powerW': power, 'el': el, 'cost': cost, 'totCost': totCost, 'kgCO2emm': emm, 'totCO2emm': totEmm}
+
+def referenceKPI(model): # Step loop of clacAirKPI before it was vectorized
+    KPI = 0
+    for space in model.elementDict["BuildingSpace"]:
+        KPIspace = 0
+        for step in range(model.simResults['Sensor'].index.start, model.simResults['Sensor'].index.stop):
+            if model.simResults["BuildingSpace"][space + ": ppmCO2"][step] > Settings.CO2Threshold:
+                KPIspace = KPIspace + ((model.simResults["BuildingSpace"][space + ": ppmCO2"][step]-Settings.CO2Threshold) * Settings.timeStep * model.simResults["Occupancy"][space + " occupancy: occupants"][step])
+        KPI = KPI + KPIspace
+    return KPI
+
+class TestTotals(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def testStepLoop(self): # Identical to summing step by step
+        for arguments in [{'damperControlType': 'ruleSet'}, {'damperControlType': 'PD', 'discardStartup': True, 'startupDuration': 3600}]:
+            model = runModel(ou44Model(days = 2, **arguments))
+            reference = referenceTotals(model)
+            self.assertEqual(len(model.buildingResults), len(reference['powerW']))
+            for column in reference:
+                self.assertEqual(list(model.buildingResults[column]), reference[column])
+            self.assertGreater(model.KPI, 0)
+            self.assertEqual(model.KPI, referenceKPI(model))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import unittest
+from projectSetup import requireProject, occPredictionFile, timeInput, ou44Model, Model
+
+def referenceConnections(model): # Connections of the nested search loops the keyed wiring replaced: (reciever, recieverProperty, sender, senderProperty) in order
+    elements = model.elementDict
+    connections = []
+    def add(reciever, sender, recieverProperty, senderProperty):
+        connections.append((reciever.id, recieverProperty, sender.id, senderProperty))
+    for sensor in elements["Sensor"].values():
+        if sensor.measuresProperty == "CO2":
+            add(sensor, elements["BuildingSpace"][sensor.containedIn], "value", "ppmCO2")
+    if model.useMPC:
+        for systemMPC in elements["SystemMPC"].values():
+            for sensor in elements["Sensor"].values():
+                if elements["BuildingSpace"][sensor.containedIn].ventilationSystem == systemMPC.superSystem:
+                    add(systemMPC, sensor, "CO2", "value")
+            for occupancy in elements["Occupancy"].values():
+                if occupancy.ventilationSystem == systemMPC.superSystem:
+                    add(systemMPC, occupancy, "occ", "occupants")
+    for controller in elements["Controller"].values():
+        if controller.controlsElementType == "damper":
+            senders = [systemMPC for systemMPC in elements.get("SystemMPC", {}).values() if systemMPC.superSystem == controller.superSystem] if model.useMPC else \
+                      [sensor for sensor in elements["Sensor"].values() if sensor.containedIn == controller.containedIn]
+            if senders:
+                add(controller, senders[0], "inputValue", "outputSignal" if model.useMPC else "value")
+    for damper in elements["Damper"].values():
+        controllers = [controller for controller in elements["Controller"].values() if controller.containedIn == damper.containedIn and controller.controlsElementType == "damper"]
+        if controllers:
+            add(damper, controllers[0], "posSignal", "outputSignal")
+    for space in elements["BuildingSpace"].values():
+        for damper in elements["Damper"].values():
+            if damper.containedIn == space.id and damper.operationMode in ["supply", "exhaust"]:
+                add(space, damper, "flowVenIn" if damper.operationMode == "supply" else "flowVenOut", "flow")
+        for occupancy in elements["Occupancy"].values():
+            if occupancy.containedIn == space.id:
+                add(space, occupancy, "occupants", "occupants")
+    for fan in elements["Fan"].values():
+        for damper in elements["Damper"].values():
+            if fan.superSystem == damper.superSystem and fan.operationMode == damper.operationMode:
+                add(fan, damper, "partialFlow", "flow")
+    return sorted(connections, key = lambda connection: connection[0]) # Stable: the order per reciever is kept
+
+class TestWiring(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        requireProject()
+        
+    def assertSameWiring(self, model):
+        model.simulationSetup()
+        connections = []
+        for category in model.elementDict:
+            for element in model.elementDict[category].values():
+                for connect in getattr(element, "connection", []):
+                    connections.append((element.id, connect["recieverProperty"], connect["sender"].id, connect["senderProperty"]))
+        self.assertGreater(len(connections), 0)
+        self.assertEqual(sorted(connections, key = lambda connection: connection[0]), referenceConnections(model))
+        
+    def testConfigurations(self):
+        self.assertSameWiring(ou44Model())
+        self.assertSameWiring(Model(configFile = 'config_1sys_2rooms.xlsx', startTimeInput = timeInput(2018, 3, 23), endTimeInput = timeInput(2018, 3, 24), occData = 'dataConnect1'))
+        
+    @unittest.skipUnless(os.path.exists(occPredictionFile), 'Missing occupancy predictions')
+    def testMPC(self):
+        self.assertSameWiring(ou44Model(damperControlType = 'MPCLinear'))
+
+if __name__ == '__main__':
+    unittest.main()
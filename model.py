@@ -2,15 +2,11 @@ import os
 import pandas as pd
 import datetime as dt
 import numpy as np
-from datetime import datetime
 from dateutil.tz import tzutc
 from pytz import timezone
 import math
-import matplotlib.pyplot as plt
-import openpyxl
 import warnings
 import time
-from tabulate import tabulate
 
 from Misc.settings import Settings
 from Components.controller import Controller
@@ -19,12 +15,22 @@ from Components.damper import Damper
 from Components.system import System
 from Components.sensor import Sensor
 from Components.occupancy import Occupancy
-from Components.systemMPC import SystemMPC
 
 from Spaces.buildingSpace import BuildingSpace
 from Spaces.outdoorEnvironment import OutdoorEnvironment
 
 from Data.Occupancy.occDataConnect import OccDataConnect
+from Data.Occupancy.occDataLoader import loadOccData
+
+from Simulator.vectorEngine import VectorEngine
+from Simulator.resultBuffer import ResultBuffer
+from Simulator.executionPlan import ExecutionPlan
+from Simulator.predictionCache import PredictionCache
+from Simulator.configCache import readWorkbook
+from Simulator.timeline import Timeline
+from Simulator.resultWriter import ResultWriter, readResults
+from Simulator.decayTable import DecayTable, damperFlows
+from Simulator import checkpoint
 
 class Model:
     def __init__(self,
@@ -47,11 +53,24 @@ class Model:
                  mpcW1 = None,
                  mpcW2 = None,
                  mpcW3 = None,
+                 simEngine = 'object',
+                 resultDtype = np.float64,
+                 exactMath = False, # Vectorized engines: evaluate exp and powers element by element as the object engine does (identical results, slower). NumPy otherwise (differences in the last bits)
+                 rulesets = None, # {controller id or space id: [[CO2 threshold, position], ...]} for controllers that should not use the default ruleset
+                 streamResults = False, # Write the results to Results/<outputName>_chunks in chunks of Settings.resultChunkSteps while simulating (Simulator/resultWriter.py)
+                 checkpointSteps = None, # Save the state of the run to Results/<outputName>_checkpoint.pkl every checkpointSteps steps (object engine). Continue with resume()
+                 settings = None, # {Settings attribute: value} used instead of Misc/settings.py while this model is set up and simulated
                  **kwargs):
+        self.arguments = {key: value for key, value in locals().items() if key not in ['self', 'kwargs']} # Constructor arguments (used by fork)
+        self.arguments.update(kwargs)
         self.projectPath = None
         self.elementDict = {}
         self.outputType = {}
+        self.outputRefs = {}
+        self.executionPlan = None
         self.simResults = {}
+        self.resultBuffers = {}
+        self.resultStartIdx = 0
         self.buildingResults = None
         
         self.configFile = configFile
@@ -65,6 +84,7 @@ class Model:
         self.createBuildingPlots = createBuildingPlots
         self.createSystemPlots = createSystemPlots
         self.damperControlType = damperControlType
+        self.useMPC = damperControlType in ["MPC", "MPCLinear"] # 'MPC' (GEKKO) or 'MPCLinear' (sequential LP with scipy/HiGHS)
         self.occDiv = occDiv
         self.occPredictionDiv = occPredictionDiv
         self.occPredictedData = None
@@ -74,23 +94,27 @@ class Model:
         self.mpcW1 = mpcW1
         self.mpcW2 = mpcW2
         self.mpcW3 = mpcW3
+        self.simEngine = simEngine # 'object' (step every element object), 'vectorized' (Simulator/vectorEngine.py) or 'eventDriven' (vectorized, jumping over runs of constant inputs)
+        self.vectorEngine = None
+        self.exactMath = exactMath
+        self.resultDtype = resultDtype # np.float64 or np.float32
+        self.rulesets = rulesets if rulesets != None else {}
+        self.streamResults = streamResults
+        self.resultWriter = None
+        self.resultsStreamed = False # True when the result buffers only hold the last chunk
+        self.checkpointSteps = checkpointSteps
+        self.settings = settings if settings != None else {}
+        self.simulated = False # True once the elements have left the state of simulationSetup (runSimulation, runUntil, resume or fork)
+        self.forkStep = 0 # Steps simulated by runUntil (or before the fork for a branch made by fork)
+        self.resultPrefix = None # {element category: (columns, rows)} results of the steps before the fork, shared with the model a branch was forked from
 
-        self.dstSwitchDate = [[2019, 3, 31, 2, True], #year, month, day, hour, DST on? 
-                             [2019, 10, 27, 2, False],
-                             [2020, 3, 29, 2, True], 
-                             [2020, 10, 25, 2, False],
-                             [2021, 3, 28, 2, True], 
-                             [2021, 10, 31, 2, False],
-                             [2022, 3, 27, 2, True], 
-                             [2022, 10, 30, 2, False],
-                             [2023, 3, 26, 2, True], 
-                             [2023, 10, 29, 2, False],
-                             [2024, 3, 31, 2, True], 
-                             [2024, 10, 27, 2, False]]
-        
-        if self.damperControlType == 'MPC':
+        if self.useMPC:
             self.powerPredictions = None
             self.occPredictions = None
+        if self.checkpointSteps != None and self.simEngine != 'object':
+            raise ValueError("Checkpoints are only saved by the object engine. Use simEngine = 'object' with checkpointSteps")
+        if self.streamResults and (self.simEngine != 'object' or self.useMPC): # The vectorized engines and the MPC results hold the whole run in memory
+            raise ValueError("streamResults is only supported by the object engine without MPC control")
         
     def getProjectPath(self): #The project should be contained in a folder named VentilationSim
         projectPath = None
@@ -109,24 +133,28 @@ class Model:
         else:
             self.projectPath = projectPath
             
+    def timeFromInput(self, timeInput): # {"year": ..., "second": ...} -> datetime (local wall clock labelled UTC)
+        return dt.datetime(timeInput["year"], timeInput["month"], timeInput["day"], timeInput["hour"], timeInput["minute"], timeInput["second"], tzinfo=tzutc())
+        
     def convertTimeFormat(self):
-        self.startTime = dt.datetime(self.startTimeInput["year"], self.startTimeInput["month"], self.startTimeInput["day"], self.startTimeInput["hour"], self.startTimeInput["minute"], self.startTimeInput["second"], tzinfo=tzutc())
-        self.endTime = dt.datetime(self.endTimeInput["year"], self.endTimeInput["month"], self.endTimeInput["day"], self.endTimeInput["hour"], self.endTimeInput["minute"], self.endTimeInput["second"], tzinfo=tzutc())
+        self.startTime = self.timeFromInput(self.startTimeInput)
+        self.endTime = self.timeFromInput(self.endTimeInput)
         self.timeStep = dt.timedelta(seconds=Settings.timeStep)
+        self.timeline = Timeline(startTime=self.startTime, endTime=self.endTime, timeStep=self.timeStep, dstStartYear=Settings.dstStartYear)
+        self.steps = self.timeline.steps
         
     def importConfig(self):
         path = self.projectPath
         fileName = self.configFile
         file = os.path.abspath(os.path.join(path, "Data", "Config", fileName))
 
-        openpyxl.reader.excel.warnings.simplefilter(action='ignore')
-        
-        dfSystem = pd.read_excel(file, sheet_name="System")
-        dfBuildingSpace = pd.read_excel(file, sheet_name="BuildingSpace")
-        dfDamper = pd.read_excel(file, sheet_name="Damper")
-        dfFan = pd.read_excel(file, sheet_name="Fan")
-        dfController = pd.read_excel(file, sheet_name="Controller")
-        dfSensor = pd.read_excel(file, sheet_name="Sensor")
+        sheets = readWorkbook(file)
+        dfSystem = sheets["System"]
+        dfBuildingSpace = sheets["BuildingSpace"]
+        dfDamper = sheets["Damper"]
+        dfFan = sheets["Fan"]
+        dfController = sheets["Controller"]
+        dfSensor = sheets["Sensor"]
         
         warnings.simplefilter('always', UserWarning)
         
@@ -144,34 +172,20 @@ class Model:
         else:
             occFileName = 'config_OU44_600s_RoundedOcc.csv'
         occFile = os.path.abspath(os.path.join(path, "Misc", "DataProcessing", "OccPredictions", occFileName))
-        occPredictedData = pd.read_csv(occFile)
-        startIdx = None
-        endIdx = None
-        for idx in range(len(occPredictedData)):
-            if occPredictedData['DateTime'][idx] == str(self.startTime):
-                startIdx = idx
-            if occPredictedData['DateTime'][idx] == str(self.endTime):
-                endIdx = idx
-        if self.startTime + self.timeStep * (endIdx-startIdx) == self.endTime:
-            self.occPredictedData = occPredictedData.loc[startIdx:endIdx]
-            self.occPredictedData.index = range(len(self.occPredictedData.index))
+        occPredictedData = PredictionCache(occFile)
+        startIdx, endIdx = occPredictedData.timeIndex.window(self.startTime, self.endTime)
+        if startIdx != None and endIdx-startIdx == self.steps-1:
+            self.occPredictedData = occPredictedData.window(startIdx, endIdx)
         else:
             warnings.warn('Missing or incorrect timesteps in occupancy prediction file: ' + occFile)
                     
-        if self.damperControlType == "MPC":
+        if self.useMPC:
             powerFileName = 'power_600s.csv'
             powerFile = os.path.abspath(os.path.join(path, "Misc", "DataProcessing", "PowerPredictions", powerFileName))
-            powerPredictions = pd.read_csv(powerFile)
-            startIdx = None
-            endIdx = None
-            for idx in range(len(powerPredictions)):
-                if powerPredictions['DateTime'][idx] == str(self.startTime):
-                    startIdx = idx
-                if powerPredictions['DateTime'][idx] == str(self.endTime):
-                    endIdx = idx
-            if self.startTime + self.timeStep * (endIdx-startIdx) == self.endTime:
-                self.powerPredictions = powerPredictions.loc[startIdx:endIdx+Settings.mpcSteps*int(Settings.mpcTimeStep/Settings.timeStep)]
-                self.powerPredictions.index = range(len(self.powerPredictions.index))
+            powerPredictions = PredictionCache(powerFile)
+            startIdx, endIdx = powerPredictions.timeIndex.window(self.startTime, self.endTime)
+            if startIdx != None and endIdx-startIdx == self.steps-1:
+                self.powerPredictions = powerPredictions.window(startIdx, endIdx+Settings.mpcSteps*int(Settings.mpcTimeStep/Settings.timeStep), columns=['DateTime', 'DKKPerMWh', 'gCO2PerKWh'])
             else:
                 warnings.warn('Missing or incorrect timesteps in power prediction file: ' + powerFile)
             
@@ -180,17 +194,10 @@ class Model:
             else:
                 occPredFileName = 'config_OU44_600s_RoundedOcc.csv'
             occPredFile = os.path.abspath(os.path.join(path, "Misc", "DataProcessing", "OccPredictions", occPredFileName))
-            occPredictions = pd.read_csv(occPredFile)
-            startIdx = None
-            endIdx = None
-            for idx in range(len(occPredictions)):
-                if occPredictions['DateTime'][idx] == str(self.startTime):
-                    startIdx = idx
-                if occPredictions['DateTime'][idx] == str(self.endTime):
-                    endIdx = idx
-            if self.startTime + self.timeStep * (endIdx-startIdx) == self.endTime:
-                self.occPredictions = occPredictions.loc[startIdx:endIdx+Settings.mpcSteps*int(Settings.mpcTimeStep/Settings.timeStep)]
-                self.occPredictions.index = range(len(self.occPredictions.index))
+            occPredictions = PredictionCache(occPredFile)
+            startIdx, endIdx = occPredictions.timeIndex.window(self.startTime, self.endTime)
+            if startIdx != None and endIdx-startIdx == self.steps-1:
+                self.occPredictions = occPredictions.window(startIdx, endIdx+Settings.mpcSteps*int(Settings.mpcTimeStep/Settings.timeStep))
             else:
                 warnings.warn('Missing or incorrect timesteps in occupancy prediction file: ' + occPredFile)
               
@@ -199,12 +206,12 @@ class Model:
             self.elementDict[key] = {}
         self.elementDict["OutdoorEnvironment"] = {}
         self.elementDict["Occupancy"] = {}
-        if self.damperControlType == "MPC":
+        if self.useMPC:
             self.elementDict["SystemMPC"] = {}
         
     def addElement(self, element):
         try:
-            self.elementDict[type(element).__name__][element.id] = element
+            self.elementDict[getattr(element, "elementCategory", type(element).__name__)][element.id] = element
         except:
             warnings.warn("Failed to add " + element.id + " to elementDict")
         
@@ -216,8 +223,13 @@ class Model:
         for sysName in self.configDict["System"]["Ventilation system name"].dropna():
             sys = System(id=sysName, systemType="ventilationSystem", subSystem=[])
             self.addElement(sys)
-            if self.damperControlType == "MPC":
-                MPC = SystemMPC(id=sysName + " MPC", superSystem=sysName, w1=self.mpcW1, w2=self.mpcW2, w3=self.mpcW3)
+            if self.useMPC: # The MPC modules (gekko, scipy) are only imported when used
+                if self.damperControlType == "MPCLinear":
+                    from Components.systemMPCLinear import SystemMPCLinear
+                    MPC = SystemMPCLinear(id=sysName + " MPC", superSystem=sysName, w1=self.mpcW1, w2=self.mpcW2, w3=self.mpcW3)
+                else:
+                    from Components.systemMPC import SystemMPC
+                    MPC = SystemMPC(id=sysName + " MPC", superSystem=sysName, w1=self.mpcW1, w2=self.mpcW2, w3=self.mpcW3)
                 self.addElement(MPC)
         
         spaceRows = self.configDict["BuildingSpace"].shape[0]
@@ -259,7 +271,8 @@ class Model:
         controllerRows = self.configDict["Controller"].shape[0]
         for rowLoc in range(controllerRows):
             row = self.configDict["Controller"].iloc[rowLoc]
-            controller = Controller(id=row["id"], controlsElementType=row["controlsElementType"], superSystem=row["subSystemOf"], containedIn=row["isContainedIn"], controlType=self.damperControlType, startTime=self.startTime)
+            ruleset = self.rulesets.get(row["id"], self.rulesets.get(row["isContainedIn"]))
+            controller = Controller(id=row["id"], controlsElementType=row["controlsElementType"], superSystem=row["subSystemOf"], containedIn=row["isContainedIn"], controlType=self.damperControlType, timeline=self.timeline, ruleset=ruleset)
             self.addElement(controller)
             
         sensorRows = self.configDict["Sensor"].shape[0]
@@ -271,14 +284,9 @@ class Model:
     def importElementData(self):
         for occupancy in self.elementDict["Occupancy"]:
             if self.elementDict["Occupancy"][occupancy].dataFile != None:
-                self.elementDict["Occupancy"][occupancy].data = pd.read_csv(self.projectPath + '\\Data\\Occupancy\\' + self.elementDict["Occupancy"][occupancy].dataFile)
+                file = os.path.join(self.projectPath, 'Data', 'Occupancy', self.elementDict["Occupancy"][occupancy].dataFile)
                 dateFormat = getattr(OccDataConnect, self.occData)['dateFormat']
-                dateTimes = []
-                for row in range(len(self.elementDict["Occupancy"][occupancy].data)):
-                    dateTime = datetime.strptime(self.elementDict["Occupancy"][occupancy].data['Timestamp'][row], dateFormat)
-                    dateTime = dateTime.replace(tzinfo=tzutc())
-                    dateTimes.append(dateTime)
-                self.elementDict["Occupancy"][occupancy].data.insert(2, 'DateTime', dateTimes)
+                self.elementDict["Occupancy"][occupancy].data = loadOccData(file, dateFormat)
                 
     def addRelations(self):
         for subElementDict in self.elementDict:
@@ -298,119 +306,86 @@ class Model:
                     self.elementDict[subElementDict][element].inputSender = {}
                     self.elementDict[subElementDict][element].inputSenderProperty = {}
         
-    def dstCheck(self, timeStamp): # account for daylight savings  
-        dst = False
-        index = -1
-        for idx in range(len(self.dstSwitchDate)):
-            if timeStamp > dt.datetime(self.dstSwitchDate[idx][0], self.dstSwitchDate[idx][1], self.dstSwitchDate[idx][2], self.dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc()):
-                dst = self.dstSwitchDate[idx][4]
-                index = idx
-        return dst, index
-    
     def createTimesteps(self):
-        startNoDst = self.startTime
-        endNoDst = self.endTime
-        startDst, startIdx = self.dstCheck(self.startTime)
-        endDst, endIdx = self.dstCheck(self.endTime)
-        if startDst:
-            startNoDst = self.startTime-dt.timedelta(hours=1)
-        if endDst:
-            endNoDst = self.endTime-dt.timedelta(hours=1)
-        
-        simDuration = endNoDst - startNoDst
-        self.steps = math.floor(simDuration/self.timeStep) + 1
-        timeSteps = []
-        
-        idx = startIdx + 1 
-        dst = startDst # True or false
-        nextDstChange = datetime(self.dstSwitchDate[idx][0], self.dstSwitchDate[idx][1], self.dstSwitchDate[idx][2], self.dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc())
-        for step in range(self.steps):
-            timestamp = startNoDst+step*self.timeStep
-            if timestamp >= nextDstChange:
-                dst = self.dstSwitchDate[idx][4]
-                idx = idx + 1
-                nextDstChange = datetime(self.dstSwitchDate[idx][0], self.dstSwitchDate[idx][1], self.dstSwitchDate[idx][2], self.dstSwitchDate[idx][3], 0, 0, tzinfo=tzutc())
-            if dst:
-                timeSteps.append(timestamp+dt.timedelta(hours=1))
-            else:
-                timeSteps.append(timestamp)
-            
-        self.simResults["DateTime"] = pd.DataFrame({"DateTime": timeSteps})
+        self.dateTimeDf = pd.DataFrame({"DateTime": self.timeline.dateTimes})
         for occupancy in self.elementDict["Occupancy"]:
-            self.elementDict["Occupancy"][occupancy].dateTimeDf = pd.DataFrame({"DateTime": timeSteps})
+            self.elementDict["Occupancy"][occupancy].dateTimeDf = self.dateTimeDf
+            self.elementDict["Occupancy"][occupancy].timeline = self.timeline
             if self.elementDict["Occupancy"][occupancy].dataFile != None:
                 self.elementDict["Occupancy"][occupancy].scheduleFromData = pd.merge(self.elementDict["Occupancy"][occupancy].dateTimeDf, self.elementDict["Occupancy"][occupancy].data, how='inner', on='DateTime')
                 if len(self.elementDict["Occupancy"][occupancy].scheduleFromData) != len(self.elementDict["Occupancy"][occupancy].dateTimeDf):
                     warnings.warn("The occupancy schedule for " + self.elementDict["Occupancy"][occupancy].containedIn + " is incomplete")
+            self.elementDict["Occupancy"][occupancy].compileSchedule()
+        for controller in self.elementDict["Controller"].values():
+            controller.compileSchedule()
     
     def addConnectionConfig(self, reciever, sender, recieverProperty, senderProperty):
         newConnection = {"reciever": reciever, "sender": sender, "recieverProperty": recieverProperty, "senderProperty": senderProperty}
         reciever.connection.append(newConnection)
         
+    def indexElements(self, category, key): # Elements of a category grouped by key(element), in elementDict order. Used for wiring so setup scales linearly with the number of elements
+        index = {}
+        for element in self.elementDict[category].values():
+            index.setdefault(key(element), []).append(element)
+        return index
+        
     def generateConnectionConfig(self):
         for sensor in self.elementDict["Sensor"]:
             if self.elementDict["Sensor"][sensor].measuresProperty == "CO2":
                 buildingSpace = self.elementDict["BuildingSpace"][self.elementDict["Sensor"][sensor].containedIn] 
                 self.addConnectionConfig(self.elementDict["Sensor"][sensor], buildingSpace, "value", "ppmCO2")
+        
+        sensorsBySpace = self.indexElements("Sensor", lambda sensor: sensor.containedIn)
+        dampersBySpace = self.indexElements("Damper", lambda damper: damper.containedIn)
+        occupancyBySpace = self.indexElements("Occupancy", lambda occupancy: occupancy.containedIn)
+        dampersBySystem = self.indexElements("Damper", lambda damper: (damper.superSystem, damper.operationMode))
+        controllersBySpace = self.indexElements("Controller", lambda controller: (controller.containedIn, controller.controlsElementType))
+        
+        if self.useMPC:
+            mpcBySystem = self.indexElements("SystemMPC", lambda systemMPC: systemMPC.superSystem)
+            sensorsBySystem = self.indexElements("Sensor", lambda sensor: self.elementDict['BuildingSpace'][sensor.containedIn].ventilationSystem)
+            occupancyBySystem = self.indexElements("Occupancy", lambda occupancy: occupancy.ventilationSystem)
+            for systemMPC in self.elementDict['SystemMPC'].values():
+                for sensor in sensorsBySystem.get(systemMPC.superSystem, []): 
+                    self.addConnectionConfig(systemMPC, sensor, 'CO2', 'value')
+                for occupancy in occupancyBySystem.get(systemMPC.superSystem, []):
+                    self.addConnectionConfig(systemMPC, occupancy, 'occ', 'occupants')
                 
-        if self.damperControlType == "MPC":
-            for systemMPC in self.elementDict['SystemMPC']:
-                for sensor in self.elementDict["Sensor"]: 
-                    sensorSpace = self.elementDict['Sensor'][sensor].containedIn
-                    if self.elementDict['BuildingSpace'][sensorSpace].ventilationSystem == self.elementDict['SystemMPC'][systemMPC].superSystem:
-                        self.addConnectionConfig(self.elementDict['SystemMPC'][systemMPC], self.elementDict['Sensor'][sensor], 'CO2', 'value')
-                for occupancy in self.elementDict['Occupancy']:
-                    if self.elementDict['Occupancy'][occupancy].ventilationSystem == self.elementDict['SystemMPC'][systemMPC].superSystem:
-                        self.addConnectionConfig(self.elementDict['SystemMPC'][systemMPC], self.elementDict['Occupancy'][occupancy], 'occ', 'occupants')
-                
-        for controller in self.elementDict["Controller"]:
-            if self.elementDict["Controller"][controller].controlsElementType == "damper":
-                if self.damperControlType == "MPC":
-                    foundMPC = False
-                    for systemMPC in self.elementDict["SystemMPC"]: 
-                        if self.elementDict["SystemMPC"][systemMPC].superSystem == self.elementDict["Controller"][controller].superSystem:
-                            self.addConnectionConfig(self.elementDict["Controller"][controller], self.elementDict['SystemMPC'][systemMPC], "inputValue", "outputSignal")
-                            foundMPC = True
-                            break
-                    if foundMPC == False:
-                        warnings.warn("No MPC found for " + self.elementDict["Controller"][controller].id)
+        for controller in self.elementDict["Controller"].values():
+            if controller.controlsElementType == "damper":
+                if self.useMPC:
+                    if controller.superSystem in mpcBySystem:
+                        self.addConnectionConfig(controller, mpcBySystem[controller.superSystem][0], "inputValue", "outputSignal")
+                    else:
+                        warnings.warn("No MPC found for " + controller.id)
                 else:
-                    foundSensor = False
-                    for sensor in self.elementDict["Sensor"]: 
-                        if self.elementDict["Sensor"][sensor].containedIn == self.elementDict["Controller"][controller].containedIn:
-                            self.addConnectionConfig(self.elementDict["Controller"][controller], self.elementDict["Sensor"][sensor], "inputValue", "value")
-                            foundSensor = True
-                            break
-                    if foundSensor == False:
-                        warnings.warn("No sensor found for " + self.elementDict["Controller"][controller].id)
-        
-        for damper in self.elementDict["Damper"]:
-            foundController = False
-            for controller in self.elementDict["Controller"]:
-                if self.elementDict["Controller"][controller].containedIn == self.elementDict["Damper"][damper].containedIn and self.elementDict["Controller"][controller].controlsElementType == "damper":
-                    self.addConnectionConfig(self.elementDict["Damper"][damper], self.elementDict["Controller"][controller], "posSignal", "outputSignal")
-                    foundController = True
-                    break
-            if foundController == False:
-                warnings.warn("No controller found for " + self.elementDict["Damper"][damper].id)
+                    if controller.containedIn in sensorsBySpace:
+                        self.addConnectionConfig(controller, sensorsBySpace[controller.containedIn][0], "inputValue", "value")
+                    else:
+                        warnings.warn("No sensor found for " + controller.id)
+        
+        for damper in self.elementDict["Damper"].values():
+            if (damper.containedIn, "damper") in controllersBySpace:
+                self.addConnectionConfig(damper, controllersBySpace[(damper.containedIn, "damper")][0], "posSignal", "outputSignal")
+            else:
+                warnings.warn("No controller found for " + damper.id)
                 
-        for buildingSpace in self.elementDict["BuildingSpace"]:
-            for damper in self.elementDict["Damper"]:
-                if self.elementDict["Damper"][damper].containedIn == self.elementDict["BuildingSpace"][buildingSpace].id:
-                    if self.elementDict["Damper"][damper].operationMode == "supply":
-                        self.addConnectionConfig(self.elementDict["BuildingSpace"][buildingSpace], self.elementDict["Damper"][damper], "flowVenIn", "flow")
-                    elif self.elementDict["Damper"][damper].operationMode == "exhaust":
-                        self.addConnectionConfig(self.elementDict["BuildingSpace"][buildingSpace], self.elementDict["Damper"][damper], "flowVenOut", "flow")
-            for occupancy in self.elementDict["Occupancy"]:
-                if self.elementDict["Occupancy"][occupancy].containedIn == self.elementDict["BuildingSpace"][buildingSpace].id:
-                    self.addConnectionConfig(self.elementDict["BuildingSpace"][buildingSpace], self.elementDict["Occupancy"][occupancy], "occupants", "occupants")
-        
-        for fan in self.elementDict["Fan"]:
-            for damper in self.elementDict["Damper"]:
-                if self.elementDict["Fan"][fan].superSystem == self.elementDict["Damper"][damper].superSystem and self.elementDict["Fan"][fan].operationMode == self.elementDict["Damper"][damper].operationMode:
-                    self.addConnectionConfig(self.elementDict["Fan"][fan], self.elementDict["Damper"][damper], "partialFlow", "flow")
+        for buildingSpace in self.elementDict["BuildingSpace"].values():
+            for damper in dampersBySpace.get(buildingSpace.id, []):
+                if damper.operationMode == "supply":
+                    self.addConnectionConfig(buildingSpace, damper, "flowVenIn", "flow")
+                elif damper.operationMode == "exhaust":
+                    self.addConnectionConfig(buildingSpace, damper, "flowVenOut", "flow")
+            for occupancy in occupancyBySpace.get(buildingSpace.id, []):
+                self.addConnectionConfig(buildingSpace, occupancy, "occupants", "occupants")
+        
+        for fan in self.elementDict["Fan"].values():
+            for damper in dampersBySystem.get((fan.superSystem, fan.operationMode), []):
+                self.addConnectionConfig(fan, damper, "partialFlow", "flow")
                     
     def setupMPCUtility(self):
+        supplyDampersBySpace = self.indexElements("Damper", lambda damper: (damper.containedIn, damper.operationMode))
+        fansBySystem = self.indexElements("Fan", lambda fan: fan.superSystem)
         for systemMPC in self.elementDict['SystemMPC']:
             self.elementDict['SystemMPC'][systemMPC].data = pd.DataFrame(self.occPredictions['DateTime'])
             self.elementDict['SystemMPC'][systemMPC].data.insert(1, 'DKKPerMWh', self.powerPredictions['DKKPerMWh'])
@@ -420,33 +395,23 @@ class Model:
                     space = self.elementDict['SystemMPC'][systemMPC].connection[connect]['sender'].containedIn
                     self.elementDict['SystemMPC'][systemMPC].spaceList.append(space)
                     self.elementDict['SystemMPC'][systemMPC].data.insert(len(self.elementDict['SystemMPC'][systemMPC].spaceList)+2, space, self.occPredictions[space])
-                    for buildingSpace in self.elementDict['BuildingSpace']:
-                        if buildingSpace == space:
-                            self.elementDict['SystemMPC'][systemMPC].spaceVol.append(self.elementDict['BuildingSpace'][buildingSpace].vol)
-                    for damper in self.elementDict['Damper']:
-                        if self.elementDict['Damper'][damper].operationMode == 'supply':
-                            if self.elementDict['Damper'][damper].containedIn == space:
-                                self.elementDict['SystemMPC'][systemMPC].nomFlowDamper.append(self.elementDict['Damper'][damper].flowMax)  
+                    if space in self.elementDict['BuildingSpace']:
+                        self.elementDict['SystemMPC'][systemMPC].spaceVol.append(self.elementDict['BuildingSpace'][space].vol)
+                    for damper in supplyDampersBySpace.get((space, 'supply'), []):
+                        self.elementDict['SystemMPC'][systemMPC].nomFlowDamper.append(damper.flowMax)  
             self.elementDict['SystemMPC'][systemMPC].input['CO2'] = [None] * len(self.elementDict['SystemMPC'][systemMPC].spaceList)
             self.elementDict['SystemMPC'][systemMPC].input['occ'] = [None] * len(self.elementDict['SystemMPC'][systemMPC].spaceList)
             self.elementDict['SystemMPC'][systemMPC].output['outputSignal'] = [None] * len(self.elementDict['SystemMPC'][systemMPC].spaceList)
             
-            for fan in self.elementDict['Fan']:
-                if self.elementDict['Fan'][fan].superSystem == self.elementDict['SystemMPC'][systemMPC].superSystem:
-                    if self.elementDict['Fan'][fan].operationMode == 'supply':
-                        self.elementDict['SystemMPC'][systemMPC].ConstantsSupFan = [self.elementDict['Fan'][fan].c1, 
-                                                                                    self.elementDict['Fan'][fan].c2,
-                                                                                    self.elementDict['Fan'][fan].c3,
-                                                                                    self.elementDict['Fan'][fan].c4]
-                        self.elementDict['SystemMPC'][systemMPC].nomFlowSupFan = self.elementDict['Fan'][fan].flowMax   
-                        self.elementDict['SystemMPC'][systemMPC].nomWSupFan = self.elementDict['Fan'][fan].WMax
-                    if self.elementDict['Fan'][fan].operationMode == 'exhaust':
-                        self.elementDict['SystemMPC'][systemMPC].ConstantsExhFan = [self.elementDict['Fan'][fan].c1, 
-                                                                                    self.elementDict['Fan'][fan].c2,
-                                                                                    self.elementDict['Fan'][fan].c3,
-                                                                                    self.elementDict['Fan'][fan].c4]
-                        self.elementDict['SystemMPC'][systemMPC].nomFlowExhFan = self.elementDict['Fan'][fan].flowMax   
-                        self.elementDict['SystemMPC'][systemMPC].nomWExhFan = self.elementDict['Fan'][fan].WMax       
+            for fan in fansBySystem.get(self.elementDict['SystemMPC'][systemMPC].superSystem, []):
+                if fan.operationMode == 'supply':
+                    self.elementDict['SystemMPC'][systemMPC].ConstantsSupFan = [fan.c1, fan.c2, fan.c3, fan.c4]
+                    self.elementDict['SystemMPC'][systemMPC].nomFlowSupFan = fan.flowMax   
+                    self.elementDict['SystemMPC'][systemMPC].nomWSupFan = fan.WMax
+                if fan.operationMode == 'exhaust':
+                    self.elementDict['SystemMPC'][systemMPC].ConstantsExhFan = [fan.c1, fan.c2, fan.c3, fan.c4]
+                    self.elementDict['SystemMPC'][systemMPC].nomFlowExhFan = fan.flowMax   
+                    self.elementDict['SystemMPC'][systemMPC].nomWExhFan = fan.WMax       
             
             nSpaces = len(self.elementDict['SystemMPC'][systemMPC].spaceList)
             mpcSteps = Settings.mpcSteps
@@ -457,183 +422,351 @@ class Model:
             self.elementDict['SystemMPC'][systemMPC].results['totalEmm'] = np.zeros((mpcSteps+1,simSteps))
             self.elementDict['SystemMPC'][systemMPC].results['stepPrice'] = np.zeros((mpcSteps+1,simSteps))
             self.elementDict['SystemMPC'][systemMPC].results['damperPos'] = np.zeros((nSpaces,mpcSteps+1,simSteps))                                            
-            self.elementDict['SystemMPC'][systemMPC].results['spaceCO2'] = np.zeros((nSpaces,mpcSteps+1,simSteps))      
+            self.elementDict['SystemMPC'][systemMPC].results['spaceCO2'] = np.zeros((nSpaces,mpcSteps+1,simSteps))
+            self.elementDict['SystemMPC'][systemMPC].buildModel()      
   
-    def connectElements(self): # For easy model scaling this function should be generalised to treat all types of elements at once
-        for sensor in self.elementDict["Sensor"]:
-            if self.elementDict["Sensor"][sensor].measuresProperty == "CO2":
-                self.elementDict["Sensor"][sensor].inputSender["value"] = self.elementDict["Sensor"][sensor].connection[0]["sender"]
-                self.elementDict["Sensor"][sensor].inputSenderProperty["value"] = self.elementDict["Sensor"][sensor].connection[0]["senderProperty"]
-
-        for controller in self.elementDict["Controller"]:
-            self.elementDict["Controller"][controller].inputSender["inputValue"] = self.elementDict["Controller"][controller].connection[0]["sender"]
-            if self.damperControlType == 'MPC':
-                foundSpace = False
-                for idx in range(len(self.elementDict["Controller"][controller].inputSender["inputValue"].spaceList)):
-                    if self.elementDict["Controller"][controller].inputSender["inputValue"].spaceList[idx] == self.elementDict["Controller"][controller].containedIn:
-                        self.elementDict["Controller"][controller].inputSenderProperty["inputValue"] = [self.elementDict["Controller"][controller].connection[0]["senderProperty"], idx]
-                        foundSpace = True
-                        break
-                if foundSpace == False:
-                    warnings.warn("Failed to connect MPC to " + self.elementDict['Controller'][controller].id)
-            else:
-                self.elementDict["Controller"][controller].inputSenderProperty["inputValue"] = self.elementDict["Controller"][controller].connection[0]["senderProperty"]
-  
-        for damper in self.elementDict["Damper"]:
-            self.elementDict["Damper"][damper].inputSender["posSignal"] = self.elementDict["Damper"][damper].connection[0]["sender"]
-            self.elementDict["Damper"][damper].inputSenderProperty["posSignal"] = self.elementDict["Damper"][damper].connection[0]["senderProperty"]
-           
-        for buildingSpace in self.elementDict["BuildingSpace"]:
-            for key in self.elementDict["BuildingSpace"][buildingSpace].input:
-                for connect in range(len(self.elementDict["BuildingSpace"][buildingSpace].connection)):
-                    if key == self.elementDict["BuildingSpace"][buildingSpace].connection[connect]["recieverProperty"]:
-                        self.elementDict["BuildingSpace"][buildingSpace].inputSender[key] = self.elementDict["BuildingSpace"][buildingSpace].connection[connect]["sender"]
-                        self.elementDict["BuildingSpace"][buildingSpace].inputSenderProperty[key] = self.elementDict["BuildingSpace"][buildingSpace].connection[connect]["senderProperty"]
+    def connectElements(self): # Resolve the connection configuration of every element into input senders
+        self.spaceIndexes = {}
+        for subElementDict in self.elementDict:
+            for element in self.elementDict[subElementDict].values():
+                if hasattr(element, "connection"):
+                    for key in getattr(element, "spaceInputs", []):
+                        element.inputSender[key] = [None] * len(element.spaceList)
+                        element.inputSenderProperty[key] = [None] * len(element.spaceList)
+                    for key in getattr(element, "listInputs", {}).values():
+                        element.inputSender[key] = []
+                        element.inputSenderProperty[key] = []
+                    for connect in element.connection:
+                        self.connectInput(element, connect)
                         
-        for fan in self.elementDict["Fan"]:
-            self.elementDict["Fan"][fan].inputSender["flow"] = []
-            self.elementDict["Fan"][fan].inputSenderProperty["flow"] = []
-            for connect in range(len(self.elementDict["Fan"][fan].connection)):
-                self.elementDict["Fan"][fan].inputSender["flow"].append(self.elementDict["Fan"][fan].connection[connect]["sender"])
-                self.elementDict["Fan"][fan].inputSenderProperty["flow"].append(self.elementDict["Fan"][fan].connection[connect]["senderProperty"])
-                     
-        if self.damperControlType == "MPC":
-            for systemMPC in self.elementDict['SystemMPC']:
-                self.elementDict["SystemMPC"][systemMPC].inputSender["CO2"] = [None] * len(self.elementDict["SystemMPC"][systemMPC].spaceList)
-                self.elementDict["SystemMPC"][systemMPC].inputSenderProperty["CO2"] = [None] * len(self.elementDict["SystemMPC"][systemMPC].spaceList)
-                self.elementDict["SystemMPC"][systemMPC].inputSender["occ"] = [None] * len(self.elementDict["SystemMPC"][systemMPC].spaceList)
-                self.elementDict["SystemMPC"][systemMPC].inputSenderProperty["occ"] = [None] * len(self.elementDict["SystemMPC"][systemMPC].spaceList)
-                for connect in range(len(self.elementDict["SystemMPC"][systemMPC].connection)):
-                    foundSpace = False
-                    if self.elementDict["SystemMPC"][systemMPC].connection[connect]["recieverProperty"] == "CO2":
-                        for idx in range(len(self.elementDict["SystemMPC"][systemMPC].spaceList)):
-                            if self.elementDict["SystemMPC"][systemMPC].spaceList[idx] == self.elementDict["SystemMPC"][systemMPC].connection[connect]["sender"].containedIn:
-                                self.elementDict["SystemMPC"][systemMPC].inputSender["CO2"][idx] = self.elementDict["SystemMPC"][systemMPC].connection[connect]["sender"]
-                                self.elementDict["SystemMPC"][systemMPC].inputSenderProperty["CO2"][idx] = self.elementDict["SystemMPC"][systemMPC].connection[connect]["senderProperty"]
-                                foundSpace = True
-                                break
-                    elif self.elementDict["SystemMPC"][systemMPC].connection[connect]["recieverProperty"] == "occ":
-                        foundSpace = False
-                        for idx in range(len(self.elementDict["SystemMPC"][systemMPC].spaceList)):
-                            if self.elementDict["SystemMPC"][systemMPC].spaceList[idx] == self.elementDict["SystemMPC"][systemMPC].connection[connect]["sender"].containedIn:
-                                self.elementDict["SystemMPC"][systemMPC].inputSender["occ"][idx] = self.elementDict["SystemMPC"][systemMPC].connection[connect]["sender"]
-                                self.elementDict["SystemMPC"][systemMPC].inputSenderProperty["occ"][idx] = self.elementDict["SystemMPC"][systemMPC].connection[connect]["senderProperty"]
-                                foundSpace = True
-                                break
-                    if foundSpace == False:
-                        warnings.warn(self.elementDict["SystemMPC"][systemMPC].connection['sender'].containedIn + ' (containing ' + self.elementDict["SystemMPC"][systemMPC].connection['sender'].id + ') was not found in the list of spaces for ' + self.elementDict["SystemMPC"][systemMPC].id)
+    def spaceIndex(self, element): # {space: position in spaceList} of an element with one entry per space (first position, as list.index)
+        if element not in self.spaceIndexes:
+            index = {}
+            for idx, space in enumerate(element.spaceList):
+                index.setdefault(space, idx)
+            self.spaceIndexes[element] = index
+        return self.spaceIndexes[element]
+        
+    def connectInput(self, reciever, connect):
+        key = connect["recieverProperty"]
+        sender = connect["sender"]
+        senderProperty = connect["senderProperty"]
+        if senderProperty in getattr(sender, "spaceOutputs", []): # Sender output is a list with one entry per space
+            if reciever.containedIn not in self.spaceIndex(sender):
+                warnings.warn("Failed to connect " + sender.id + " to " + reciever.id)
+                return
+            senderProperty = [senderProperty, self.spaceIndex(sender)[reciever.containedIn]]
+            
+        if key in getattr(reciever, "listInputs", {}):
+            key = reciever.listInputs[key]
+            reciever.inputSender[key].append(sender)
+            reciever.inputSenderProperty[key].append(senderProperty)
+        elif key in getattr(reciever, "spaceInputs", []):
+            if sender.containedIn not in self.spaceIndex(reciever):
+                warnings.warn(sender.containedIn + ' (containing ' + sender.id + ') was not found in the list of spaces for ' + reciever.id)
+                return
+            idx = self.spaceIndex(reciever)[sender.containedIn]
+            reciever.inputSender[key][idx] = sender
+            reciever.inputSenderProperty[key][idx] = senderProperty
+        else:
+            reciever.inputSender[key] = sender
+            reciever.inputSenderProperty[key] = senderProperty
 
     def outputDfSetup(self):
         for subElementDict in self.elementDict:
             if subElementDict != 'OutdoorEnvironment':
                 outputNames = []
+                outputRefs = [] # (container, key) of every output, resolved once so results are recorded without lookups by name
                 for element in self.elementDict[subElementDict]:
                     if hasattr(self.elementDict[subElementDict][element], "output"):
                         if subElementDict == "SystemMPC":
                             for idx in range(len(self.elementDict[subElementDict][element].output['outputSignal'])):
                                 outputNames.append(self.elementDict[subElementDict][element].id + ': outputSignal ' + self.elementDict[subElementDict][element].spaceList[idx])
+                                outputRefs.append((self.elementDict[subElementDict][element].output['outputSignal'], idx))
                         else:
                             for row in self.elementDict[subElementDict][element].output:
                                 outputNames.append(self.elementDict[subElementDict][element].id + ": " + row)
+                                outputRefs.append((self.elementDict[subElementDict][element].output, row))
                 self.outputType[subElementDict] = outputNames
+                self.outputRefs[subElementDict] = outputRefs
     
+        bufferSteps = self.steps
+        if self.streamResults: # Only one chunk is held in memory
+            bufferSteps = min(Settings.resultChunkSteps, self.steps)
         for list in self.outputType:
-            self.simResults[list] = pd.DataFrame(index=range(self.steps), columns=self.outputType[list])
+            prefix = None
+            if self.resultPrefix != None: # Branch of a forked run. Outputs that the model it was forked from does not have are NaN before the fork
+                columns, prefix = self.resultPrefix.get(list, (None, None))
+                if columns != self.outputType[list]:
+                    prefix = np.full((self.forkStep, len(self.outputType[list])), np.nan, dtype=self.resultDtype)
+            self.resultBuffers[list] = ResultBuffer(columns=self.outputType[list], steps=bufferSteps, dtype=self.resultDtype, prefix=prefix)
+            
+    def getSimResults(self): # Wrap the result buffers as DataFrames. Only done when the results are requested (plots, totals, saving)
+        if not self.simResults:
+            if self.resultsStreamed: # Read the full results back from the chunks
+                arrays = readResults(self.resultWriter.directory)
+                for list in self.resultBuffers:
+                    self.resultBuffers[list].data = arrays[list]
+                    self.resultBuffers[list].steps = len(arrays[list])
+                self.resultsStreamed = False
+            self.simResults["DateTime"] = self.dateTimeDf.iloc[self.resultStartIdx:]
+            for list in self.resultBuffers:
+                self.simResults[list] = self.resultBuffers[list].toDataFrame()
+        return self.simResults
                                    
     def simulationSetup(self): #Run all function needed for model setup
-        if self.simTimer != False:
-            self.simStart = time.time()
-        print("Preparing simulation setup...")
-        self.getProjectPath()
-        self.convertTimeFormat()
-        self.importConfig()
-        self.importPredictions()
-        self.createElementDicts()
-        self.addOutdoorEnvironment()
-        self.initiateElements()
-        self.importElementData()
-        self.addRelations()
-        self.createTimesteps()
-        self.generateConnectionConfig()
-        if self.damperControlType == "MPC":
-            self.setupMPCUtility()
-        self.connectElements()
-        self.outputDfSetup()
-        print("Simulation setup complete.")
+        previous = self.applySettings()
+        try:
+            if self.simTimer != False:
+                self.simStart = time.time()
+            print("Preparing simulation setup...")
+            self.simulated = False
+            self.getProjectPath()
+            self.convertTimeFormat()
+            self.importConfig()
+            self.importPredictions()
+            self.createElementDicts()
+            self.addOutdoorEnvironment()
+            self.initiateElements()
+            self.importElementData()
+            self.addRelations()
+            self.createTimesteps()
+            self.generateConnectionConfig()
+            if self.useMPC:
+                self.setupMPCUtility()
+            self.connectElements()
+            self.decayTableSetup()
+            self.executionPlan = ExecutionPlan(elementDict=self.elementDict)
+            self.executionPlan.build()
+            self.outputDfSetup()
+            if self.simEngine in ['vectorized', 'eventDriven']:
+                self.vectorEngineSetup()
+            print("Simulation setup complete.")
+        finally:
+            self.restoreSettings(previous)
+        
+    def decayTableSetup(self): # Precomputed CO2 step terms for spaces whose damper only takes a fixed set of positions (Simulator/decayTable.py)
+        for space in self.elementDict["BuildingSpace"].values():
+            flows = damperFlows(space)
+            if flows != None:
+                space.decayTable = DecayTable(vol=space.vol, airInf=space.airInf, timeStep=space.timeStep, ppmCO2Out=Settings.ppmCO2Out, flows=flows)
             
-    def runSimulation(self):
-        #Simulation order: occupancy -> CO2sensor -> (MPC) -> damperController -> damper -> buildingSpace -> fan
-        print("Starting simulation...")
-        simCount = 0
-        
-        for step in range(self.steps): # Run step for all elements 
-            if self.simTimer != None:
-                if simCount % self.simTimer == 0 :
-                    if simCount == 0:
-                        start = time.time()
-                    else:
-                        end = time.time()
-                        duration = end-start
-                        print('Simulations of timesteps ' + str(simCount-self.simTimer+1) + '-' + str(simCount) + ' complete. Duration: ' + str(duration) + ' seconds.')
-                        start = time.time()
-                        
-            occupancyOutputs = []    
-            sensorOutputs = []
-            if self.damperControlType == 'MPC':
-                systemMPCOutputs = []
-            controllerOutputs = []
-            damperOutputs = []
-            buildingSpaceOutputs = []
-            fanOutputs = []
-
-            for occupancy in self.elementDict["Occupancy"]:
-                self.elementDict["Occupancy"][occupancy].doStep()
-                occupancyOutputs.append( self.elementDict["Occupancy"][occupancy].output["occupants"])
+    def vectorEngineSetup(self):
+        if self.damperControlType not in VectorEngine.supportedControlTypes:
+            warnings.warn("The vectorized engine does not support damper control type '" + self.damperControlType + "'. The per-object engine is used instead.")
+            self.simEngine = 'object'
+        else:
+            self.vectorEngine = VectorEngine(self, eventDriven=self.simEngine == 'eventDriven', exactMath=self.exactMath)
+            self.vectorEngine.compile()
             
-            for sensor in self.elementDict["Sensor"]:
-                self.elementDict["Sensor"][sensor].doStep()
-                sensorOutputs.append(self.elementDict["Sensor"][sensor].output["value"])
-                
-            if self.damperControlType == 'MPC':
-                for systemMPC in self.elementDict['SystemMPC']:
-                    self.elementDict["SystemMPC"][systemMPC].doStep()
-                    for idx in range(len(self.elementDict["SystemMPC"][systemMPC].spaceList)):
-                        systemMPCOutputs.append(self.elementDict["SystemMPC"][systemMPC].output['outputSignal'][idx])
-                    
-            for controller in self.elementDict["Controller"]:
-                self.elementDict["Controller"][controller].doStep()
-                controllerOutputs.append(self.elementDict["Controller"][controller].output["outputSignal"])
-                    
-            for damper in self.elementDict["Damper"]:
-                self.elementDict["Damper"][damper].doStep()
-                damperOutputs.append(self.elementDict["Damper"][damper].output["flow"])
+    def simTimerUpdate(self, simCount):
+        if self.simTimer != None:
+            if simCount % self.simTimer == 0 :
+                if simCount == 0:
+                    self.simTimerStart = time.time()
+                else:
+                    end = time.time()
+                    duration = end-self.simTimerStart
+                    print('Simulations of timesteps ' + str(simCount-self.simTimer+1) + '-' + str(simCount) + ' complete. Duration: ' + str(duration) + ' seconds.')
+                    self.simTimerStart = time.time()
+            
+    def runSimulation(self, state = None): # state: continue from a checkpoint instead of the first step (see resume)
+        previous = self.applySettings()
+        try:
+            #Simulation order is derived from the connections (see Simulator/executionPlan.py): occupancy -> CO2sensor -> (MPC) -> damperController -> damper -> buildingSpace -> fan
+            startStep = self.forkStep # A run stopped by runUntil (or a branch made by fork) is continued
+            if state != None:
+                self.setState(state)
+                startStep = state['step']
+                print("Resuming simulation from step " + str(startStep) + "...")
+            elif startStep > 0:
+                print("Continuing simulation from step " + str(startStep) + "...")
+            else:
+                print("Starting simulation...")
+            self.simulated = True
+            self.simResults = {}
+            if self.streamResults:
+                writerState = state['writer'] if state != None else {}
+                self.resultWriter = ResultWriter(directory=os.path.join(self.projectPath, "Results", self.outputName + "_chunks"), resultBuffers=self.resultBuffers, timeline=self.timeline,
+                                                 chunkSteps=Settings.resultChunkSteps, **writerState)
+            if self.simEngine in ['vectorized', 'eventDriven'] and startStep == 0: # A resumed or forked run continues with the object engine
+                self.vectorEngine.run()
+            else:
+                try:
+                    self.runObjectSimulation(startStep)
+                finally:
+                    for systemMPC in self.elementDict.get('SystemMPC', {}).values():
+                        systemMPC.cleanup()
+                        print(systemMPC.id + ': ' + str(systemMPC.nSolves) + ' solves in ' + str(systemMPC.step) + ' steps (' + str(systemMPC.nSkippedSolves) + ' skipped, ' + str(systemMPC.nFailedSolves) + ' without a solution). Triggers: ' + str(systemMPC.solveTriggers))
+            
+            if self.discardStartup == True:
+                discardedSteps = math.ceil(self.startupDuration/Settings.timeStep)
+                self.resultStartIdx = discardedSteps
+                for elementResults in self.resultBuffers:
+                    self.resultBuffers[elementResults].startIdx = discardedSteps
+            print("Simulation complete")
+        finally:
+            self.restoreSettings(previous)
+        
+    def runObjectSimulation(self, startStep = 0, endStep = None):
+        stepCalls = self.executionPlan.stepCalls
+        recorders = [(self.resultBuffers[key].data, self.outputRefs[key]) for key in self.resultBuffers if self.outputRefs[key]]
+        simCount = startStep
+        chunkStart = self.resultStart() # Step of the first row of the result buffers (moved forward every time a chunk is written when streaming)
+        bufferSteps = min([buffer.steps for buffer in self.resultBuffers.values()], default=self.steps)
+        self.simTimerStart = time.time()
+        
+        try:
+            for step in range(startStep, endStep if endStep != None else self.steps): # Run step for all elements in the order given by the execution plan
+                self.simTimerUpdate(simCount)
                 
-            for buildingSpace in self.elementDict["BuildingSpace"]:
-                self.elementDict["BuildingSpace"][buildingSpace].doStep()
-                buildingSpaceOutputs.append(self.elementDict["BuildingSpace"][buildingSpace].output["ppmCO2"])
+                for doStep in stepCalls:
+                    doStep()
                     
-            for fan in self.elementDict["Fan"]:
-                self.elementDict["Fan"][fan].doStep()
-                fanOutputs.append(self.elementDict["Fan"][fan].output["W"])
-                fanOutputs.append(self.elementDict["Fan"][fan].output["Energy"])
+                # Store data after running step
+                row = simCount - chunkStart
+                for data, outputRefs in recorders:
+                    data[row] = [container[key] for container, key in outputRefs]
                 
-            # Store data after running step
-            self.simResults["Occupancy"].iloc[simCount] = occupancyOutputs
-            self.simResults["Sensor"].iloc[simCount] = sensorOutputs
-            if self.damperControlType == 'MPC':
-                self.simResults['SystemMPC'].iloc[simCount] = systemMPCOutputs
-            self.simResults["Controller"].iloc[simCount] = controllerOutputs
-            self.simResults["Damper"].iloc[simCount] = damperOutputs
-            self.simResults["BuildingSpace"].iloc[simCount] = buildingSpaceOutputs
-            self.simResults["Fan"].iloc[simCount] = fanOutputs
-            
-            simCount = simCount + 1
+                simCount = simCount + 1
+                if self.resultWriter != None and simCount - chunkStart == bufferSteps:
+                    self.resultWriter.write(chunkStart, bufferSteps)
+                    chunkStart = simCount
+                if self.checkpointSteps != None and simCount % self.checkpointSteps == 0 and simCount < self.steps:
+                    checkpoint.saveCheckpoint(self.checkpointFile(), self.getState(simCount))
+        finally:
+            if self.resultWriter != None: # Also the steps completed before an error
+                self.resultWriter.write(chunkStart, simCount - chunkStart)
+                self.resultsStreamed = True
+                if simCount == self.steps:
+                    self.resultWriter.close()
+        if self.checkpointSteps != None and simCount == self.steps and os.path.exists(self.checkpointFile()): # Only unfinished runs leave a checkpoint
+            os.remove(self.checkpointFile())
             
-        if self.discardStartup == True:
-            discardedSteps = math.ceil(self.startupDuration/Settings.timeStep)
-            for elementResults in self.simResults:
-                self.simResults[elementResults] = self.simResults[elementResults].iloc[discardedSteps:]
-        print("Simulation complete")
+    def resultStart(self): # Step of the first row of the result buffers. Earlier steps are in the result chunks (streamResults) or shared with the model a branch was forked from
+        if self.resultWriter != None:
+            return self.resultWriter.stepsWritten
+        return min([buffer.firstStep for buffer in self.resultBuffers.values()], default=0)
+        
+    def checkpointFile(self):
+        return os.path.join(self.projectPath, "Results", self.outputName + "_checkpoint.pkl")
+        
+    def getState(self, step, results = True): # State of the object engine run after the first step steps: all mutable element state (Simulator/checkpoint.py) and the results so far
+        resultStart = self.resultWriter.stepsWritten if self.resultWriter != None else 0 # Earlier results are already in the result chunks
+        return {'version': checkpoint.version,
+                'step': step,
+                'steps': self.steps,
+                'startTime': self.startTime,
+                'damperControlType': self.damperControlType,
+                'columns': self.outputType,
+                'elements': {category: {id: checkpoint.getElementState(element) for id, element in self.elementDict[category].items()} for category in self.elementDict},
+                'resultStart': resultStart,
+                'results': {key: self.resultBuffers[key].rows(step-self.resultStart()) for key in self.resultBuffers} if results else None,
+                'writer': self.resultWriter.getState() if self.resultWriter != None else None}
+        
+    def setState(self, state, fork = False): # Restore a state from getState on a model set up with the same configuration and period. fork: the model may have other
+        # elements and outputs (e.g. another damper control type). Elements without a state start at the step of the state
+        if state['steps'] != self.steps or state['startTime'] != self.startTime or (state['columns'] != self.outputType and not fork):
+            raise ValueError("The checkpoint does not match the model (configuration file, start time and end time must be the same)")
+        if (state['writer'] != None) != self.streamResults:
+            raise ValueError("The checkpoint was saved with streamResults = " + str(state['writer'] != None) + " and can only be resumed with the same setting")
+        self.simulated = True
+        for category in self.elementDict:
+            for id in self.elementDict[category]:
+                if id in state['elements'].get(category, {}):
+                    checkpoint.setElementState(self.elementDict[category][id], state['elements'][category][id])
+                elif hasattr(self.elementDict[category][id], 'step'):
+                    self.elementDict[category][id].step = state['step']
+        if state['results'] != None:
+            for key in self.resultBuffers:
+                rows = state['results'][key][max(self.resultBuffers[key].firstStep-state['resultStart'], 0):] # Without the steps shared with another model
+                self.resultBuffers[key].data[:len(rows)] = rows
+        
+    def resume(self, state = None): # Continue a run from a checkpoint after simulationSetup (instead of runSimulation). state: checkpoint file, getState dict or None for the
+        # checkpoint of this outputName. The results are the same as for an uninterrupted run
+        if state == None:
+            state = self.checkpointFile()
+        if isinstance(state, str):
+            state = checkpoint.loadCheckpoint(state)
+        if state['damperControlType'] != self.damperControlType:
+            raise ValueError("The checkpoint was saved with damper control type '" + state['damperControlType'] + "'")
+        self.runSimulation(state)
+        
+    def applySettings(self): # Use the settings overrides of this model (settings argument). Returns the replaced values for restoreSettings
+        previous = {}
+        for key in self.settings:
+            previous[key] = getattr(Settings, key)
+            setattr(Settings, key, self.settings[key])
+        return previous
+        
+    def restoreSettings(self, previous):
+        for key in previous:
+            setattr(Settings, key, previous[key])
+        
+    def runUntil(self, timeInput): # Simulate the steps before timeInput (same format as startTimeInput) with the object engine. The run can then be forked (see fork)
+        # or continued with runSimulation
+        if self.streamResults:
+            raise ValueError("Runs with streamResults can not be stopped and forked")
+        step = self.timeline.stepIndex(self.timeFromInput(timeInput))
+        if step <= self.forkStep or step >= self.steps:
+            raise ValueError("The time to run until must be after the steps already simulated and before the end time")
+        print("Simulating until step " + str(step) + "...")
+        previous = self.applySettings()
+        self.simulated = True
+        try:
+            self.runObjectSimulation(self.forkStep, step)
+        finally:
+            self.restoreSettings(previous)
+        self.forkStep = step
+        
+    def fork(self, branches): # Branches that continue this model from the step reached by runUntil with other arguments, sharing the simulated steps.
+        # branches: {name: {Model argument: value}}, e.g. {"PD": {"damperControlType": "PD"}, "MPC": {"damperControlType": "MPCLinear", "mpcW2": 2, "settings": {"CO2Threshold": 800}}}
+        # Returns {name: Model}, set up and at the fork step. Continue each with runSimulation. The results before the fork are not copied (ResultBuffer prefix)
+        if self.forkStep == 0:
+            raise ValueError("Simulate the steps before the fork first (runUntil)")
+        state = self.getState(self.forkStep, results=False)
+        prefix = {key: (self.outputType[key], self.resultBuffers[key].sharedRows(self.forkStep)) for key in self.resultBuffers}
+        forks = {}
+        for name in branches:
+            arguments = dict(self.arguments)
+            arguments['outputName'] = self.outputName + '_' + name
+            arguments.update(branches[name])
+            if arguments['streamResults']:
+                raise ValueError("Forked runs can not use streamResults")
+            branch = Model(**arguments)
+            branch.forkStep = self.forkStep
+            branch.resultPrefix = prefix
+            branch.simulationSetup()
+            branch.setState(state, fork=True)
+            forks[name] = branch
+        return forks
+        
+    def runEnsemble(self, scenarios): # Run N scenarios sharing this configuration in one vectorized step loop (see VectorEngine.setScenarios for the scenario format)
+        # Returns a dict of (N, steps, nOutputs) arrays with the columns of the result buffers. The air KPI per scenario is stored in self.ensembleKPI.
+        # The scenarios start from the state after simulationSetup: call runEnsemble after simulationSetup and before runSimulation (or set the model up again)
+        previous = self.applySettings()
+        try:
+            if self.damperControlType not in VectorEngine.supportedControlTypes:
+                raise ValueError("Ensemble runs are not supported for damper control type '" + self.damperControlType + "'")
+            if self.simulated:
+                raise ValueError("The model has already been simulated. Call simulationSetup again before runEnsemble")
+            print("Starting ensemble simulation of " + str(len(scenarios)) + " scenarios...")
+            engine = VectorEngine(self, eventDriven=self.simEngine == 'eventDriven', exactMath=self.exactMath)
+            engine.compile()
+            engine.setScenarios(scenarios)
+            outputs = {}
+            for key in VectorEngine.outputCategories:
+                outputs[key] = np.full((len(scenarios), self.steps, len(self.outputType[key])), np.nan, dtype=self.resultDtype)
+            engine.run(outputs)
+        
+            startIdx = 0
+            if self.discardStartup == True:
+                startIdx = math.ceil(self.startupDuration/Settings.timeStep)
+            self.ensembleKPI = engine.airKPI(outputs, startIdx)
+            print("Ensemble simulation complete")
+            return outputs
+        finally:
+            self.restoreSettings(previous)
         
     def myRound(self, x, base):
         return base * round(x/base)
@@ -642,68 +775,70 @@ class Model:
         return base * math.ceil(x/base)
     
     def calculateTotals(self):
-        path = self.projectPath
-        fileName = 'power_600s.csv'
-        file = os.path.abspath(os.path.join(path, 'Misc', 'DataProcessing', 'PowerPredictions', fileName))
+        previous = self.applySettings()
+        try:
+            self.getSimResults()
+            path = self.projectPath
+            fileName = 'power_600s.csv'
+            file = os.path.abspath(os.path.join(path, 'Misc', 'DataProcessing', 'PowerPredictions', fileName))
         
-        df = pd.read_csv(file, sep=',')
+            powerPredictions = PredictionCache(file)
         
-        startIdx = None
-        endIdx = None
-        startup = 0
-        if self.discardStartup:
-            startup = int(self.startupDuration/self.timeStep.seconds)
+            startup = 0
+            if self.discardStartup:
+                startup = int(self.startupDuration/self.timeStep.seconds)
         
-        for idx in range(len(df)):
-            if df['DateTime'][idx] == str(self.startTime):
-                    startIdx = idx + startup
-            if df['DateTime'][idx] == str(self.endTime):
-                endIdx = idx
-        powerDf = df.loc[startIdx:endIdx]
-        powerDf.index = range(len(powerDf.index))
-        
-        price = powerDf['DKKPerMWh'] 
-        emmFactor = powerDf['gCO2PerKWh']
-        power = []
-        el = []
-        cost = []
-        totCost = []
-        emm = []
-        totEmm = []
-        for idx in range(len(powerDf)):
-            powerSum = 0
-            for key in self.simResults['Fan']:
-                if key[-1] == 'W':
-                    powerSum = powerSum + self.simResults['Fan'][key][idx+startup]
-            power.append(powerSum)
-            cost.append(powerSum*price[idx]*self.timeStep.seconds/(3600*1000000))
-            emm.append(powerSum*emmFactor[idx]*self.timeStep.seconds/(3600*1000000))
-            if idx == 0 :
-                el.append(powerSum*self.timeStep.seconds/(3600*1000)) #kWh
-                totCost.append(cost[idx])
-                totEmm.append(emm[idx])
-            else:
-                el.append(el[idx-1]+powerSum*self.timeStep.seconds/(3600*1000))
-                totCost.append(totCost[idx-1]+cost[idx])
-                totEmm.append(totEmm[idx-1]+emm[idx])
+            startIdx, endIdx = powerPredictions.timeIndex.window(self.startTime, self.endTime)
+            if startIdx == None:
+                warnings.warn('Missing timesteps in power prediction file: ' + file)
+                startIdx = 0
+            elif endIdx-startIdx != self.steps-1:
+                warnings.warn('Incorrect timesteps in power prediction file: ' + file + ' (' + str(endIdx-startIdx+1) + ' rows between the start and end time, ' + str(self.steps) + ' simulation steps)')
+            nRows = self.steps - startup # One row per simulated step after the startup
+            if startIdx+startup+nRows > powerPredictions.nRows:
+                raise ValueError('The power prediction file ' + file + ' has ' + str(max(powerPredictions.nRows-startIdx-startup, 0)) + ' rows from the start of the results, ' + str(nRows) + ' are needed')
+            powerDf = powerPredictions.window(startIdx+startup, startIdx+startup+nRows-1, columns=['DKKPerMWh', 'gCO2PerKWh'])
+        
+            price = powerDf['DKKPerMWh'] 
+            emmFactor = powerDf['gCO2PerKWh']
+            # Array form of the step loop. Sums are sequential (cumsum) so the results are identical to summing step by step
+            fanW = self.simResults['Fan'][[key for key in self.simResults['Fan'] if key[-1] == 'W']].loc[startup:startup+len(powerDf)-1].to_numpy()
+            power = np.cumsum(fanW, axis=1)[:, -1] if fanW.shape[1] > 0 else np.zeros(len(powerDf))
+            cost = power*price.to_numpy()*self.timeStep.seconds/(3600*1000000)
+            emm = power*emmFactor.to_numpy()*self.timeStep.seconds/(3600*1000000)
+            el = np.cumsum(power*self.timeStep.seconds/(3600*1000)) #kWh
+            totCost = np.cumsum(cost)
+            totEmm = np.cumsum(emm)
         
-        d = {'DKKPerMWh': price, 'gCO2PerKWh': emmFactor, 'powerW': power, 'el': el,
-             'cost': cost, 'totCost': totCost, 'kgCO2emm': emm, 'totCO2emm': totEmm}
-        self.buildingResults = pd.DataFrame(data=d)
+            d = {'DKKPerMWh': price, 'gCO2PerKWh': emmFactor, 'powerW': power, 'el': el,
+                 'cost': cost, 'totCost': totCost, 'kgCO2emm': emm, 'totCO2emm': totEmm}
+            self.buildingResults = pd.DataFrame(data=d)
+        finally:
+            self.restoreSettings(previous)
                         
     def plotSettings(self):
         self.ymargin = 0.05
         
     def clacAirKPI(self):
-        self.KPI = 0
-        for space in self.elementDict["BuildingSpace"]:
-            KPIspace = 0 # [ppm*s*occ] where ppm is the positive difference between concentration and threshold in timesteps where CO2 concentration is above threshold
-            for step in range(self.simResults['Sensor'].index.start, self.simResults['Sensor'].index.stop):
-                if self.simResults["BuildingSpace"][space + ": ppmCO2"][step] > Settings.CO2Threshold:
-                    KPIspace = KPIspace + ((self.simResults["BuildingSpace"][space + ": ppmCO2"][step]-Settings.CO2Threshold) * Settings.timeStep * self.simResults["Occupancy"][space + " occupancy: occupants"][step])
-            self.KPI = self.KPI + KPIspace  
+        previous = self.applySettings()
+        try:
+            self.getSimResults()
+            self.KPI = 0
+            spaces = list(self.elementDict["BuildingSpace"])
+            ppmCO2 = self.simResults["BuildingSpace"][[space + ": ppmCO2" for space in spaces]].to_numpy() # (steps, spaces)
+            occupants = self.simResults["Occupancy"][[space + " occupancy: occupants" for space in spaces]].to_numpy()
+            # [ppm*s*occ] where ppm is the positive difference between concentration and threshold in timesteps where CO2 concentration is above threshold
+            impact = np.where(ppmCO2 > Settings.CO2Threshold, (ppmCO2-Settings.CO2Threshold) * Settings.timeStep * occupants, 0)
+            if len(impact) > 0:
+                KPIspace = np.cumsum(impact, axis=0)[-1] # Sequential sum per space (same order as summing step by step)
+                for idx in range(len(spaces)):
+                    self.KPI = self.KPI + KPIspace[idx]
+        finally:
+            self.restoreSettings(previous)
           
     def SpacePlots(self):
+        import matplotlib.pyplot as plt # Imported on first use so runs without plots do not load matplotlib
+        self.getSimResults()
         for space in self.elementDict["BuildingSpace"]:    
             
             # Figure setup
@@ -782,6 +917,8 @@ class Model:
             plt.show()
     
     def systemPlots(self):
+        import matplotlib.pyplot as plt
+        self.getSimResults()
         for system in self.elementDict["System"]:
             if self.elementDict["System"][system].systemType == "ventilationSystem":
             
@@ -818,6 +955,8 @@ class Model:
                 plt.show()
                 
     def buildingPlots(self):
+        import matplotlib.pyplot as plt
+        self.getSimResults()
         time = self.simResults["DateTime"]["DateTime"]
         
         plt.figure(figsize=(14,12))
@@ -850,6 +989,7 @@ class Model:
         plt.show()
                
     def MPCPlots(self):
+        import matplotlib.pyplot as plt
         for idx in self.createMPCPlots: 
             startTime = self.startTime+idx*self.timeStep
             time = []
@@ -857,6 +997,9 @@ class Model:
                 time.append(startTime+i*self.timeStep*int(Settings.mpcTimeStep/Settings.timeStep))
                 
             for systemMPC in self.elementDict['SystemMPC']:
+                if idx not in self.elementDict['SystemMPC'][systemMPC].solveSteps:
+                    warnings.warn(self.elementDict['SystemMPC'][systemMPC].id + " was not solved at step " + str(idx) + ". The MPC is only solved every mpcTimeStep")
+                    continue
                 spaceList = self.elementDict['SystemMPC'][systemMPC].spaceList
                 nSpaces = len(spaceList)
                 cost = self.elementDict['SystemMPC'][systemMPC].results['Cost'][:,idx]
@@ -893,7 +1036,7 @@ class Model:
                 plt.xlabel('time')
                 plt.show()
                 
-    def objectiveResults(self):
+    def getObjectives(self): # Energy cost [DKK], air KPI [ppm*occ*s], CO2 emission [kg] and number of MPC solves without a solution. Requires calculateTotals and clacAirKPI
         startup = 0
         if self.discardStartup:
             startup = int(self.startupDuration/self.timeStep.seconds)
@@ -901,9 +1044,22 @@ class Model:
         cost = self.buildingResults['totCost'][self.steps-1-startup]
         KPI = self.KPI
         CO2Emm = self.buildingResults['totCO2emm'][self.steps-1-startup]
+        failedSolves = sum(mpc.nFailedSolves for mpc in self.elementDict.get('SystemMPC', {}).values())
+        if failedSolves > 0:
+            warnings.warn(str(failedSolves) + ' MPC solves found no solution. The fail-safe damper positions were used in these steps')
+        return {'cost': cost, 'KPI': KPI, 'CO2Emm': CO2Emm, 'failedSolves': failedSolves}
+        
+    def objectiveResults(self):
+        from tabulate import tabulate
+        objectives = self.getObjectives()
+        cost = objectives['cost']
+        KPI = objectives['KPI']
+        CO2Emm = objectives['CO2Emm']
         table = [['Energy cost:', str(cost) + ' DKK'],
                  ['KPI (air polution):', str(KPI) + ' ppm*occ*s'],
                  ['CO2 emission:', str(CO2Emm) + ' kg']]
+        if self.useMPC:
+            table.append(['Failed MPC solves:', str(objectives['failedSolves'])])
         print(tabulate(table))
         if self.saveResults:
             fileName = self.outputName + 'Results.txt'
@@ -912,6 +1068,7 @@ class Model:
             print(tabulate(table), file = f)
                 
     def storeResults(self):
+        self.getSimResults()
         first = True
         for key in self.simResults:
             if first:
@@ -924,10 +1081,11 @@ class Model:
         fileName2 = self.outputName + '_building.csv'
         file = os.path.abspath(os.path.join(self.projectPath, "Results", fileName))
         file2 = os.path.abspath(os.path.join(self.projectPath, "Results", fileName2))
-        resultDf.to_csv(file)
+        if self.resultWriter == None: # Streamed results are already saved in chunks
+            resultDf.to_csv(file)
         self.buildingResults.to_csv(file2)
         
-        if self.damperControlType == 'MPC':
+        if self.useMPC:
             for mpc in self.elementDict['SystemMPC']:
                 mpcFileName = self.outputName + self.elementDict['SystemMPC'][mpc].id
                 
@@ -936,28 +1094,32 @@ class Model:
                     if self.elementDict['SystemMPC'][mpc].results[key].ndim == 3:
                         arr = arr.reshape(arr.shape[0], -1)
                     
-                    np.savetxt(self.projectPath + '\\Results\\' + mpcFileName + key + '.txt', arr, delimiter=',')    
+                    np.savetxt(os.path.join(self.projectPath, 'Results', mpcFileName + key + '.txt'), arr, delimiter=',')    
                 
     def resultVisualisation(self):
-        print("Preparing result visualisation...")
-        self.calculateTotals()
-        self.plotSettings()
-        self.clacAirKPI()
-        if self.createBuildingSpacePlots:
-            self.SpacePlots()
-        if self.createSystemPlots:
-            self.systemPlots()
-        if self.createBuildingPlots:
-            self.buildingPlots()
-        if self.createMPCPlots != False:
-            self.MPCPlots()
-        if self.saveResults:
-            self.storeResults()
-        print("Visualisation complete")
-        self.objectiveResults()
-        if self.simTimer != False:
-            duration = time.time() - self.simStart
-            print('Total running time: ' + str(duration) + ' seconds')
+        previous = self.applySettings()
+        try:
+            print("Preparing result visualisation...")
+            self.calculateTotals()
+            self.plotSettings()
+            self.clacAirKPI()
+            if self.createBuildingSpacePlots:
+                self.SpacePlots()
+            if self.createSystemPlots:
+                self.systemPlots()
+            if self.createBuildingPlots:
+                self.buildingPlots()
+            if self.createMPCPlots != False:
+                self.MPCPlots()
+            if self.saveResults:
+                self.storeResults()
+            print("Visualisation complete")
+            self.objectiveResults()
+            if self.simTimer != False:
+                duration = time.time() - self.simStart
+                print('Total running time: ' + str(duration) + ' seconds')
+        finally:
+            self.restoreSettings(previous)
     
 
 #-----------------------------------------------------------------------------